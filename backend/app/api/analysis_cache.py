@@ -0,0 +1,106 @@
+"""
+Content hashing of uploads and caching of their analysis results
+"""
+import hashlib
+import logging
+from typing import IO, Any, Dict, Hashable, List, Optional
+
+from app.core.cache import LRUCache
+from app.api.utils.serialization import dumps
+
+
+logger = logging.getLogger("app")
+
+# Bytes of an upload hashed at a time
+HASH_READ_BYTES = 1 << 20
+
+
+def content_hash(file: IO[bytes], read_bytes: int = HASH_READ_BYTES) -> str:
+    """
+    Hash the content of a file with BLAKE2b, reading it in blocks.
+
+    The file is rewound afterwards, so it can be analyzed right away.
+
+    Args:
+        file: Binary file object positioned at the start of the content
+        read_bytes: Number of bytes hashed at a time
+
+    Returns:
+        The hexadecimal 256-bit digest
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    for block in iter(lambda: file.read(read_bytes), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Byte-budgeted LRU cache of upload analyses, keyed by content hash and analysis options"""
+
+    def __init__(self, max_bytes: int):
+        """
+        Create an empty analysis cache.
+
+        Args:
+            max_bytes: Budget for all cached results, measured as their JSON size
+        """
+        self._cache = LRUCache(max_bytes=max_bytes, sizeof=lambda stats: len(dumps(stats)))
+
+    @staticmethod
+    def key(
+        digest: str,
+        file_type: str,
+        profile: bool,
+        columns: Optional[List[str]] = None,
+        max_rows: Optional[int] = None,
+        parser: str = "pandas"
+    ) -> Hashable:
+        """
+        Normalized cache key of an analysis.
+
+        Args:
+            digest: Content hash of the upload
+            file_type: How the upload is parsed (csv, json, jsonl or ndjson)
+            profile: Whether per-column statistics are computed
+            columns: The analyzed columns (None for all)
+            max_rows: The row limit of the analysis (None for all rows)
+            parser: How CSV column types are decided (pandas or typed)
+
+        Returns:
+            The cache key
+        """
+        return (digest, file_type, profile, None if columns is None else tuple(columns), max_rows, parser)
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Look up the analysis of an upload.
+
+        Args:
+            key: The analysis' cache key
+
+        Returns:
+            A copy of the cached statistics (safe to add fields to), or None on a miss
+        """
+        stats = self._cache.get(key)
+        return dict(stats) if stats is not None else None
+
+    def put(self, key: Hashable, stats: Dict[str, Any]) -> None:
+        """
+        Cache the analysis of an upload.
+
+        Args:
+            key: The analysis' cache key
+            stats: The statistics, without per-request fields (e.g. the file name)
+        """
+        if not self._cache.put(key, dict(stats)):
+            logger.info(f"Analysis of {key[0]} is larger than the whole analysis cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache usage and hit counters.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        return self._cache.stats()
@@ -0,0 +1,389 @@
+"""
+On-disk store of uploaded datasets as memory-mapped Arrow (Feather) files
+"""
+import os
+import re
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import pyarrow as pa
+
+from app.api.utils.serialization import dumps, loads
+
+
+logger = logging.getLogger("app")
+
+# Dataset IDs are generated as 32 hexadecimal digits
+_DATASET_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class DatasetNotFoundError(KeyError):
+    """Raised when a dataset ID is unknown or its dataset has been evicted"""
+
+    def __init__(self, dataset_id: str):
+        super().__init__(dataset_id)
+        self.dataset_id = dataset_id
+
+    def __str__(self) -> str:
+        return f"Dataset not found: {self.dataset_id}"
+
+
+class DatasetInfo:
+    """Description of a stored dataset, kept next to its data file"""
+
+    def __init__(
+        self,
+        dataset_id: str,
+        filename: Optional[str],
+        num_rows: int,
+        columns: List[str],
+        column_types: Dict[str, str],
+        size_bytes: int,
+        created_at: float,
+        stats: Dict[str, Any],
+        content_hash: Optional[str] = None
+    ):
+        self.dataset_id = dataset_id
+        self.filename = filename
+        self.num_rows = num_rows
+        self.columns = columns
+        self.column_types = column_types
+        self.size_bytes = size_bytes
+        self.created_at = created_at
+        self.stats = stats
+        self.content_hash = content_hash
+        self.last_used = created_at
+
+    def to_dict(self, include_stats: bool = False) -> Dict[str, Any]:
+        """
+        Convert to a JSON-serializable dictionary.
+
+        Args:
+            include_stats: Also include the analysis computed on upload
+
+        Returns:
+            Dictionary of the dataset's attributes
+        """
+        info = {
+            "dataset_id": self.dataset_id,
+            "filename": self.filename,
+            "row_count": self.num_rows,
+            "column_count": len(self.columns),
+            "columns": self.columns,
+            "column_types": self.column_types,
+            "size_bytes": self.size_bytes,
+            "content_hash": self.content_hash,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+        }
+        if include_stats:
+            info["stats"] = self.stats
+        return info
+
+    @classmethod
+    def from_dict(cls, info: Dict[str, Any]) -> "DatasetInfo":
+        """
+        Rebuild the description saved by to_dict(include_stats=True).
+
+        Args:
+            info: The saved dictionary
+
+        Returns:
+            The dataset description
+        """
+        dataset = cls(
+            info["dataset_id"],
+            info["filename"],
+            info["row_count"],
+            info["columns"],
+            info["column_types"],
+            info["size_bytes"],
+            info["created_at"],
+            info.get("stats", {}),
+            info.get("content_hash"),
+        )
+        dataset.last_used = info.get("last_used", dataset.created_at)
+        return dataset
+
+
+class DatasetStore:
+    """
+    Directory of datasets, each an uncompressed Arrow IPC file plus a JSON description.
+
+    Datasets are written once and then memory-mapped on every read, so
+    previews, statistics and exports read their columns from the page cache
+    without parsing or copying. The total size of the data files is kept
+    within a disk budget by deleting the least recently used datasets.
+    """
+
+    DATA_SUFFIX = ".arrow"
+    INFO_SUFFIX = ".json"
+    TEMP_SUFFIX = ".tmp"
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Open (or create) the store, indexing the datasets already on disk.
+
+        Args:
+            directory: Directory holding the dataset files
+            max_bytes: Budget for the summed size of all data files
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._datasets: "OrderedDict[str, DatasetInfo]" = OrderedDict()
+        # Dataset ID of each stored content hash, for deduplication
+        self._hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, dataset_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, dataset_id + suffix)
+
+    def _load(self) -> None:
+        """
+        Index the datasets of a previous run, least recently used first, and drop leftovers.
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(self.TEMP_SUFFIX):
+                # Written by an interrupted upload
+                self._remove(path)
+                continue
+            dataset_id, suffix = os.path.splitext(name)
+            if suffix != self.INFO_SUFFIX or not _DATASET_ID.match(dataset_id):
+                continue
+            try:
+                with open(path, "rb") as file:
+                    info = DatasetInfo.from_dict(loads(file.read()))
+                # Reads touch the data file, so its mtime is the last use
+                info.last_used = os.path.getmtime(self._path(dataset_id, self.DATA_SUFFIX))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Removing unreadable dataset {dataset_id}: {str(e)}")
+                self._remove_files(dataset_id)
+                continue
+            found.append(info)
+
+        for info in sorted(found, key=lambda info: info.last_used):
+            self._add(info)
+        with self._lock:
+            self._evict()
+        logger.info(f"Dataset store opened with {len(self._datasets)} datasets ({self.total_bytes} bytes)")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _remove_files(self, dataset_id: str) -> None:
+        """
+        Delete a dataset's files (open memory maps of it stay readable).
+        """
+        self._remove(self._path(dataset_id, self.INFO_SUFFIX))
+        self._remove(self._path(dataset_id, self.DATA_SUFFIX))
+
+    def _add(self, info: DatasetInfo) -> None:
+        """
+        Index a dataset as the most recently used (lock held).
+        """
+        self._datasets[info.dataset_id] = info
+        self.total_bytes += info.size_bytes
+        if info.content_hash is not None:
+            self._hashes[info.content_hash] = info.dataset_id
+
+    def _discard(self, info: DatasetInfo) -> None:
+        """
+        Remove a dataset from the index and delete its files (lock held).
+        """
+        del self._datasets[info.dataset_id]
+        self.total_bytes -= info.size_bytes
+        if self._hashes.get(info.content_hash) == info.dataset_id:
+            del self._hashes[info.content_hash]
+        self._remove_files(info.dataset_id)
+
+    def _evict(self) -> None:
+        """
+        Delete least recently used datasets until the store is within budget (lock held).
+        """
+        while self.total_bytes > self.max_bytes and self._datasets:
+            info = next(iter(self._datasets.values()))
+            self._discard(info)
+            self.evictions += 1
+            logger.info(f"Evicted dataset {info.dataset_id} ({info.size_bytes} bytes)")
+
+    def create(
+        self,
+        write: Callable[[str], Dict[str, Any]],
+        filename: Optional[str] = None,
+        content_hash: Optional[str] = None
+    ) -> DatasetInfo:
+        """
+        Add a dataset by having it written to a new file.
+
+        The data is written to a temporary file that only becomes the
+        dataset once it is complete, so failed or interrupted writes never
+        leave a partial dataset behind.
+
+        Args:
+            write: Function that writes an Arrow IPC file to the given path
+                and returns the analysis of the data
+            filename: Name of the uploaded file the data comes from
+            content_hash: Hash of the uploaded content, to find the dataset by (see find)
+
+        Returns:
+            The new dataset's description
+        """
+        dataset_id = uuid.uuid4().hex
+        temp_path = self._path(dataset_id, self.DATA_SUFFIX + self.TEMP_SUFFIX)
+        try:
+            stats = write(temp_path)
+            with pa.memory_map(temp_path) as source:
+                schema = pa.ipc.open_file(source).schema
+            info = DatasetInfo(
+                dataset_id,
+                filename,
+                stats.get("row_count", 0),
+                schema.names,
+                {field.name: str(field.type) for field in schema},
+                os.path.getsize(temp_path),
+                time.time(),
+                stats,
+                content_hash,
+            )
+            info_path = self._path(dataset_id, self.INFO_SUFFIX)
+            with open(info_path + self.TEMP_SUFFIX, "wb") as file:
+                file.write(dumps(info.to_dict(include_stats=True)))
+            os.replace(temp_path, self._path(dataset_id, self.DATA_SUFFIX))
+            os.replace(info_path + self.TEMP_SUFFIX, info_path)
+        except BaseException:
+            self._remove(temp_path)
+            self._remove(self._path(dataset_id, self.INFO_SUFFIX + self.TEMP_SUFFIX))
+            raise
+
+        with self._lock:
+            self._add(info)
+            self._evict()
+        logger.info(f"Stored dataset {dataset_id} ({info.size_bytes} bytes) from {filename}")
+        return info
+
+    def get(self, dataset_id: str) -> DatasetInfo:
+        """
+        Describe a dataset (without counting as a use).
+
+        Args:
+            dataset_id: The dataset's ID
+
+        Returns:
+            The dataset's description
+
+        Raises:
+            DatasetNotFoundError: If there is no such dataset
+        """
+        with self._lock:
+            info = self._datasets.get(dataset_id)
+        if info is None:
+            raise DatasetNotFoundError(dataset_id)
+        return info
+
+    def find(self, content_hash: str) -> Optional[DatasetInfo]:
+        """
+        Find the dataset stored from an upload with the given content, marking it as used.
+
+        Args:
+            content_hash: Hash of the uploaded content
+
+        Returns:
+            The dataset's description, or None if no dataset has that content
+        """
+        with self._lock:
+            dataset_id = self._hashes.get(content_hash)
+            if dataset_id is None:
+                return None
+            self._datasets.move_to_end(dataset_id)
+            info = self._datasets[dataset_id]
+            info.last_used = time.time()
+        self._touch(dataset_id)
+        return info
+
+    def _touch(self, dataset_id: str) -> None:
+        """
+        Record a use in the data file's mtime, which orders datasets after a restart.
+        """
+        try:
+            os.utime(self._path(dataset_id, self.DATA_SUFFIX))
+        except FileNotFoundError:
+            pass
+
+    def open(self, dataset_id: str) -> pa.Table:
+        """
+        Memory-map a dataset, marking it as most recently used.
+
+        Args:
+            dataset_id: The dataset's ID
+
+        Returns:
+            The dataset as an Arrow table whose buffers point into the mapped file
+
+        Raises:
+            DatasetNotFoundError: If there is no such dataset
+        """
+        with self._lock:
+            info = self._datasets.get(dataset_id)
+            if info is None:
+                raise DatasetNotFoundError(dataset_id)
+            self._datasets.move_to_end(dataset_id)
+            info.last_used = time.time()
+            # Open under the lock so that the file cannot be evicted in between
+            source = pa.memory_map(self._path(dataset_id, self.DATA_SUFFIX))
+        self._touch(dataset_id)
+        return pa.ipc.open_file(source).read_all()
+
+    def list(self) -> List[DatasetInfo]:
+        """
+        Describe every dataset.
+
+        Returns:
+            The descriptions, most recently used first
+        """
+        with self._lock:
+            return list(reversed(self._datasets.values()))
+
+    def delete(self, dataset_id: str) -> None:
+        """
+        Remove a dataset.
+
+        Args:
+            dataset_id: The dataset's ID
+
+        Raises:
+            DatasetNotFoundError: If there is no such dataset
+        """
+        with self._lock:
+            info = self._datasets.get(dataset_id)
+            if info is None:
+                raise DatasetNotFoundError(dataset_id)
+            self._discard(info)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the store's disk usage.
+
+        Returns:
+            Dictionary with dataset and byte counts, the budget and the eviction counter
+        """
+        with self._lock:
+            return {
+                "datasets": len(self._datasets),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
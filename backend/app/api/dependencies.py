@@ -5,8 +5,14 @@ import logging
 from typing import Annotated
 
 from fastapi import Depends, Request, Path
+from starlette.requests import HTTPConnection
 
 from app.core.config import settings
+from app.core.executors import ExecutorManager
+from app.api.analysis_cache import AnalysisCache
+from app.api.dataset_store import DatasetStore
+from app.api.jobs import JobQueue
+from app.api.response_cache import ResponseCache
 
 
 logger = logging.getLogger("app")
@@ -22,16 +28,87 @@ async def get_api_version() -> str:
     return settings.VERSION
 
 
-async def request_audit_log(request: Request) -> None:
+async def request_audit_log(connection: HTTPConnection) -> None:
     """
     Dependency for request auditing.
     
+    Args:
+        connection: The FastAPI request or WebSocket connection
+    """
+    method = connection.scope.get("method", "WEBSOCKET")
+    logger.info(f"Request received: {method} {connection.url.path}")
+
+
+async def get_response_cache(request: Request) -> ResponseCache:
+    """
+    Dependency that returns the application's response cache.
+    
+    Args:
+        request: The FastAPI request object
+        
+    Returns:
+        The ResponseCache created in the application lifespan
+    """
+    return request.app.state.response_cache
+
+
+async def get_executors(request: Request) -> ExecutorManager:
+    """
+    Dependency that returns the executor for heavy generation and analysis work.
+    
     Args:
         request: The FastAPI request object
+        
+    Returns:
+        The ExecutorManager created in the application lifespan
+    """
+    return request.app.state.executors
+
+
+async def get_dataset_store(request: Request) -> DatasetStore:
+    """
+    Dependency that returns the store of uploaded datasets.
+    
+    Args:
+        request: The FastAPI request object
+        
+    Returns:
+        The DatasetStore opened in the application lifespan
+    """
+    return request.app.state.dataset_store
+
+
+async def get_analysis_cache(request: Request) -> AnalysisCache:
+    """
+    Dependency that returns the cache of upload analyses.
+    
+    Args:
+        request: The FastAPI request object
+        
+    Returns:
+        The AnalysisCache created in the application lifespan
+    """
+    return request.app.state.analysis_cache
+
+
+async def get_job_queue(request: Request) -> JobQueue:
+    """
+    Dependency that returns the queue of background jobs.
+    
+    Args:
+        request: The FastAPI request object
+        
+    Returns:
+        The JobQueue started in the application lifespan
     """
-    logger.info(f"Request received: {request.method} {request.url.path}")
+    return request.app.state.jobs
 
 
 # Alias types for common dependencies
 APIVersion = Annotated[str, Depends(get_api_version)]
-AuditLog = Annotated[None, Depends(request_audit_log)]
\ No newline at end of file
+AuditLog = Annotated[None, Depends(request_audit_log)]
+ResponseCacheDep = Annotated[ResponseCache, Depends(get_response_cache)]
+ExecutorsDep = Annotated[ExecutorManager, Depends(get_executors)]
+DatasetStoreDep = Annotated[DatasetStore, Depends(get_dataset_store)]
+AnalysisCacheDep = Annotated[AnalysisCache, Depends(get_analysis_cache)]
+JobQueueDep = Annotated[JobQueue, Depends(get_job_queue)]
\ No newline at end of file
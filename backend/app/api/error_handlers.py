@@ -8,6 +8,8 @@ from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 
+from app.core.executors import ExecutorSaturatedError
+
 
 logger = logging.getLogger("app")
 
@@ -51,6 +53,26 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError) -> JSONResponse:
+    """
+    Exception handler for heavy work refused because the executor is saturated.
+    
+    Args:
+        request: The FastAPI request object
+        exc: The exception that was raised
+        
+    Returns:
+        A 503 JSON response telling the client when to retry
+    """
+    logger.warning(f"Executor saturated, refusing {request.method} {request.url.path}")
+    
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 def setup_exception_handlers(app: FastAPI) -> None:
     """
     Register all exception handlers with the FastAPI application.
@@ -60,6 +82,7 @@ def setup_exception_handlers(app: FastAPI) -> None:
     """
     # Register handlers for specific exception types
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.add_exception_handler(ExecutorSaturatedError, executor_saturated_handler)
     
     # Register handler for all unhandled exceptions
     app.add_exception_handler(Exception, generic_exception_handler)
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+Request instrumentation and the metrics of the application's services
+"""
+import time
+from typing import Any, List, Optional
+
+from starlette.datastructures import State
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.utils.negotiation import MEDIA_TYPES
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_RESPONSE_BYTES, Counter, Gauge, Metric
+
+
+# Output format of each response media type, for the format label
+_FORMATS = {media_type: output_format for output_format, media_type in MEDIA_TYPES.items()}
+
+# Route label of requests that matched no route, so that paths cannot add series
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _route(scope: Scope) -> str:
+    """
+    Get the path template of the route that handled a request.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def _format(content_type: Optional[bytes]) -> str:
+    """
+    Get the output format of a response from its Content-Type.
+    """
+    if not content_type:
+        return "none"
+    media_type = content_type.decode("latin-1").split(";", 1)[0].strip()
+    return _FORMATS.get(media_type, "other")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request and counting its response bytes.
+
+    Latency runs until the last body chunk is sent, so streamed responses
+    are timed in full. Requests are labeled with their route's path template
+    (not the raw path), method, output format and status code.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        Args:
+            app: The wrapped application
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        content_type = None
+        sent = 0
+
+        async def send_counted(message: Message) -> None:
+            nonlocal status_code, content_type, sent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type")
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            route = _route(scope)
+            output_format = _format(content_type)
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, output_format, status_code).observe(
+                time.perf_counter() - start
+            )
+            HTTP_RESPONSE_BYTES.labels(route, output_format).inc(sent)
+
+
+def _gauge(name: str, documentation: str, labelnames: tuple = (), values: Optional[dict] = None, value: Any = None) -> Gauge:
+    """
+    Build a gauge read at scrape time.
+    """
+    gauge = Gauge(name, documentation, labelnames)
+    if values is None:
+        gauge.set(value)
+    for labels, labeled_value in (values or {}).items():
+        gauge.labels(*labels).set(labeled_value)
+    return gauge
+
+
+def _counter(name: str, documentation: str, labelnames: tuple = (), values: Optional[dict] = None, value: Any = None) -> Counter:
+    """
+    Build a counter from a total kept by a service, read at scrape time.
+    """
+    counter = Counter(name, documentation, labelnames)
+    if values is None:
+        counter.inc(value)
+    for labels, labeled_value in (values or {}).items():
+        counter.labels(*labels).inc(labeled_value)
+    return counter
+
+
+def service_metrics(state: State) -> List[Metric]:
+    """
+    Read the metrics of the services on the application state.
+
+    Args:
+        state: The application state, with the services of the lifespan
+
+    Returns:
+        Executor queue depth and rejections, cache hit ratios and sizes,
+        job counts by status and dataset store usage
+    """
+    executors = state.executors.stats()
+    caches = {("response",): state.response_cache.stats(), ("analysis",): state.analysis_cache.stats()}
+    jobs = state.jobs.stats()
+    store = state.dataset_store.stats()
+
+    def by_cache(key: str) -> dict:
+        return {labels: stats[key] for labels, stats in caches.items()}
+
+    return [
+        _gauge("executor_active_tasks", "Heavy tasks running on executor threads", value=executors["active"]),
+        _gauge("executor_queue_depth", "Admitted heavy tasks waiting for an executor thread", value=executors["queued"]),
+        _counter("executor_rejected", "Heavy tasks refused with 503 because the executor was saturated", value=executors["rejected"]),
+        _counter("cache_hits", "Cache lookups answered from the cache", ("cache",), by_cache("hits")),
+        _counter("cache_misses", "Cache lookups not in the cache", ("cache",), by_cache("misses")),
+        _gauge("cache_hit_ratio", "Share of cache lookups answered from the cache", ("cache",), by_cache("hit_ratio")),
+        _gauge("cache_bytes", "Size of the cached entries", ("cache",), by_cache("bytes")),
+        _counter("cache_evictions", "Entries evicted to stay within the cache budget", ("cache",), by_cache("evictions")),
+        _gauge("jobs", "Background jobs by status", ("status",), {(status,): count for status, count in jobs["jobs"].items()}),
+        _counter("jobs_rejected", "Job submissions refused because the queue was full", value=jobs["rejected"]),
+        _gauge("dataset_store_datasets", "Datasets in the dataset store", value=store["datasets"]),
+        _gauge("dataset_store_bytes", "Disk usage of the dataset store", value=store["bytes"]),
+    ]
@@ -0,0 +1,97 @@
+"""
+Work functions of the background job types
+"""
+from contextlib import closing
+from functools import partial
+from typing import Any, Dict
+
+from app.api.dataset_store import DatasetStore
+from app.api.jobs import JobContext, JobOutput, JobRunner
+from app.api.utils.negotiation import FILE_EXTENSIONS, MEDIA_TYPES, generation_worker_count
+from app.api.utils.profiling import TableProfile
+from app.api.utils.table_processor import TableProcessor
+from app.core.config import settings
+
+
+def run_generate_job(spec: Dict[str, Any], context: JobContext) -> JobOutput:
+    """
+    Generate a table into the job's result file, chunk by chunk.
+
+    Args:
+        spec: rows, columns, data_types, seed, format, orient and categorical,
+            as for /api/data/generate (the seed is always set)
+        context: The running job's context
+
+    Returns:
+        The file's description, with the table's headers and size
+    """
+    table = TableProcessor.create_table_spec(spec["rows"], spec["columns"], spec.get("data_types"), spec["seed"])
+    output_format = spec["format"]
+    chunk_rows = settings.STREAM_CHUNK_ROWS
+    chunks = TableProcessor.stream_table(
+        table, output_format, chunk_rows, generation_worker_count(table), spec["orient"], spec["categorical"]
+    )
+    total_chunks = TableProcessor.stream_chunk_count(table, output_format, chunk_rows, spec["orient"])
+
+    size_bytes = 0
+    with closing(chunks), open(context.path, "wb") as file:
+        for index, chunk in enumerate(chunks, 1):
+            file.write(chunk)
+            size_bytes += len(chunk)
+            fraction = min(index / total_chunks, 1.0)
+            context.progress(fraction, round(fraction * table.num_rows), table.num_rows, size_bytes)
+
+    extension = FILE_EXTENSIONS.get(output_format, output_format)
+    result = {
+        "rows": table.num_rows,
+        "columns": table.num_cols,
+        "headers": table.headers,
+        "seed": table.entropy,
+        "format": output_format,
+        "size_bytes": size_bytes,
+    }
+    filename = f"generated_data_{table.num_rows}x{table.num_cols}.{extension}"
+    return JobOutput(result, MEDIA_TYPES[output_format], filename)
+
+
+def run_analyze_job(store: DatasetStore, spec: Dict[str, Any], context: JobContext) -> JobOutput:
+    """
+    Profile a stored dataset, one record batch at a time.
+
+    Args:
+        store: The dataset store
+        spec: dataset_id, and optionally the columns to profile
+        context: The running job's context
+
+    Returns:
+        The row count and per-column statistics (see TableProfile)
+    """
+    table = store.open(spec["dataset_id"])
+    if spec.get("columns"):
+        table = table.select(spec["columns"])
+    batches = table.to_batches(max_chunksize=settings.UPLOAD_CHUNK_ROWS)
+    profile = TableProfile()
+    context.progress(0.0, 0, table.num_rows)
+    rows = 0
+    for batch in batches:
+        profile.update(batch.to_pandas())
+        rows += batch.num_rows
+        context.progress(rows / max(table.num_rows, 1), rows, table.num_rows)
+    result = {"dataset_id": spec["dataset_id"], "row_count": table.num_rows, "profile": profile.result()}
+    return JobOutput(result)
+
+
+def job_runners(store: DatasetStore) -> Dict[str, JobRunner]:
+    """
+    Get the work function of every job type.
+
+    Args:
+        store: The dataset store, for analysis jobs
+
+    Returns:
+        Dictionary of job types to their runners, for JobQueue
+    """
+    return {
+        "generate": run_generate_job,
+        "analyze": partial(run_analyze_job, store),
+    }
@@ -0,0 +1,678 @@
+"""
+Background jobs, kept in a persistent SQLite queue and run by an in-process worker pool
+"""
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.api.utils.serialization import dumps, loads
+from app.core.executors import ExecutorSaturatedError
+
+
+logger = logging.getLogger("app")
+
+# Job states; a job ends in one of FINAL_STATES
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Minimum seconds between two writes of a running job's progress to the database
+PROGRESS_WRITE_INTERVAL = 1.0
+
+# Seconds running jobs get to notice an interruption once the drain time is over
+INTERRUPT_GRACE_SECONDS = 10.0
+
+
+class JobNotFoundError(KeyError):
+    """Raised when a job ID is unknown or its job has expired"""
+
+    def __init__(self, job_id: str):
+        super().__init__(job_id)
+        self.job_id = job_id
+
+    def __str__(self) -> str:
+        return f"Job not found: {self.job_id}"
+
+
+class JobActiveError(ValueError):
+    """Raised when a job that is still queued or running cannot be removed"""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Job is still active: {job_id}")
+        self.job_id = job_id
+
+
+class JobCancelledError(Exception):
+    """Raised inside a running job when it is cancelled or interrupted by a shutdown"""
+
+
+class JobOutput:
+    """What a job produced: a JSON result, and optionally the file written to JobContext.path"""
+
+    def __init__(self, result: Dict[str, Any], media_type: Optional[str] = None, filename: Optional[str] = None):
+        """
+        Args:
+            result: JSON-serializable result (a summary, when there is a file)
+            media_type: Media type of the result file; None if no file was written
+            filename: Download name of the result file
+        """
+        self.result = result
+        self.media_type = media_type
+        self.filename = filename
+
+
+class Job:
+    """A submitted job and its state"""
+
+    # Database columns, in the order of the jobs table
+    COLUMNS = (
+        "job_id", "job_type", "spec", "status", "progress", "error", "result",
+        "media_type", "filename", "size_bytes", "created_at", "started_at", "finished_at",
+        "rows", "total_rows", "bytes_written",
+    )
+
+    # Columns added after the first version of the table, with their SQL types
+    ADDED_COLUMNS = {"rows": "INTEGER", "total_rows": "INTEGER", "bytes_written": "INTEGER"}
+
+    def __init__(self, job_id: str, job_type: str, spec: Dict[str, Any], created_at: float):
+        self.job_id = job_id
+        self.job_type = job_type
+        self.spec = spec
+        self.status = QUEUED
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.media_type: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.size_bytes: Optional[int] = None
+        self.created_at = created_at
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Rows generated or parsed so far, out of total_rows, and bytes of the result written
+        self.rows: Optional[int] = None
+        self.total_rows: Optional[int] = None
+        self.bytes_written: Optional[int] = None
+        # When the progress was last written to the database
+        self.progress_saved_at = 0.0
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has reached a final state"""
+        return self.status in FINAL_STATES
+
+    def reset(self) -> None:
+        """
+        Queue the job again, forgetting the progress of its interrupted run.
+        """
+        self.status = QUEUED
+        self.progress = 0.0
+        self.started_at = None
+        self.rows = None
+        self.bytes_written = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get the job's progress, with its throughput and estimated time to completion.
+
+        Returns:
+            Dictionary with the progress (0 to 1), rows done and total, bytes
+            written, rows per second and ETA in seconds (None when unknown)
+        """
+        rate = None
+        eta = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            if elapsed > 0 and self.rows:
+                rate = self.rows / elapsed
+            if self.status == SUCCEEDED:
+                eta = 0.0
+            elif self.status == RUNNING and self.progress > 0:
+                # Assumes the remaining work goes at the same pace
+                eta = elapsed * (1 - self.progress) / self.progress
+        return {
+            "progress": self.progress,
+            "rows": self.rows,
+            "total_rows": self.total_rows,
+            "bytes_written": self.bytes_written,
+            "rows_per_second": rate,
+            "eta_seconds": eta,
+        }
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        """
+        Convert to a JSON-serializable dictionary.
+
+        Args:
+            include_result: Also include the job's JSON result
+
+        Returns:
+            Dictionary of the job's attributes
+        """
+        info = {
+            "job_id": self.job_id,
+            "type": self.job_type,
+            "status": self.status,
+            **self.metrics(),
+            "spec": self.spec,
+            "error": self.error,
+            "media_type": self.media_type,
+            "size_bytes": self.size_bytes,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result:
+            info["result"] = self.result
+        return info
+
+    def to_row(self) -> tuple:
+        """
+        Get the job's database row.
+
+        Returns:
+            The values of COLUMNS
+        """
+        return (
+            self.job_id, self.job_type, dumps(self.spec), self.status, self.progress, self.error,
+            None if self.result is None else dumps(self.result), self.media_type, self.filename,
+            self.size_bytes, self.created_at, self.started_at, self.finished_at,
+            self.rows, self.total_rows, self.bytes_written,
+        )
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "Job":
+        """
+        Rebuild a job from its database row.
+
+        Args:
+            row: The values of COLUMNS
+
+        Returns:
+            The job
+        """
+        values = dict(zip(cls.COLUMNS, row))
+        job = cls(values["job_id"], values["job_type"], loads(values["spec"]), values["created_at"])
+        job.status = values["status"]
+        job.progress = values["progress"]
+        job.error = values["error"]
+        job.result = None if values["result"] is None else loads(values["result"])
+        job.media_type = values["media_type"]
+        job.filename = values["filename"]
+        job.size_bytes = values["size_bytes"]
+        job.started_at = values["started_at"]
+        job.finished_at = values["finished_at"]
+        job.rows = values["rows"]
+        job.total_rows = values["total_rows"]
+        job.bytes_written = values["bytes_written"]
+        return job
+
+
+class JobContext:
+    """Handle through which a running job reports progress and notices cancellation"""
+
+    def __init__(self, queue: "JobQueue", job: Job, path: str):
+        """
+        Args:
+            queue: The queue running the job
+            job: The running job
+            path: Temporary path the job may write its result file to
+        """
+        self._queue = queue
+        self.job = job
+        self.path = path
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job should stop: it was cancelled or the queue is shutting down"""
+        return self._queue._should_stop(self.job)
+
+    def check(self) -> None:
+        """
+        Stop the job here if it was cancelled (call between units of work).
+
+        Raises:
+            JobCancelledError: If the job should stop
+        """
+        if self.cancelled:
+            raise JobCancelledError(self.job.job_id)
+
+    def progress(
+        self,
+        fraction: float,
+        rows: Optional[int] = None,
+        total_rows: Optional[int] = None,
+        bytes_written: Optional[int] = None
+    ) -> None:
+        """
+        Report the work done, and stop the job here if it was cancelled.
+
+        Args:
+            fraction: Fraction of the work done, from 0 to 1
+            rows: Rows generated or parsed so far
+            total_rows: Rows to generate or parse in all
+            bytes_written: Bytes of the result file written so far
+
+        Raises:
+            JobCancelledError: If the job should stop
+        """
+        self._queue._set_progress(self.job, min(max(fraction, 0.0), 1.0), rows, total_rows, bytes_written)
+        self.check()
+
+
+# Work function of a job type: runs the job's spec and returns its output
+JobRunner = Callable[[Dict[str, Any], JobContext], JobOutput]
+
+
+class JobQueue:
+    """
+    Queue of background jobs, persisted in SQLite and run by worker threads.
+
+    Every state change is written to the database, so jobs survive
+    restarts: jobs that were queued are run after a restart, and jobs
+    that were running are queued again and rerun from the start (job runners
+    are deterministic, e.g. generation jobs have a fixed seed). Result files
+    are written to a temporary path and only renamed into place when a job
+    succeeds. Finished jobs and their results are kept for a retention period.
+
+    Cancellation is cooperative: runners call JobContext.progress (or check)
+    between units of work, which stops them once the job is cancelled.
+    """
+
+    DB_NAME = "jobs.sqlite3"
+    RESULT_SUFFIX = ".result"
+    TEMP_SUFFIX = ".tmp"
+
+    def __init__(
+        self,
+        directory: str,
+        runners: Dict[str, JobRunner],
+        workers: int,
+        max_queued: int,
+        retry_after: int,
+        retention_seconds: float
+    ):
+        """
+        Open (or create) the queue, loading the jobs of previous runs.
+
+        Args:
+            directory: Directory holding the database and the result files
+            runners: Work function of each job type
+            workers: Number of worker threads running jobs
+            max_queued: Number of jobs that may wait; beyond it submissions are refused
+            retry_after: Seconds clients are asked to wait when a submission is refused
+            retention_seconds: Seconds finished jobs and their results are kept
+        """
+        self.directory = directory
+        self.runners = runners
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retry_after = retry_after
+        self.retention_seconds = retention_seconds
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # Running jobs whose cancellation was requested
+        self._cancelling: set = set()
+        self._stopping = False
+        self._interrupted = False
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+        self.rejected = 0
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, self.DB_NAME), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, job_type TEXT, spec TEXT, status TEXT, progress REAL, error TEXT, "
+            "result TEXT, media_type TEXT, filename TEXT, size_bytes INTEGER, "
+            "created_at REAL, started_at REAL, finished_at REAL)"
+        )
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in Job.ADDED_COLUMNS.items():
+            if column not in existing:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._load()
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, job_id + suffix)
+
+    def _load(self) -> None:
+        """
+        Load the jobs of a previous run, queueing interrupted ones again, and drop leftovers.
+        """
+        for name in os.listdir(self.directory):
+            if name.endswith(self.TEMP_SUFFIX):
+                # Written by a job that was interrupted
+                self._remove(os.path.join(self.directory, name))
+
+        rows = self._db.execute(f"SELECT {', '.join(Job.COLUMNS)} FROM jobs ORDER BY created_at").fetchall()
+        with self._lock:
+            for row in rows:
+                job = Job.from_row(row)
+                if job.status == RUNNING:
+                    job.reset()
+                    self._save(job)
+                self._jobs[job.job_id] = job
+            self._purge()
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+        logger.info(f"Job queue opened with {len(self._jobs)} jobs ({queued} queued)")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _save(self, job: Job) -> None:
+        """
+        Write a job's state to the database (lock held).
+        """
+        if self._closed:
+            # A job that ignored the shutdown: it is queued again on the next start
+            return
+        placeholders = ", ".join("?" for _ in Job.COLUMNS)
+        with self._db:
+            self._db.execute(f"INSERT OR REPLACE INTO jobs VALUES ({placeholders})", job.to_row())
+        job.progress_saved_at = time.monotonic()
+
+    def _forget(self, job: Job) -> None:
+        """
+        Remove a finished job, its database row and its result file (lock held).
+        """
+        del self._jobs[job.job_id]
+        with self._db:
+            self._db.execute("DELETE FROM jobs WHERE job_id = ?", (job.job_id,))
+        self._remove(self._path(job.job_id, self.RESULT_SUFFIX))
+
+    def _purge(self) -> None:
+        """
+        Remove finished jobs older than the retention period (lock held).
+        """
+        expiry = time.time() - self.retention_seconds
+        for job in list(self._jobs.values()):
+            if job.done and (job.finished_at or job.created_at) < expiry:
+                self._forget(job)
+
+    def start(self) -> None:
+        """
+        Start the worker threads.
+        """
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job_type: str, spec: Dict[str, Any]) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            job_type: One of the queue's runner types
+            spec: JSON-serializable parameters of the job, passed to its runner
+
+        Returns:
+            The queued job
+
+        Raises:
+            ValueError: If there is no runner for the job type
+            ExecutorSaturatedError: If the queue is full
+        """
+        if job_type not in self.runners:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job = Job(uuid.uuid4().hex, job_type, spec, time.time())
+        with self._lock:
+            if self._stopping or sum(1 for other in self._jobs.values() if other.status == QUEUED) >= self.max_queued:
+                self.rejected += 1
+                raise ExecutorSaturatedError(self.retry_after)
+            self._save(job)
+            self._jobs[job.job_id] = job
+            self._wakeup.notify()
+        logger.info(f"Queued {job_type} job {job.job_id}")
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """
+        Get a job's current state.
+
+        Args:
+            job_id: The job's ID
+
+        Returns:
+            The job
+
+        Raises:
+            JobNotFoundError: If there is no such job
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError(job_id)
+        return job
+
+    def list(self) -> List[Job]:
+        """
+        Get every job.
+
+        Returns:
+            The jobs, most recently submitted first
+        """
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def result_path(self, job: Job) -> Optional[str]:
+        """
+        Get the path of a succeeded job's result file.
+
+        Args:
+            job: The job
+
+        Returns:
+            The path, or None if the job has no result file (yet)
+        """
+        if job.status != SUCCEEDED or job.media_type is None:
+            return None
+        return self._path(job.job_id, self.RESULT_SUFFIX)
+
+    def cancel(self, job_id: str) -> Job:
+        """
+        Cancel a job: queued jobs are cancelled at once, running ones at their next progress report.
+
+        Finished jobs are left as they are.
+
+        Args:
+            job_id: The job's ID
+
+        Returns:
+            The job
+
+        Raises:
+            JobNotFoundError: If there is no such job
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise JobNotFoundError(job_id)
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                self._save(job)
+                logger.info(f"Cancelled queued job {job_id}")
+            elif job.status == RUNNING:
+                self._cancelling.add(job_id)
+                logger.info(f"Cancelling running job {job_id}")
+        return job
+
+    def delete(self, job_id: str) -> None:
+        """
+        Remove a finished job and its result.
+
+        Args:
+            job_id: The job's ID
+
+        Raises:
+            JobNotFoundError: If there is no such job
+            JobActiveError: If the job is still queued or running
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise JobNotFoundError(job_id)
+            if not job.done:
+                raise JobActiveError(job_id)
+            self._forget(job)
+
+    def _should_stop(self, job: Job) -> bool:
+        return self._interrupted or job.job_id in self._cancelling
+
+    def _set_progress(
+        self,
+        job: Job,
+        fraction: float,
+        rows: Optional[int],
+        total_rows: Optional[int],
+        bytes_written: Optional[int]
+    ) -> None:
+        """
+        Record a running job's progress, writing it to the database at most every PROGRESS_WRITE_INTERVAL.
+        """
+        with self._lock:
+            job.progress = fraction
+            if rows is not None:
+                job.rows = rows
+            if total_rows is not None:
+                job.total_rows = total_rows
+            if bytes_written is not None:
+                job.bytes_written = bytes_written
+            if time.monotonic() - job.progress_saved_at >= PROGRESS_WRITE_INTERVAL:
+                self._save(job)
+
+    def _next_job(self) -> Optional[Job]:
+        """
+        Wait for the oldest queued job and mark it as running.
+
+        Returns:
+            The job, or None when the queue is shutting down
+        """
+        with self._wakeup:
+            while True:
+                if self._stopping:
+                    return None
+                job = next((job for job in self._jobs.values() if job.status == QUEUED), None)
+                if job is not None:
+                    job.status = RUNNING
+                    job.started_at = time.time()
+                    self._save(job)
+                    return job
+                self._wakeup.wait()
+
+    def _work(self) -> None:
+        """
+        Run queued jobs one after the other until the queue shuts down.
+        """
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: Job) -> None:
+        """
+        Run one job and record how it ended.
+        """
+        temp_path = self._path(job.job_id, self.RESULT_SUFFIX + self.TEMP_SUFFIX)
+        context = JobContext(self, job, temp_path)
+        logger.info(f"Running {job.job_type} job {job.job_id}")
+        output = None
+        error = None
+        size_bytes = None
+        try:
+            output = self.runners[job.job_type](job.spec, context)
+            if output.media_type is not None:
+                size_bytes = os.path.getsize(temp_path)
+                os.replace(temp_path, self._path(job.job_id, self.RESULT_SUFFIX))
+        except JobCancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error running job {job.job_id}: {str(e)}")
+            error = str(e)
+        finally:
+            self._remove(temp_path)
+
+        with self._lock:
+            if output is not None:
+                job.status = SUCCEEDED
+                job.progress = 1.0
+                if job.total_rows is not None:
+                    job.rows = job.total_rows
+                job.result = output.result
+                job.media_type = output.media_type
+                job.filename = output.filename
+                job.size_bytes = size_bytes
+            elif error is not None:
+                job.status = FAILED
+                job.error = error
+            elif job.job_id in self._cancelling:
+                job.status = CANCELLED
+            else:
+                # Interrupted by a shutdown: run it again after the restart
+                job.reset()
+            if job.done:
+                job.finished_at = time.time()
+            self._cancelling.discard(job.job_id)
+            self._save(job)
+            self._purge()
+        logger.info(f"Job {job.job_id} {job.status}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the number of jobs in each state.
+
+        Returns:
+            Dictionary of job counts by status, the limits and the rejection counter
+        """
+        with self._lock:
+            counts = {status: 0 for status in (QUEUED, RUNNING) + FINAL_STATES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {
+            "jobs": counts,
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, drain_seconds: float) -> None:
+        """
+        Stop the worker threads, letting running jobs finish for a while.
+
+        No job is started once shutting down. Jobs still running after
+        drain_seconds are interrupted and queued again for the next start.
+
+        Args:
+            drain_seconds: Seconds to wait for running jobs to finish
+        """
+        logger.info("Shutting down job workers")
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        deadline = time.monotonic() + drain_seconds
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in self._threads):
+            logger.info("Interrupting running jobs")
+            self._interrupted = True
+            deadline = time.monotonic() + INTERRUPT_GRACE_SECONDS
+            for thread in self._threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            self._closed = True
+            self._db.close()
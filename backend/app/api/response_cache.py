@@ -0,0 +1,133 @@
+"""
+Response cache with strong ETags for deterministic data requests
+"""
+import hashlib
+import logging
+from typing import Any, Dict, Hashable, Iterator, Optional
+
+from fastapi import Request, Response, status
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+
+logger = logging.getLogger("app")
+
+
+class CachedResponse:
+    """A fully rendered response body with its media type and headers"""
+
+    def __init__(self, body: bytes, media_type: str, headers: Dict[str, str]):
+        self.body = body
+        self.media_type = media_type
+        self.headers = headers
+
+    def __len__(self) -> int:
+        return len(self.body)
+
+
+class ResponseCache:
+    """Byte-budgeted LRU cache of response bodies, keyed by normalized request"""
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        """
+        Create an empty response cache.
+
+        Args:
+            max_bytes: Budget for all cached bodies together
+            max_entry_bytes: Largest body that is cached; bigger responses only get an ETag
+        """
+        self.max_entry_bytes = max_entry_bytes
+        self._cache = LRUCache(max_bytes=max_bytes)
+        self.not_modified = 0
+
+    @staticmethod
+    def etag(key: Hashable) -> str:
+        """
+        Strong ETag of a deterministic response.
+
+        The body is a pure function of the normalized request and the
+        application version, so the tag can be computed without the body.
+
+        Args:
+            key: The normalized request
+
+        Returns:
+            A quoted entity tag
+        """
+        digest = hashlib.blake2b(f"{settings.VERSION}:{key!r}".encode("utf-8"), digest_size=16)
+        return f'"{digest.hexdigest()}"'
+
+    @staticmethod
+    def _matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+    def lookup(self, request: Request, key: Hashable) -> Optional[Response]:
+        """
+        Answer a request from the cache if possible.
+
+        Args:
+            request: The incoming request (for its If-None-Match header)
+            key: The normalized request
+
+        Returns:
+            A 304 response if the client's copy is current, the cached body
+            if there is one, otherwise None
+        """
+        etag = self.etag(key)
+        if self._matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        headers = {**cached.headers, "ETag": etag, "X-Cache": "HIT"}
+        return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+
+    def tee(
+        self,
+        key: Hashable,
+        chunks: Iterator[bytes],
+        media_type: str,
+        headers: Dict[str, str]
+    ) -> Iterator[bytes]:
+        """
+        Pass a response stream through, caching the body once it completes.
+
+        Bodies larger than max_entry_bytes are not buffered; streams that are
+        abandoned (e.g. by a disconnecting client) are not cached.
+
+        Args:
+            key: The normalized request
+            chunks: The response body stream
+            media_type: Media type of the response
+            headers: Headers to replay on cache hits
+
+        Returns:
+            The same stream of chunks
+        """
+        parts = []
+        size = 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size > self.max_entry_bytes:
+                    parts = None
+                else:
+                    parts.append(chunk)
+            yield chunk
+        if parts is not None:
+            self._cache.put(key, CachedResponse(b"".join(parts), media_type, headers))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache usage and hit counters.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        return {**self._cache.stats(), "not_modified": self.not_modified}
@@ -1,17 +1,48 @@
 """
 API routes for versatile data generation in multiple formats
 """
-import json
+import os
 import logging
-from typing import List, Dict, Any, Optional, Union
+from typing import IO, List, Dict, Any, Optional, Union, Hashable
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status, Query, Header, Response
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status, Query, Header, Response, Request, Path
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 import pandas as pd
-import io
 
-from app.api.dependencies import request_audit_log, APIVersion
+from app.api.dependencies import (
+    request_audit_log,
+    APIVersion,
+    ResponseCacheDep,
+    ExecutorsDep,
+    DatasetStoreDep,
+    AnalysisCacheDep,
+)
+from app.api.analysis_cache import content_hash
+from app.api.dataset_store import DatasetNotFoundError, DatasetStore
+from app.api.response_cache import ResponseCache
+from app.core.config import settings
+from app.core.metrics import UPLOAD_BYTES_PARSED
+from app.core.executors import ExecutorManager, ExecutorSaturatedError
 from app.api.utils.table_processor import TableProcessor
+from app.api.utils.column_generator import TableSpec
+from app.api.utils.compression import ENCODINGS, StreamEncoder, zstd_dictionary
+from app.api.utils.serialization import FastJSONResponse
+from app.api.utils.negotiation import (
+    FILE_EXTENSIONS,
+    MEDIA_TYPES,
+    content_disposition,
+    encoding_headers,
+    negotiate_format,
+    generation_worker_count,
+    negotiate_response_encoding,
+    validate_data_types,
+    validate_orient,
+)
+from app.api.utils.parallel import default_worker_count
+from app.api.utils.csv_analysis import SAMPLE_ROWS, UnknownColumnsError
+from app.api.utils.json_analysis import JsonParseError, analyze_json_file, analyze_json_lines_file
+from app.api.utils.profiling import TableProfile
 
 
 # Create logger
@@ -22,91 +53,188 @@ router = APIRouter(
     prefix="/api/data",
     tags=["data-generation"],
     dependencies=[Depends(request_audit_log)],
+    default_response_class=FastJSONResponse,
 )
 
 
 import asyncio  # Add this import at the top with other imports
 
+
+# Analyzed upload types by file extension
+UPLOAD_FILE_TYPES = {
+    ".csv": "csv",
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "ndjson",
+}
+
+# Levels of upload analysis
+PROFILE_LEVELS = ("basic", "full")
+
+# CSV upload parsers: pandas' inferred dtypes, or sniffed types parsed by Arrow
+UPLOAD_PARSERS = ("pandas", "typed")
+
+# Formats with a native dictionary (categorical) column encoding
+DICTIONARY_FORMATS = ("arrow", "parquet")
+
+
+def _upload_worker_count(size: Optional[int]) -> int:
+    """
+    Number of worker processes to analyze a CSV upload with.
+    
+    Args:
+        size: Size of the upload in bytes, if known
+        
+    Returns:
+        1 for small uploads, otherwise the configured (or per-core) worker count
+    """
+    if size is None or size < settings.UPLOAD_PARALLEL_MIN_BYTES:
+        return 1
+    return settings.GENERATION_WORKERS or default_worker_count()
+
+
+def _stream_table(
+    spec: TableSpec,
+    output_format: str,
+    filename: str,
+    executors: ExecutorManager,
+    encoder: Optional[StreamEncoder] = None,
+    cache: Optional[ResponseCache] = None,
+    cache_key: Optional[Hashable] = None,
+    orient: str = "records",
+    categorical: bool = False
+) -> StreamingResponse:
+    """
+    Build a streaming response that generates and encodes a table chunk by chunk.
+    
+    Tables larger than INLINE_MAX_ROWS are generated on the heavy work
+    executor, which refuses them up front when it is saturated.
+    
+    Args:
+        spec: The table to generate
+        output_format: One of MEDIA_TYPES
+        filename: Download file name (without extension) for CSV, Arrow and Parquet output
+        executors: Executor for heavy generation work
+        encoder: Negotiated content coding; chunks are compressed as they stream
+        cache: Response cache to store the body in, for deterministic requests
+        cache_key: Normalized request the body is cached under
+        orient: Layout of the rows of JSON output (records, split or columns)
+        categorical: Dictionary-encode vocabulary columns of Arrow and Parquet output
+        
+    Returns:
+        Streaming response in the requested format
+    
+    Raises:
+        ExecutorSaturatedError: If a large table cannot be admitted
+    """
+    chunk_rows = settings.STREAM_CHUNK_ROWS
+    workers = generation_worker_count(spec)
+    # The seed lets clients reproduce (or page through) an unseeded response
+    headers = {"X-Seed": str(spec.entropy)}
+    if output_format in FILE_EXTENSIONS:
+        # Return as downloadable file
+        headers["Content-Disposition"] = content_disposition(f"{filename}.{FILE_EXTENSIONS[output_format]}")
+    
+    chunks = TableProcessor.stream_table(spec, output_format, chunk_rows, workers, orient, categorical)
+    
+    if encoder is not None:
+        chunks = encoder.iter_compressed(chunks)
+    headers.update(encoding_headers(encoder))
+    
+    media_type = MEDIA_TYPES[output_format]
+    if cache is not None and cache_key is not None:
+        chunks = cache.tee(cache_key, chunks, media_type, dict(headers))
+        headers["ETag"] = cache.etag(cache_key)
+        headers["X-Cache"] = "MISS"
+    
+    if spec.num_rows <= settings.INLINE_MAX_ROWS:
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+    
+    slot = executors.acquire()
+    # The background task also frees the slot if the stream never starts
+    return StreamingResponse(
+        executors.iterate(chunks, slot),
+        media_type=media_type,
+        headers=headers,
+        background=BackgroundTask(slot.release)
+    )
+
+
 @router.get("/generate", status_code=status.HTTP_200_OK)
 async def generate_data(
-    rows: int = Query(10, ge=1, le=1000, description="Number of rows to generate"),
+    request: Request,
+    cache: ResponseCacheDep,
+    executors: ExecutorsDep,
+    rows: int = Query(10, ge=1, le=settings.MAX_GENERATE_ROWS, description="Number of rows to generate"),
     columns: int = Query(10, ge=1, le=20, description="Number of columns to generate"),
     data_types: Optional[List[str]] = Query(None, description="List of data types for columns"),
-    format: Optional[str] = Query(None, description="Output format override (csv or json)"),
+    seed: Optional[int] = Query(None, ge=0, description="Random seed for reproducible output"),
+    format: Optional[str] = Query(None, description="Output format override (csv, json, ndjson, arrow or parquet)"),
+    orient: str = Query("records", description="Layout of JSON rows: records, split (row arrays) or columns (column arrays)"),
+    categorical: bool = Query(False, description="Dictionary-encode low-cardinality columns of Arrow and Parquet output"),
     accept: Optional[str] = Header(None, description="Accept header for content negotiation")
 ) -> Response:
     """
     Generate data with random values based on specified parameters.
     Response format is determined by the format parameter or Accept header.
+    Output is generated and streamed in chunks of rows. Seeded requests are
+    cached and support conditional requests (ETag / If-None-Match).
     
     Args:
+        request: The FastAPI request object
+        cache: The response cache
+        executors: Executor for heavy generation work
         rows: Number of rows to generate
         columns: Number of columns to generate
         data_types: Optional list of data types for columns
-        format: Optional format override (csv or json)
+        seed: Optional random seed for reproducible output
+        format: Optional format override (csv, json, ndjson, arrow or parquet)
+        orient: Layout of the rows of JSON output (records, split or columns)
+        categorical: Dictionary-encode vocabulary columns of Arrow and Parquet output
         accept: HTTP Accept header
         
     Returns:
         Data in the requested format
     """
     try:
-        # Add delay based on number of columns (1 second per column)
-        logger.info(f"Delaying response for {columns} seconds based on column count")
-        await asyncio.sleep(columns)
-        
         # Validate data types if provided
-        if data_types:
-            for dt in data_types:
-                if dt not in TableProcessor.DATA_TYPES:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Invalid data type: {dt}. Valid types are: {TableProcessor.DATA_TYPES}"
-                    )
+        validate_data_types(data_types)
         
-        # Generate table data
-        table_data = TableProcessor.generate_table_data(
+        # Determine output format (default to json)
+        output_format = negotiate_format(format, accept)
+        orient = validate_orient(orient, output_format)
+        categorical = categorical and output_format in DICTIONARY_FORMATS
+        
+        encoder = negotiate_response_encoding(request, output_format, rows * columns)
+        
+        # Seeded requests are deterministic: answer them from the cache if possible
+        cache_key = None
+        if seed is not None:
+            schema_types = tuple(data_types) if data_types and len(data_types) == columns else None
+            encoding = encoder.cache_token if encoder else None
+            cache_key = ("generate", seed, rows, columns, schema_types, output_format, orient, categorical, encoding)
+            cached = cache.lookup(request, cache_key)
+            if cached is not None:
+                return cached
+        
+        # Add delay based on number of columns (1 second per column by default)
+        delay = columns * settings.GENERATE_DELAY_PER_COLUMN
+        logger.info(f"Delaying response for {delay} seconds based on column count")
+        await asyncio.sleep(delay)
+        
+        # Resolve the table schema; rows are generated while streaming
+        spec = TableProcessor.create_table_spec(
             num_rows=rows,
             num_cols=columns,
-            data_types=data_types
+            data_types=data_types,
+            seed=seed
         )
         
-        # Determine output format (default to json)
-        output_format = "json"
-        
-        # If format parameter is provided, it overrides Accept header
-        if format is not None:
-            format = format.lower()
-            if format in ["csv", "json"]:
-                output_format = format
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid format: {format}. Supported formats are: csv, json"
-                )
-        # Otherwise, use Accept header for content negotiation
-        elif accept is not None and "text/csv" in accept:
-            output_format = "csv"
-        
-        # Return based on determined format
-        if output_format == "csv":
-            # Convert to CSV bytes
-            csv_bytes = TableProcessor.table_to_csv_bytes(table_data)
-            
-            # Return as downloadable file
-            return StreamingResponse(
-                io.BytesIO(csv_bytes),
-                media_type="text/csv",
-                headers={
-                    "Content-Disposition": f"attachment; filename=generated_data_{rows}x{columns}.csv"
-                }
-            )
-        else:  # output_format == "json"
-            # Convert to JSON-ready dictionary
-            json_response = TableProcessor.table_to_json_response(table_data)
-            
-            # Return JSON response
-            return JSONResponse(content=json_response)
-            
+        # Return based on determined format, generated chunk by chunk
+        return _stream_table(spec, output_format, f"generated_data_{rows}x{columns}", executors, encoder, cache, cache_key, orient, categorical)
+    
+    except (HTTPException, ExecutorSaturatedError):
+        raise
     except Exception as e:
         logger.error(f"Error generating data: {str(e)}")
         raise HTTPException(
@@ -116,25 +244,39 @@ async def generate_data(
 
 @router.get("/sample/{sample_type}", status_code=status.HTTP_200_OK)
 async def get_sample_data(
+    request: Request,
+    cache: ResponseCacheDep,
+    executors: ExecutorsDep,
     sample_type: str,
-    rows: int = Query(100, ge=1, le=1000, description="Number of rows to generate"),
-    format: Optional[str] = Query(None, description="Output format override (csv or json)"),
+    rows: int = Query(100, ge=1, le=settings.MAX_GENERATE_ROWS, description="Number of rows to generate"),
+    seed: Optional[int] = Query(None, ge=0, description="Random seed for reproducible output"),
+    format: Optional[str] = Query(None, description="Output format override (csv, json, ndjson, arrow or parquet)"),
+    orient: str = Query("records", description="Layout of JSON rows: records, split (row arrays) or columns (column arrays)"),
+    categorical: bool = Query(False, description="Dictionary-encode low-cardinality columns of Arrow and Parquet output"),
     accept: Optional[str] = Header(None, description="Accept header for content negotiation")
 ) -> Response:
     """
     Get a sample dataset of the specified type.
     Response format is determined by the format parameter or Accept header.
+    Output is generated and streamed in chunks of rows. Samples use a fixed
+    default seed, so they are cached and support conditional requests.
     
     Args:
+        request: The FastAPI request object
+        cache: The response cache
+        executors: Executor for heavy generation work
         sample_type: Type of sample (users, products, transactions)
         rows: Number of rows to generate
-        format: Optional format override (csv or json)
+        seed: Optional random seed for reproducible output
+        format: Optional format override (csv, json, ndjson, arrow or parquet)
+        orient: Layout of the rows of JSON output (records, split or columns)
+        categorical: Dictionary-encode vocabulary columns of Arrow and Parquet output
         accept: HTTP Accept header
         
     Returns:
         Sample data in the requested format
     """
-    valid_types = ["users", "products", "transactions"]
+    valid_types = list(TableProcessor.SAMPLE_SCHEMAS)
     
     if sample_type not in valid_types:
         raise HTTPException(
@@ -144,42 +286,28 @@ async def get_sample_data(
     
     try:
         # Determine output format (default to json)
-        output_format = "json"
+        output_format = negotiate_format(format, accept)
+        orient = validate_orient(orient, output_format)
+        categorical = categorical and output_format in DICTIONARY_FORMATS
         
-        # If format parameter is provided, it overrides Accept header
-        if format is not None:
-            format = format.lower()
-            if format in ["csv", "json"]:
-                output_format = format
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid format: {format}. Supported formats are: csv, json"
-                )
-        # Otherwise, use Accept header for content negotiation
-        elif accept is not None and "text/csv" in accept:
-            output_format = "csv"
+        if seed is None:
+            seed = settings.SAMPLE_SEED
         
-        # Return based on determined format
-        if output_format == "csv":
-            # Generate sample CSV
-            csv_bytes = TableProcessor.generate_sample_csv(sample_type, rows)
-            
-            # Return as downloadable file
-            return StreamingResponse(
-                io.BytesIO(csv_bytes),
-                media_type="text/csv",
-                headers={
-                    "Content-Disposition": f"attachment; filename={sample_type}_sample.csv"
-                }
-            )
-        else:  # output_format == "json"
-            # Generate sample JSON
-            json_data = TableProcessor.generate_sample_json(sample_type, rows)
-            
-            # Return JSON response
-            return JSONResponse(content=json_data)
-            
+        num_cols = len(TableProcessor.SAMPLE_SCHEMAS[sample_type]["headers"])
+        encoder = negotiate_response_encoding(request, output_format, rows * num_cols)
+        encoding = encoder.cache_token if encoder else None
+        cache_key = ("sample", sample_type, rows, seed, output_format, orient, categorical, encoding)
+        cached = cache.lookup(request, cache_key)
+        if cached is not None:
+            return cached
+        
+        spec = TableProcessor.create_sample_spec(sample_type, rows, seed=seed)
+        
+        # Return based on determined format, generated chunk by chunk
+        return _stream_table(spec, output_format, f"{sample_type}_sample", executors, encoder, cache, cache_key, orient, categorical)
+    
+    except (HTTPException, ExecutorSaturatedError):
+        raise
     except Exception as e:
         logger.error(f"Error generating sample data: {str(e)}")
         raise HTTPException(
@@ -188,6 +316,132 @@ async def get_sample_data(
         )
 
 
+def _encode_page(
+    spec: TableSpec,
+    offset: int,
+    limit: int,
+    output_format: str,
+    orient: str,
+    categorical: bool,
+    encoder: Optional[StreamEncoder]
+) -> bytes:
+    """
+    Generate, encode and optionally compress one page of a virtual dataset.
+    
+    Args:
+        spec: The virtual table
+        offset: Index of the first row of the page
+        limit: Maximum number of rows in the page
+        output_format: One of MEDIA_TYPES
+        orient: Layout of the rows of JSON output
+        categorical: Dictionary-encode vocabulary columns of Arrow and Parquet output
+        encoder: Negotiated content coding, if any
+        
+    Returns:
+        The page body
+    """
+    content = TableProcessor.encode_page(spec, offset, limit, output_format, orient, categorical)
+    return encoder.compress(content) if encoder is not None else content
+
+
+@router.get("/datasets/{seed}", status_code=status.HTTP_200_OK)
+async def get_dataset_page(
+    request: Request,
+    executors: ExecutorsDep,
+    seed: int = Path(..., ge=0, description="Seed identifying the dataset"),
+    rows: int = Query(1_000_000, ge=1, le=settings.MAX_DATASET_ROWS, description="Total number of rows in the dataset"),
+    columns: int = Query(10, ge=1, le=20, description="Number of columns in the dataset"),
+    data_types: Optional[List[str]] = Query(None, description="List of data types for columns"),
+    offset: int = Query(0, ge=0, description="Index of the first row to return"),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_ROWS, description="Maximum number of rows to return"),
+    format: Optional[str] = Query(None, description="Output format override (csv, json, ndjson, arrow or parquet)"),
+    orient: str = Query("records", description="Layout of JSON rows: records, split (row arrays) or columns (column arrays)"),
+    categorical: bool = Query(False, description="Dictionary-encode low-cardinality columns of Arrow and Parquet output"),
+    accept: Optional[str] = Header(None, description="Accept header for content negotiation")
+) -> Response:
+    """
+    Get one page of a virtual dataset.
+    
+    A (seed, schema, rows) triple describes a table of any size that is never
+    materialized: each request generates only the rows of its page. Pages of
+    the same dataset are consistent with each other and with /generate called
+    with the same seed, columns and data types.
+    
+    Args:
+        request: The FastAPI request object
+        executors: Executor for heavy generation work
+        seed: Seed identifying the dataset
+        rows: Total number of rows in the dataset
+        columns: Number of columns in the dataset
+        data_types: Optional list of data types for columns
+        offset: Index of the first row to return
+        limit: Maximum number of rows to return
+        format: Optional format override (csv, json, ndjson, arrow or parquet)
+        orient: Layout of the rows of JSON output (records, split or columns)
+        categorical: Dictionary-encode vocabulary columns of Arrow and Parquet output
+        accept: HTTP Accept header
+        
+    Returns:
+        The requested page in the requested format
+    """
+    validate_data_types(data_types)
+    output_format = negotiate_format(format, accept)
+    orient = validate_orient(orient, output_format)
+    categorical = categorical and output_format in DICTIONARY_FORMATS
+    encoder = negotiate_response_encoding(request, output_format, max(0, min(limit, rows - offset)) * columns)
+    
+    try:
+        spec = TableProcessor.create_table_spec(
+            num_rows=rows,
+            num_cols=columns,
+            data_types=data_types,
+            seed=seed
+        )
+        content = await executors.run(_encode_page, spec, offset, limit, output_format, orient, categorical, encoder)
+    except ExecutorSaturatedError:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating dataset page: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating dataset page: {str(e)}"
+        )
+    
+    headers = {"X-Total-Count": str(rows), **encoding_headers(encoder)}
+    if offset + limit < rows:
+        next_url = request.url.include_query_params(offset=offset + limit)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return Response(content=content, media_type=MEDIA_TYPES[output_format], headers=headers)
+
+
+@router.get("/compression/zstd-dictionary", status_code=status.HTTP_200_OK)
+async def get_zstd_dictionary(executors: ExecutorsDep) -> Response:
+    """
+    Download the zstd dictionary trained on the generator vocabularies.
+    
+    Clients that send its ID in an X-Zstd-Dictionary-Id header (together
+    with Accept-Encoding: zstd) get responses compressed with it, which
+    mostly pays off for small pages and samples.
+    
+    Args:
+        executors: Executor for heavy work (training, on first use)
+        
+    Returns:
+        The raw dictionary, with its ID in the X-Zstd-Dictionary-Id header
+    """
+    if not settings.COMPRESSION_ZSTD_DICTIONARY or "zstd" not in ENCODINGS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The zstd dictionary is not enabled"
+        )
+    dictionary = await executors.run(zstd_dictionary)
+    return Response(
+        content=dictionary.as_bytes(),
+        media_type="application/octet-stream",
+        headers={"X-Zstd-Dictionary-Id": str(dictionary.dict_id())}
+    )
+
+
 @router.get("/sample", status_code=status.HTTP_200_OK)
 async def get_sample_info() -> Dict[str, Any]:
     """
@@ -203,83 +457,331 @@ async def get_sample_info() -> Dict[str, Any]:
             "products",
             "transactions"
         ],
-        "formats": ["csv", "json"],
+        "formats": list(MEDIA_TYPES),
         "usage": "Use /api/data/sample/{sample_type}?format=csv to download a specific sample"
     }
 
 
+def _analyze_json(
+    file: IO[bytes],
+    file_type: str,
+    profile: bool = False,
+    columns: Optional[List[str]] = None,
+    max_rows: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Parse an uploaded JSON or JSON Lines file incrementally and describe its structure.
+    
+    Args:
+        file: The spooled upload, at its start
+        file_type: "json", or "jsonl"/"ndjson" for one JSON value per line
+        profile: Also compute per-column statistics of the rows
+        columns: Only analyze these members of the row objects
+        max_rows: Stop parsing after this many rows
+        
+    Returns:
+        A dictionary with information about the JSON data
+    """
+    start = file.tell()
+    try:
+        if file_type == "json":
+            return analyze_json_file(file, settings.UPLOAD_CHUNK_ROWS, profile, columns, max_rows)
+        return analyze_json_lines_file(file, settings.UPLOAD_CHUNK_ROWS, profile, columns, max_rows)
+    except JsonParseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid JSON file: {str(e)}"
+        )
+    finally:
+        UPLOAD_BYTES_PARSED.labels(file_type).inc(max(file.tell() - start, 0))
+
+
+def _analyze_upload(
+    file: IO[bytes],
+    file_type: str,
+    profile: bool,
+    workers: int,
+    columns: Optional[List[str]] = None,
+    max_rows: Optional[int] = None,
+    parser: str = "pandas"
+) -> Dict[str, Any]:
+    """
+    Analyze an uploaded file from its spooled content.
+    
+    Args:
+        file: The spooled upload, at its start
+        file_type: One of UPLOAD_FILE_TYPES
+        profile: Also compute per-column statistics
+        workers: Number of worker processes for a CSV analysis
+        columns: Only analyze these columns
+        max_rows: Only analyze the first rows
+        parser: One of UPLOAD_PARSERS, for a CSV analysis
+        
+    Returns:
+        The analysis of the file
+    """
+    if file_type == "csv":
+        # Large uploads are split into byte ranges analyzed on the process pool
+        return TableProcessor.analyze_csv_file(
+            file,
+            settings.UPLOAD_CHUNK_ROWS,
+            profile,
+            workers,
+            settings.UPLOAD_RANGE_BYTES,
+            usecols=columns,
+            max_rows=max_rows,
+            typed=parser == "typed"
+        )
+    return _analyze_json(file, file_type, profile, columns, max_rows)
+
+
+def _analyze_and_store_csv(
+    store: DatasetStore,
+    file: IO[bytes],
+    filename: Optional[str],
+    digest: Optional[str],
+    profile: bool,
+    workers: int,
+    columns: Optional[List[str]] = None,
+    max_rows: Optional[int] = None,
+    parser: str = "pandas"
+) -> Dict[str, Any]:
+    """
+    Analyze an uploaded CSV file and keep the parsed table in the dataset store.
+    
+    Args:
+        store: The dataset store
+        file: The spooled upload, at its start
+        filename: Name of the uploaded file
+        digest: Content hash to deduplicate the dataset by (None for a partial dataset)
+        profile: Also compute per-column statistics
+        workers: Number of worker processes for the analysis
+        columns: Only analyze and store these columns
+        max_rows: Only analyze and store the first rows
+        parser: One of UPLOAD_PARSERS
+        
+    Returns:
+        The analysis, with the new dataset's ID under "dataset_id"
+    """
+    def write(path: str) -> Dict[str, Any]:
+        return TableProcessor.analyze_csv_file(
+            file,
+            settings.UPLOAD_CHUNK_ROWS,
+            profile,
+            workers,
+            settings.UPLOAD_RANGE_BYTES,
+            store_path=path,
+            usecols=columns,
+            max_rows=max_rows,
+            typed=parser == "typed"
+        )
+    
+    dataset = store.create(write, filename, digest)
+    return {**dataset.stats, "dataset_id": dataset.dataset_id}
+
+
+def _find_stored_csv(
+    store: DatasetStore,
+    digest: str,
+    profile: bool,
+    parser: str = "pandas"
+) -> Optional[Dict[str, Any]]:
+    """
+    Get the analysis of the dataset already stored from an upload with the same content.
+    
+    Args:
+        store: The dataset store
+        digest: Content hash of the upload
+        profile: Whether per-column statistics are requested
+        parser: The requested parser; datasets stored with other column types do not match
+        
+    Returns:
+        The stored analysis at the requested level, with the dataset's ID
+        under "dataset_id", or None if the content is not stored
+    """
+    dataset = store.find(digest)
+    if dataset is None or dataset.stats.get("parser", "pandas") != parser:
+        return None
+    stats = dict(dataset.stats)
+    if not profile:
+        stats.pop("profile", None)
+    elif "profile" not in stats:
+        # Stored with a basic analysis: profile the mapped columns rather than parsing again
+        try:
+            table = store.open(dataset.dataset_id)
+        except DatasetNotFoundError:
+            return None  # Evicted in the meantime
+        stats["profile"] = TableProfile.of_arrow(table, settings.UPLOAD_CHUNK_ROWS).result()
+    stats["dataset_id"] = dataset.dataset_id
+    return stats
+
+
+@router.get("/upload/cache", status_code=status.HTTP_200_OK)
+async def get_upload_cache_stats(analysis_cache: AnalysisCacheDep) -> Dict[str, Any]:
+    """
+    Report the usage and hit counters of the upload analysis cache.
+    
+    Args:
+        analysis_cache: Cache of analyses by content hash
+        
+    Returns:
+        Dictionary of cache statistics
+    """
+    return analysis_cache.stats()
+
+
 @router.post("/upload", status_code=status.HTTP_201_CREATED)
 async def upload_file(
+    response: Response,
+    executors: ExecutorsDep,
+    dataset_store: DatasetStoreDep,
+    analysis_cache: AnalysisCacheDep,
     file: UploadFile = File(...),
+    profile: str = Query("basic", description="Analysis level: basic, or full for per-column statistics"),
+    store: bool = Query(False, description="Keep the parsed CSV in the dataset store and return its dataset_id"),
+    columns: Optional[List[str]] = Query(None, description="Only parse and analyze these columns"),
+    max_rows: Optional[int] = Query(None, ge=1, description="Only parse and analyze the first rows"),
+    sample_only: bool = Query(False, description="Only read the first rows, for a quick look at the head"),
+    parser: str = Query("pandas", description="CSV parser: pandas (inferred dtypes) or typed (sniffed types, parsed by Arrow)"),
     api_version: APIVersion = None
 ) -> Dict[str, Any]:
     """
-    Upload and analyze a data file (CSV or JSON).
+    Upload and analyze a data file (CSV, JSON, or JSON Lines as .jsonl/.ndjson).
+    
+    Files are analyzed from the spooled upload in a streaming fashion, so
+    memory use does not grow with the size of the file.
+    
+    With profile=full, the analysis also reports per-column statistics (null
+    counts, min/max/mean/std, distinct counts, quantiles and most frequent
+    values), computed in the same single pass over the data.
+    
+    With store=true, a CSV upload is also converted once into a memory-mapped
+    Arrow file of the dataset store; the returned dataset_id gives access to
+    it through /api/datasets without uploading or parsing it again.
+    
+    Uploads are identified by a BLAKE2b hash of their content. Analyses are
+    cached by content hash and options, and stored datasets are shared by
+    uploads of the same content, so a repeated upload is answered right
+    after hashing (X-Cache: HIT) instead of being parsed again.
+    
+    The columns, max_rows and sample_only parameters are pushed down into
+    the parsers: unselected columns are not converted and parsing stops
+    after the row limit, so a targeted look at a wide or long file costs a
+    fraction of a full analysis. With a row limit, "truncated" tells
+    whether the file has more rows.
+    
+    With parser=typed, the column types of a CSV upload are sniffed from its
+    first rows (integers, floats, booleans, dates, $ prices, emails,
+    repetitive text) and the whole file is parsed straight into them by
+    Arrow's multithreaded reader. This is faster and reports a smaller
+    memory_usage than pandas' inference (prices become numbers, repetitive
+    text dictionary-encoded); column_types are then Arrow types, and
+    column_shapes the sniffed shapes. If later values do not fit their
+    sniffed type, the upload is analyzed by pandas instead; "parser" tells
+    which parser ran.
     
     Args:
+        response: The response (for its X-Cache header)
+        executors: Executor for heavy analysis work
+        dataset_store: Store of parsed uploads
+        analysis_cache: Cache of analyses by content hash
         file: The file to upload
+        profile: Analysis level (basic or full)
+        store: Keep the parsed table in the dataset store
+        columns: Only parse and analyze these columns
+        max_rows: Only parse and analyze the first rows
+        sample_only: Only read the first SAMPLE_ROWS rows
+        parser: CSV parser (pandas or typed)
         api_version: The current API version
         
     Returns:
         A dictionary with information about the processed file
     """
-    if not (file.filename.endswith('.csv') or file.filename.endswith('.json')):
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in UPLOAD_FILE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file must be a CSV, JSON or JSON Lines (.jsonl, .ndjson) file"
+        )
+    file_type = UPLOAD_FILE_TYPES[extension]
+    if profile not in PROFILE_LEVELS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid profile: {profile}. Supported levels are: {', '.join(PROFILE_LEVELS)}"
+        )
+    full_profile = profile == "full"
+    if parser not in UPLOAD_PARSERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid parser: {parser}. Supported parsers are: {', '.join(UPLOAD_PARSERS)}"
+        )
+    if parser != "pandas" and file_type != "csv":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Uploaded file must be a CSV or JSON file"
+            detail="Only CSV uploads can be parsed with sniffed types"
+        )
+    if sample_only:
+        max_rows = min(max_rows or SAMPLE_ROWS, SAMPLE_ROWS)
+    # Partial datasets are not deduplicated against the whole content
+    partial = columns is not None or max_rows is not None
+    if store and file_type != "csv":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only CSV uploads can be stored as datasets"
         )
     
     try:
-        # Read file content
-        contents = await file.read()
-        
-        # Process based on file type
-        if file.filename.endswith('.csv'):
-            # Use TableProcessor to analyze the CSV
-            stats = TableProcessor.analyze_csv(contents)
-        else:  # JSON file
-            # Parse JSON and convert to a basic structure
-            try:
-                json_data = json.loads(contents.decode('utf-8'))
-            except:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid JSON file"
+        # Hash the spooled upload first: repeated content is answered without parsing it
+        await file.seek(0)
+        digest = await executors.run(content_hash, file.file)
+        cache_key = analysis_cache.key(digest, file_type, full_profile, columns, max_rows, parser)
+        workers = _upload_worker_count(file.size)
+        if store:
+            stats = None if partial else await executors.run(
+                _find_stored_csv, dataset_store, digest, full_profile, parser
+            )
+            cached = stats is not None
+            if not cached:
+                stats = await executors.run(
+                    _analyze_and_store_csv,
+                    dataset_store,
+                    file.file,
+                    file.filename,
+                    None if partial else digest,
+                    full_profile,
+                    workers,
+                    columns,
+                    max_rows,
+                    parser
+                )
+                analysis_cache.put(cache_key, {key: value for key, value in stats.items() if key != "dataset_id"})
+        else:
+            stats = analysis_cache.get(cache_key)
+            cached = stats is not None
+            if not cached:
+                # Analyze the spooled upload incrementally, off the event loop
+                stats = await executors.run(
+                    _analyze_upload, file.file, file_type, full_profile, workers, columns, max_rows, parser
                 )
-            
-            # Handle different possible JSON structures
-            if isinstance(json_data, list):
-                # Assume array of objects
-                if json_data and isinstance(json_data[0], dict):
-                    stats = {
-                        "row_count": len(json_data),
-                        "column_count": len(json_data[0]) if json_data else 0,
-                        "columns": list(json_data[0].keys()) if json_data else [],
-                        "sample_rows": json_data[:5] if len(json_data) > 5 else json_data
-                    }
-                else:
-                    stats = {"data": json_data}
-            elif isinstance(json_data, dict):
-                # Handle object with data array
-                if "data" in json_data and isinstance(json_data["data"], list):
-                    stats = {
-                        "row_count": len(json_data["data"]),
-                        "metadata": json_data.get("metadata", {}),
-                        "sample_rows": json_data["data"][:5] if len(json_data["data"]) > 5 else json_data["data"]
-                    }
-                else:
-                    stats = json_data
-            else:
-                stats = {"data": json_data}
+                analysis_cache.put(cache_key, stats)
+        response.headers["X-Cache"] = "HIT" if cached else "MISS"
         
         # Add additional information
+        stats["content_hash"] = digest
         stats["filename"] = file.filename
-        stats["file_type"] = "csv" if file.filename.endswith('.csv') else "json"
+        stats["file_type"] = file_type
         stats["api_version"] = api_version
         
         logger.info(f"Successfully processed file: {file.filename}")
         return stats
     
+    except (HTTPException, ExecutorSaturatedError):
+        raise
+    except UnknownColumnsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}")
         raise HTTPException(
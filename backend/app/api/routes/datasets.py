@@ -0,0 +1,358 @@
+"""
+API routes for datasets kept in the dataset store
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.api.dependencies import request_audit_log, DatasetStoreDep, ExecutorsDep
+from app.api.dataset_store import DatasetInfo, DatasetNotFoundError, DatasetStore
+from app.api.utils.negotiation import (
+    FILE_EXTENSIONS,
+    MEDIA_TYPES,
+    content_disposition,
+    encoding_headers,
+    negotiate_format,
+    negotiate_response_encoding,
+    validate_orient,
+)
+from app.core.config import settings
+from app.core.executors import ExecutorSaturatedError
+from app.api.utils.compression import StreamEncoder
+from app.api.utils.dataset_encoding import iter_dataset_chunks
+from app.api.utils.profiling import TableProfile
+from app.api.utils.serialization import FastJSONResponse
+
+
+# Create logger
+logger = logging.getLogger("app")
+
+# Create router
+router = APIRouter(
+    prefix="/api/datasets",
+    tags=["datasets"],
+    dependencies=[Depends(request_audit_log)],
+    default_response_class=FastJSONResponse,
+)
+
+# Path parameter of a dataset ID
+DATASET_ID = Path(..., description="ID returned by /api/data/upload?store=true")
+
+
+def _get_dataset(store: DatasetStore, dataset_id: str) -> DatasetInfo:
+    """
+    Look up a dataset, answering 404 if it is unknown or was evicted.
+
+    Args:
+        store: The dataset store
+        dataset_id: The dataset's ID
+
+    Returns:
+        The dataset's description
+    """
+    try:
+        return store.get(dataset_id)
+    except DatasetNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+def _open_dataset(store: DatasetStore, dataset_id: str) -> pa.Table:
+    """
+    Memory-map a dataset, answering 404 if it is unknown or was evicted.
+
+    Args:
+        store: The dataset store
+        dataset_id: The dataset's ID
+
+    Returns:
+        The dataset's table
+    """
+    try:
+        return store.open(dataset_id)
+    except DatasetNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+def _validate_columns(dataset: DatasetInfo, columns: Optional[List[str]]) -> None:
+    """
+    Reject selected columns that the dataset does not have.
+
+    Args:
+        dataset: The dataset's description
+        columns: The selected columns, if any
+    """
+    missing = [column for column in columns or [] if column not in dataset.columns]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Columns not found: {', '.join(missing)}"
+        )
+
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def list_datasets(store: DatasetStoreDep) -> Dict[str, Any]:
+    """
+    List the stored datasets.
+
+    Args:
+        store: The dataset store
+
+    Returns:
+        The datasets, most recently used first, and the store's disk usage
+    """
+    return {
+        "datasets": [dataset.to_dict() for dataset in store.list()],
+        "store": store.stats(),
+    }
+
+
+@router.get("/{dataset_id}", status_code=status.HTTP_200_OK)
+async def get_dataset(store: DatasetStoreDep, dataset_id: str = DATASET_ID) -> Dict[str, Any]:
+    """
+    Describe a stored dataset, with the analysis computed when it was uploaded.
+
+    Args:
+        store: The dataset store
+        dataset_id: The dataset's ID
+
+    Returns:
+        The dataset's description and upload analysis (under "stats")
+    """
+    return _get_dataset(store, dataset_id).to_dict(include_stats=True)
+
+
+@router.delete("/{dataset_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_dataset(store: DatasetStoreDep, dataset_id: str = DATASET_ID) -> Response:
+    """
+    Delete a stored dataset.
+
+    Args:
+        store: The dataset store
+        dataset_id: The dataset's ID
+
+    Returns:
+        An empty response
+    """
+    try:
+        store.delete(dataset_id)
+    except DatasetNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+def _profile_dataset(store: DatasetStore, dataset_id: str) -> Dict[str, Any]:
+    """
+    Compute per-column statistics of a stored dataset, one record batch at a time.
+
+    Args:
+        store: The dataset store
+        dataset_id: The dataset's ID
+
+    Returns:
+        Dictionary with the row count and the per-column statistics
+    """
+    table = _open_dataset(store, dataset_id)
+    profile = TableProfile.of_arrow(table, settings.UPLOAD_CHUNK_ROWS)
+    return {"dataset_id": dataset_id, "row_count": table.num_rows, "profile": profile.result()}
+
+
+@router.get("/{dataset_id}/profile", status_code=status.HTTP_200_OK)
+async def profile_dataset(
+    store: DatasetStoreDep,
+    executors: ExecutorsDep,
+    dataset_id: str = DATASET_ID
+) -> Dict[str, Any]:
+    """
+    Get per-column statistics of a stored dataset.
+
+    The columns are read from the memory-mapped file, so no parsing is
+    needed, whatever profile level the dataset was uploaded with.
+
+    Args:
+        store: The dataset store
+        executors: Executor for heavy analysis work
+        dataset_id: The dataset's ID
+
+    Returns:
+        Null counts, min/max/mean/std, distinct counts, quantiles and most
+        frequent values of every column (see TableProfile)
+    """
+    _get_dataset(store, dataset_id)
+    try:
+        return await executors.run(_profile_dataset, store, dataset_id)
+    except (HTTPException, ExecutorSaturatedError):
+        raise
+    except Exception as e:
+        logger.error(f"Error profiling dataset: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error profiling dataset: {str(e)}"
+        )
+
+
+def _encode_rows(
+    store: DatasetStore,
+    dataset_id: str,
+    offset: int,
+    limit: int,
+    output_format: str,
+    orient: str,
+    encoder: Optional[StreamEncoder],
+    columns: Optional[List[str]] = None
+) -> bytes:
+    """
+    Encode and optionally compress a range of rows of a stored dataset.
+
+    Args:
+        store: The dataset store
+        dataset_id: The dataset's ID
+        offset: Index of the first row
+        limit: Maximum number of rows
+        output_format: One of MEDIA_TYPES
+        orient: Layout of the rows of JSON output
+        encoder: Negotiated content coding, if any
+        columns: Only encode these columns (the others are never read)
+
+    Returns:
+        The encoded rows; JSON carries paging metadata in its envelope
+    """
+    table = _open_dataset(store, dataset_id)
+    if columns:
+        table = table.select(columns)
+    # Slicing a memory-mapped table only reads the pages of the selected rows
+    page = table.slice(offset, limit)
+    end = offset + page.num_rows
+    metadata = {
+        "rows": table.num_rows,
+        "columns": table.num_columns,
+        "headers": table.column_names,
+        "offset": offset,
+        "limit": limit,
+        "returned": page.num_rows,
+        "next_offset": end if end < table.num_rows else None,
+    }
+    content = b"".join(iter_dataset_chunks(page, output_format, max(page.num_rows, 1), orient, metadata))
+    return encoder.compress(content) if encoder is not None else content
+
+
+@router.get("/{dataset_id}/rows", status_code=status.HTTP_200_OK)
+async def get_dataset_rows(
+    request: Request,
+    store: DatasetStoreDep,
+    executors: ExecutorsDep,
+    dataset_id: str = DATASET_ID,
+    offset: int = Query(0, ge=0, description="Index of the first row to return"),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_ROWS, description="Maximum number of rows to return"),
+    columns: Optional[List[str]] = Query(None, description="Only return these columns"),
+    format: Optional[str] = Query(None, description="Output format override (csv, json, ndjson, arrow or parquet)"),
+    orient: str = Query("records", description="Layout of JSON rows: records, split (row arrays) or columns (column arrays)"),
+    accept: Optional[str] = Header(None, description="Accept header for content negotiation")
+) -> Response:
+    """
+    Get one page of rows of a stored dataset.
+
+    Args:
+        request: The FastAPI request object
+        store: The dataset store
+        executors: Executor for heavy encoding work
+        dataset_id: The dataset's ID
+        offset: Index of the first row to return
+        limit: Maximum number of rows to return
+        columns: Only return these columns
+        format: Optional format override (csv, json, ndjson, arrow or parquet)
+        orient: Layout of the rows of JSON output (records, split or columns)
+        accept: HTTP Accept header
+
+    Returns:
+        The requested rows in the requested format
+    """
+    dataset = _get_dataset(store, dataset_id)
+    _validate_columns(dataset, columns)
+    output_format = negotiate_format(format, accept)
+    orient = validate_orient(orient, output_format)
+    returned = max(0, min(limit, dataset.num_rows - offset))
+    encoder = negotiate_response_encoding(request, output_format, returned * len(columns or dataset.columns))
+
+    try:
+        content = await executors.run(
+            _encode_rows, store, dataset_id, offset, limit, output_format, orient, encoder, columns
+        )
+    except (HTTPException, ExecutorSaturatedError):
+        raise
+    except Exception as e:
+        logger.error(f"Error reading dataset rows: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error reading dataset rows: {str(e)}"
+        )
+
+    headers = {"X-Total-Count": str(dataset.num_rows), **encoding_headers(encoder)}
+    if offset + limit < dataset.num_rows:
+        next_url = request.url.include_query_params(offset=offset + limit)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return Response(content=content, media_type=MEDIA_TYPES[output_format], headers=headers)
+
+
+@router.get("/{dataset_id}/export", status_code=status.HTTP_200_OK)
+async def export_dataset(
+    request: Request,
+    store: DatasetStoreDep,
+    executors: ExecutorsDep,
+    dataset_id: str = DATASET_ID,
+    columns: Optional[List[str]] = Query(None, description="Only export these columns"),
+    format: Optional[str] = Query(None, description="Output format override (csv, json, ndjson, arrow or parquet)"),
+    orient: str = Query("records", description="Layout of JSON rows: records, split (row arrays) or columns (column arrays)"),
+    accept: Optional[str] = Header(None, description="Accept header for content negotiation")
+) -> StreamingResponse:
+    """
+    Download a whole stored dataset, streamed one record batch at a time.
+
+    Args:
+        request: The FastAPI request object
+        store: The dataset store
+        executors: Executor for heavy encoding work
+        dataset_id: The dataset's ID
+        columns: Only export these columns
+        format: Optional format override (csv, json, ndjson, arrow or parquet)
+        orient: Layout of the rows of JSON output (records, split or columns)
+        accept: HTTP Accept header
+
+    Returns:
+        Streaming response with the dataset in the requested format
+    """
+    dataset = _get_dataset(store, dataset_id)
+    _validate_columns(dataset, columns)
+    output_format = negotiate_format(format, accept)
+    orient = validate_orient(orient, output_format)
+    encoder = negotiate_response_encoding(request, output_format, dataset.num_rows * len(columns or dataset.columns))
+
+    # The table stays mapped while it streams, even if the dataset is evicted meanwhile
+    table = _open_dataset(store, dataset_id)
+    if columns:
+        table = table.select(columns)
+    metadata = {"rows": table.num_rows, "columns": table.num_columns, "headers": table.column_names}
+    chunks = iter_dataset_chunks(table, output_format, settings.STREAM_CHUNK_ROWS, orient, metadata)
+    if encoder is not None:
+        chunks = encoder.iter_compressed(chunks)
+
+    headers = encoding_headers(encoder)
+    if output_format in FILE_EXTENSIONS:
+        name = (dataset.filename or dataset_id).rsplit(".", 1)[0]
+        headers["Content-Disposition"] = content_disposition(f"{name}.{FILE_EXTENSIONS[output_format]}")
+    media_type = MEDIA_TYPES[output_format]
+
+    if dataset.num_rows <= settings.INLINE_MAX_ROWS:
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+    slot = executors.acquire()
+    # The background task also frees the slot if the stream never starts
+    return StreamingResponse(
+        executors.iterate(chunks, slot),
+        media_type=media_type,
+        headers=headers,
+        background=BackgroundTask(slot.release)
+    )
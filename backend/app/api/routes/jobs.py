@@ -0,0 +1,384 @@
+"""
+API routes for background jobs: long generation and analysis work off the request path
+"""
+import asyncio
+import logging
+import secrets
+from typing import Annotated, Any, AsyncIterator, Dict, List, Literal, Optional, Union
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.api.dependencies import request_audit_log, DatasetStoreDep, JobQueueDep
+from app.api.dataset_store import DatasetNotFoundError
+from app.api.jobs import FINAL_STATES, SUCCEEDED, Job, JobActiveError, JobNotFoundError, JobQueue
+from app.api.utils.negotiation import negotiate_format, validate_data_types, validate_orient
+from app.core.config import settings
+from app.api.utils.serialization import FastJSONResponse, dumps, loads
+
+
+# Create logger
+logger = logging.getLogger("app")
+
+# Create router
+router = APIRouter(
+    prefix="/api/jobs",
+    tags=["jobs"],
+    dependencies=[Depends(request_audit_log)],
+    default_response_class=FastJSONResponse,
+)
+
+# Path parameter of a job ID
+JOB_ID = Path(..., description="ID returned by POST /api/jobs")
+
+
+class GenerateJobSpec(BaseModel):
+    """Generation of a table, as by /api/data/generate, into a downloadable file"""
+
+    type: Literal["generate"]
+    rows: int = Field(..., ge=1, le=settings.MAX_GENERATE_ROWS, description="Number of rows to generate")
+    columns: int = Field(10, ge=1, le=20, description="Number of columns to generate")
+    data_types: Optional[List[str]] = Field(None, description="List of data types for columns")
+    seed: Optional[int] = Field(None, ge=0, description="Random seed for reproducible output")
+    format: str = Field("csv", description="Output format (csv, json, ndjson, arrow or parquet)")
+    orient: str = Field("records", description="Layout of JSON rows: records, split or columns")
+    categorical: bool = Field(False, description="Dictionary-encode low-cardinality columns of Arrow and Parquet output")
+
+
+class AnalyzeJobSpec(BaseModel):
+    """Per-column statistics of a stored dataset"""
+
+    type: Literal["analyze"]
+    dataset_id: str = Field(..., description="ID returned by /api/data/upload?store=true")
+    columns: Optional[List[str]] = Field(None, description="Only profile these columns")
+
+
+# Body of a job submission, by job type
+JobSpec = Annotated[Union[GenerateJobSpec, AnalyzeJobSpec], Field(discriminator="type")]
+
+
+def _get_job(jobs: JobQueue, job_id: str) -> Job:
+    """
+    Look up a job, answering 404 if it is unknown or has expired.
+
+    Args:
+        jobs: The job queue
+        job_id: The job's ID
+
+    Returns:
+        The job
+    """
+    try:
+        return jobs.get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+def _job_response(request: Request, job: Job, status_code: int = status.HTTP_200_OK) -> FastJSONResponse:
+    """
+    Describe a job, with the URLs to poll it and to download its result.
+
+    Args:
+        request: The FastAPI request object
+        job: The job
+        status_code: Status of the response
+
+    Returns:
+        JSON response with the job's state (and result, once it succeeded)
+    """
+    content = job.to_dict(include_result=True)
+    content["status_url"] = str(request.url_for("get_job", job_id=job.job_id))
+    content["result_url"] = str(request.url_for("get_job_result", job_id=job.job_id))
+    headers = {"Location": content["status_url"]} if status_code == status.HTTP_202_ACCEPTED else None
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def _progress(job: Job) -> Dict[str, Any]:
+    """
+    Get the progress event of a job.
+
+    Args:
+        job: The job
+
+    Returns:
+        The job's status and metrics (progress, rows, total_rows,
+        bytes_written, rows_per_second, eta_seconds) and error
+    """
+    return {"job_id": job.job_id, "status": job.status, **job.metrics(), "error": job.error}
+
+
+async def _watch_job(jobs: JobQueue, job_id: str) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Follow a job's progress until it finishes.
+
+    Args:
+        jobs: The job queue
+        job_id: The job's ID
+
+    Returns:
+        An async iterator of progress events, one whenever the job has
+        advanced (at most every JOB_PROGRESS_INTERVAL), with None as a
+        heartbeat after JOB_HEARTBEAT_SECONDS without any; it ends after the
+        event of the job's final state, or when the job is deleted
+    """
+    last_state = None
+    idle = 0.0
+    while True:
+        try:
+            job = jobs.get(job_id)
+        except JobNotFoundError:
+            return
+        state = (job.status, job.progress, job.rows, job.bytes_written)
+        if state != last_state:
+            last_state = state
+            idle = 0.0
+            yield _progress(job)
+            if job.done:
+                return
+        elif idle >= settings.JOB_HEARTBEAT_SECONDS:
+            idle = 0.0
+            yield None
+        await asyncio.sleep(settings.JOB_PROGRESS_INTERVAL)
+        idle += settings.JOB_PROGRESS_INTERVAL
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    request: Request,
+    jobs: JobQueueDep,
+    store: DatasetStoreDep,
+    spec: JobSpec = Body(..., description="The job: a generate or analyze spec")
+) -> FastJSONResponse:
+    """
+    Submit a generation or analysis job to run in the background.
+
+    The job is queued and the response returns right away with its ID;
+    poll its status URL for progress and download the result from its
+    result URL once it has succeeded. Jobs are persisted, so they survive
+    client disconnects and server restarts.
+
+    Args:
+        request: The FastAPI request object
+        jobs: The job queue
+        store: The dataset store (to check analyzed datasets)
+        spec: The job to run
+
+    Returns:
+        202 response with the queued job (see GET /api/jobs/{job_id})
+    """
+    if isinstance(spec, GenerateJobSpec):
+        validate_data_types(spec.data_types)
+        output_format = negotiate_format(spec.format, None)
+        orient = validate_orient(spec.orient, output_format)
+        # A fixed seed makes a job that is rerun after a restart produce the same table
+        seed = spec.seed if spec.seed is not None else secrets.randbits(63)
+        job_spec = spec.model_dump() | {"format": output_format, "orient": orient, "seed": seed}
+    else:
+        try:
+            dataset = store.get(spec.dataset_id)
+        except DatasetNotFoundError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+        missing = [column for column in spec.columns or [] if column not in dataset.columns]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Columns not found: {', '.join(missing)}"
+            )
+        job_spec = spec.model_dump()
+
+    job = jobs.submit(job_spec.pop("type"), job_spec)
+    return _job_response(request, job, status.HTTP_202_ACCEPTED)
+
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def list_jobs(jobs: JobQueueDep) -> Dict[str, Any]:
+    """
+    List the jobs.
+
+    Args:
+        jobs: The job queue
+
+    Returns:
+        The jobs, most recently submitted first (without their results), and job counts
+    """
+    return {
+        "jobs": [job.to_dict() for job in jobs.list()],
+        "queue": jobs.stats(),
+    }
+
+
+@router.get("/{job_id}", status_code=status.HTTP_200_OK)
+async def get_job(request: Request, jobs: JobQueueDep, job_id: str = JOB_ID) -> FastJSONResponse:
+    """
+    Get a job's status and progress.
+
+    Args:
+        request: The FastAPI request object
+        jobs: The job queue
+        job_id: The job's ID
+
+    Returns:
+        The job's state: status (queued, running, succeeded, failed or
+        cancelled), progress from 0 to 1, error, and its result once it succeeded
+    """
+    return _job_response(request, _get_job(jobs, job_id))
+
+
+@router.get("/{job_id}/events", status_code=status.HTTP_200_OK)
+async def stream_job_events(jobs: JobQueueDep, job_id: str = JOB_ID) -> StreamingResponse:
+    """
+    Stream a job's progress as Server-Sent Events.
+
+    A "progress" event is sent whenever the job advances, with its rows
+    done, bytes written, throughput and ETA; the stream ends with an event
+    named after the job's final state (succeeded, failed or cancelled).
+    Comments are sent as keep-alives while the job waits in the queue.
+
+    Args:
+        jobs: The job queue
+        job_id: The job's ID
+
+    Returns:
+        Streaming text/event-stream response
+    """
+    _get_job(jobs, job_id)
+
+    async def events() -> AsyncIterator[bytes]:
+        async for progress in _watch_job(jobs, job_id):
+            if progress is None:
+                yield b": keep-alive\n\n"
+                continue
+            event = progress["status"] if progress["status"] in FINAL_STATES else "progress"
+            yield b"event: " + event.encode('utf-8') + b"\ndata: " + dumps(progress) + b"\n\n"
+
+    # Proxies must pass events on as they come
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+@router.websocket("/{job_id}/ws")
+async def job_websocket(websocket: WebSocket, job_id: str) -> None:
+    """
+    Follow a job's progress over a WebSocket, and cancel it from there.
+
+    The server sends the same progress events as /events, as JSON text
+    messages, and closes the socket once the job has finished. Sending
+    {"action": "cancel"} cancels the job (see /cancel); the following
+    events show it stopping.
+
+    Args:
+        websocket: The WebSocket connection
+        job_id: The job's ID
+    """
+    jobs: JobQueue = websocket.app.state.jobs
+    await websocket.accept()
+    try:
+        jobs.get(job_id)
+    except JobNotFoundError as e:
+        await websocket.close(code=4404, reason=str(e))
+        return
+
+    updates = _watch_job(jobs, job_id)
+    receive = asyncio.ensure_future(websocket.receive_text())
+    update = asyncio.ensure_future(anext(updates))
+    try:
+        while True:
+            done, _ = await asyncio.wait({receive, update}, return_when=asyncio.FIRST_COMPLETED)
+            if receive in done:
+                try:
+                    message = loads(receive.result())
+                except ValueError:
+                    message = None
+                if isinstance(message, dict) and message.get("action") == "cancel":
+                    jobs.cancel(job_id)
+                else:
+                    await websocket.send_text(dumps({"error": 'Unknown message; send {"action": "cancel"}'}).decode('utf-8'))
+                receive = asyncio.ensure_future(websocket.receive_text())
+            if update in done:
+                try:
+                    progress = update.result()
+                except StopAsyncIteration:
+                    break
+                if progress is not None:
+                    await websocket.send_text(dumps(progress).decode('utf-8'))
+                update = asyncio.ensure_future(anext(updates))
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"Progress socket of job {job_id} closed by the client")
+    finally:
+        receive.cancel()
+        update.cancel()
+        await updates.aclose()
+
+
+@router.post("/{job_id}/cancel", status_code=status.HTTP_202_ACCEPTED)
+async def cancel_job(request: Request, jobs: JobQueueDep, job_id: str = JOB_ID) -> FastJSONResponse:
+    """
+    Cancel a job.
+
+    Queued jobs are cancelled at once; running jobs stop at their next
+    progress report, so their status may stay "running" for a moment.
+    Finished jobs are not changed.
+
+    Args:
+        request: The FastAPI request object
+        jobs: The job queue
+        job_id: The job's ID
+
+    Returns:
+        202 response with the job's state
+    """
+    try:
+        job = jobs.cancel(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return _job_response(request, job, status.HTTP_202_ACCEPTED)
+
+
+@router.delete("/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_job(jobs: JobQueueDep, job_id: str = JOB_ID) -> Response:
+    """
+    Delete a finished job and its result.
+
+    Args:
+        jobs: The job queue
+        job_id: The job's ID
+
+    Returns:
+        An empty response
+    """
+    try:
+        jobs.delete(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except JobActiveError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"{str(e)}; cancel it first")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get("/{job_id}/result", status_code=status.HTTP_200_OK)
+async def get_job_result(jobs: JobQueueDep, job_id: str = JOB_ID) -> Response:
+    """
+    Download a succeeded job's result.
+
+    Generated tables are served from their file with range support, so an
+    interrupted download can be resumed (Range header) instead of started over.
+
+    Args:
+        jobs: The job queue
+        job_id: The job's ID
+
+    Returns:
+        The result file, or the JSON result of jobs without a file
+    """
+    job = _get_job(jobs, job_id)
+    if job.status != SUCCEEDED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job {job_id} has no result: it is {job.status}"
+        )
+    path = jobs.result_path(job)
+    if path is None:
+        return FastJSONResponse(job.result)
+    return FileResponse(path, media_type=job.media_type, filename=job.filename)
@@ -0,0 +1,34 @@
+"""
+Prometheus metrics endpoint
+"""
+from fastapi import APIRouter, Request, status
+from fastapi.responses import PlainTextResponse
+
+from app.api.instrumentation import service_metrics
+from app.core.metrics import CONTENT_TYPE, REGISTRY
+
+
+# Create router for the metrics endpoint
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+)
+
+
+@router.get("", status_code=status.HTTP_200_OK, include_in_schema=False)
+async def get_metrics(request: Request) -> PlainTextResponse:
+    """
+    Export the application's metrics in the Prometheus text format.
+    
+    Request latencies by route and format, rows generated, bytes serialized
+    and upload bytes parsed are counted as they happen; executor, cache, job
+    and dataset store figures are read from the services at scrape time.
+    
+    Args:
+        request: The FastAPI request object
+        
+    Returns:
+        The metrics as text/plain (exposition format 0.0.4)
+    """
+    metrics = REGISTRY.metrics() + service_metrics(request.app.state)
+    return PlainTextResponse(REGISTRY.render(metrics), media_type=CONTENT_TYPE)
@@ -0,0 +1,218 @@
+"""
+Apache Arrow IPC and Parquet encoding of columnar tables
+"""
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.api.utils.column_generator import CategoricalColumn, ColumnarTable, vocabulary, vocabulary_type
+
+
+# Arrow type of each generated data type; everything else is a string column
+ARROW_TYPES = {
+    "integer": pa.int64(),
+    "float": pa.float64(),
+    "boolean": pa.bool_(),
+    "date": pa.date32(),
+}
+
+# End-of-stream marker of the Arrow IPC streaming format
+IPC_END_OF_STREAM = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+
+@lru_cache(maxsize=None)
+def arrow_vocabulary(data_type: str) -> pa.Array:
+    """
+    Convert (once) a vocabulary to an Arrow array of its column type.
+
+    Args:
+        data_type: Name of the vocabulary
+
+    Returns:
+        The vocabulary values, e.g. as date32 for "date"
+    """
+    return pa.array(vocabulary(data_type), type=pa.string()).cast(ARROW_TYPES.get(data_type, pa.string()))
+
+
+def _index_type(size: int) -> pa.DataType:
+    """
+    Smallest (signed) Arrow dictionary index type for a vocabulary size.
+    """
+    for index_type, limit in ((pa.int8(), 1 << 7), (pa.int16(), 1 << 15)):
+        if size <= limit:
+            return index_type
+    return pa.int32()
+
+
+def arrow_schema(headers: List[str], data_types: List[str], categorical: bool = False) -> pa.Schema:
+    """
+    Build the Arrow schema of a table from its headers and data types.
+
+    Args:
+        headers: Column headers
+        data_types: Data type of each column
+        categorical: Dictionary-encode the columns of vocabulary types
+
+    Returns:
+        The Arrow schema
+    """
+    fields = []
+    for header, data_type in zip(headers, data_types):
+        value_type = ARROW_TYPES.get(data_type, pa.string())
+        vocabulary_name = vocabulary_type(data_type)
+        if categorical and vocabulary_name is not None:
+            size = len(vocabulary(vocabulary_name))
+            value_type = pa.dictionary(_index_type(size), value_type)
+        fields.append(pa.field(header, value_type))
+    return pa.schema(fields)
+
+
+def to_record_batch(table: ColumnarTable, schema: pa.Schema) -> pa.RecordBatch:
+    """
+    Wrap the NumPy columns of a table as an Arrow record batch.
+
+    Numeric and boolean columns are converted without going through Python
+    objects. Vocabulary columns become dictionary arrays (codes plus the
+    shared vocabulary) for dictionary fields, and are otherwise decoded by
+    an Arrow take from the converted vocabulary.
+
+    Args:
+        table: The table to convert
+        schema: The table's Arrow schema (see arrow_schema)
+
+    Returns:
+        A record batch with the table's rows
+    """
+    arrays = []
+    for column, field in zip(table.columns, schema):
+        if isinstance(column, CategoricalColumn):
+            values = arrow_vocabulary(column.data_type)
+            if pa.types.is_dictionary(field.type):
+                indices = pa.array(column.codes.astype(field.type.index_type.to_pandas_dtype()))
+                arrays.append(pa.DictionaryArray.from_arrays(indices, values))
+            else:
+                arrays.append(values.take(pa.array(column.codes)))
+        elif pa.types.is_date32(field.type):
+            arrays.append(pa.array(column, type=pa.string()).cast(field.type))
+        else:
+            arrays.append(pa.array(np.asarray(column), type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def encode_ipc_schema(schema: pa.Schema, dictionaries: Optional[ColumnarTable] = None) -> bytes:
+    """
+    Encode the messages that open an Arrow IPC stream.
+
+    For schemas with dictionary fields, the dictionary batches follow the
+    schema message. Every record batch of the stream uses the same, full
+    vocabularies, so the dictionaries are only sent once.
+
+    Args:
+        schema: The stream's Arrow schema
+        dictionaries: Any chunk of the table (e.g. empty) to take the
+            vocabularies of dictionary fields from
+
+    Returns:
+        The encoded schema (and dictionary) messages
+    """
+    if dictionaries is None or not any(pa.types.is_dictionary(field.type) for field in schema):
+        return schema.serialize().to_pybytes()
+
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    # An empty record batch carries the dictionaries without any rows
+    writer.write_batch(to_record_batch(dictionaries.slice(0, 0), schema))
+    return sink.drain()
+
+
+def encode_ipc_batch(table: ColumnarTable, schema: pa.Schema) -> bytes:
+    """
+    Encode a table as one record batch message of an Arrow IPC stream.
+
+    Messages only depend on the schema (and, for dictionary fields, on the
+    full vocabularies sent by encode_ipc_schema), so batches can be encoded
+    independently (e.g. on worker processes) and concatenated between the
+    opening messages and IPC_END_OF_STREAM.
+
+    Args:
+        table: The rows to encode
+        schema: The stream's Arrow schema
+
+    Returns:
+        The encoded record batch message
+    """
+    return to_record_batch(table, schema).serialize().to_pybytes()
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back in chunks"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_parquet_batches(batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> Iterator[bytes]:
+    """
+    Encode record batches as a Parquet file, one row group per batch, as it is written.
+
+    Each row group is yielded as soon as it is encoded; the file footer
+    follows the last one. Empty batches add no row group (Parquet has no
+    empty row groups), so no rows at all make a file of just the schema.
+
+    Args:
+        batches: The chunks of rows to encode, in order
+        schema: The file's Arrow schema
+
+    Returns:
+        An iterator of Parquet byte chunks
+    """
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for batch in batches:
+            if not batch.num_rows:
+                continue
+            writer.write_table(pa.Table.from_batches([batch]), row_group_size=batch.num_rows)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_parquet(tables: Iterable[ColumnarTable], schema: pa.Schema) -> Iterator[bytes]:
+    """
+    Encode tables as a Parquet file, one row group per table (see iter_parquet_batches).
+
+    Args:
+        tables: The chunks of rows to encode, in order
+        schema: The file's Arrow schema
+
+    Returns:
+        An iterator of Parquet byte chunks
+    """
+    yield from iter_parquet_batches((to_record_batch(table, schema) for table in tables), schema)
@@ -0,0 +1,618 @@
+"""
+Vectorized column-at-a-time generation engine for tabular data
+"""
+import sys
+import string
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Tuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+# Preset vocabularies shared by the vectorized engine and the scalar generator
+FIRST_NAMES = ("John", "Jane", "Alice", "Bob", "Maria", "David", "Sarah", "Michael")
+LAST_NAMES = ("Smith", "Johnson", "Brown", "Lee", "Garcia", "Miller", "Davis", "Wilson")
+STREETS = ("Main St", "Oak Ave", "Park Rd", "Maple Ln", "Cedar Blvd")
+CITIES = ("Springfield", "Rivertown", "Oakville", "Maplewood", "Franklin")
+PRODUCT_ADJECTIVES = ("Premium", "Deluxe", "Basic", "Advanced", "Smart", "Ultra")
+PRODUCT_NOUNS = ("Widget", "Gadget", "Tool", "Device", "System", "Solution")
+EMAIL_DOMAINS = ("example.com", "test.org", "company.net", "mail.co")
+
+# Types whose values are drawn by index from a precomputed vocabulary; their
+# columns are stored as integer codes into the vocabulary (CategoricalColumn)
+VOCABULARY_TYPES = ("name", "address", "product", "date", "price", "sample")
+
+# Value ranges (inclusive) used by the generators
+INTEGER_RANGE = (1, 1000)
+FLOAT_RANGE = (1.0, 100.0)
+PRICE_RANGE = (9.99, 499.99)
+STREET_NUMBER_RANGE = (100, 999)
+SAMPLE_CODE_RANGE = (1000, 9999)
+DATE_START = np.datetime64("2020-01-01", "D")
+DATE_SPAN_DAYS = 1095  # Up to ~3 years from start date
+
+_STRING_ALPHABET = np.frombuffer((string.ascii_letters + " ").encode("ascii"), dtype=np.uint8)
+_LOWERCASE_ALPHABET = np.frombuffer(string.ascii_lowercase.encode("ascii"), dtype=np.uint8)
+
+
+@lru_cache(maxsize=None)
+def vocabulary(data_type: str) -> np.ndarray:
+    """
+    Build (once) the full set of values a vocabulary-based type can take.
+
+    Args:
+        data_type: One of the types listed in VOCABULARY_TYPES
+
+    Returns:
+        A unicode array with every possible value for the type
+    """
+    if data_type == "name":
+        values = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    elif data_type == "product":
+        values = [f"{adjective} {noun}" for adjective in PRODUCT_ADJECTIVES for noun in PRODUCT_NOUNS]
+    elif data_type == "address":
+        low, high = STREET_NUMBER_RANGE
+        values = [
+            f"{number} {street}, {city}"
+            for number in range(low, high + 1)
+            for street in STREETS
+            for city in CITIES
+        ]
+    elif data_type == "date":
+        return (DATE_START + np.arange(DATE_SPAN_DAYS + 1).astype("timedelta64[D]")).astype(str)
+    elif data_type == "price":
+        # Every whole-cent amount in range, formatted like f"${round(x, 2)}"
+        low, high = (round(bound * 100) for bound in PRICE_RANGE)
+        values = [f"${cents / 100}" for cents in range(low, high + 1)]
+    elif data_type == "sample":
+        low, high = SAMPLE_CODE_RANGE
+        values = [f"Sample-{code}" for code in range(low, high + 1)]
+    else:
+        raise ValueError(f"No vocabulary for data type: {data_type}")
+    return np.array(values)
+
+
+def vocabulary_type(data_type: str) -> Optional[str]:
+    """
+    The vocabulary a data type draws its values from.
+
+    Args:
+        data_type: A column data type
+
+    Returns:
+        The vocabulary name (unknown types use "sample"), or None for types
+        that are not generated from a vocabulary
+    """
+    if data_type in VOCABULARY_TYPES:
+        return data_type
+    if data_type in ("string", "integer", "float", "boolean", "email"):
+        return None
+    return "sample"
+
+
+@lru_cache(maxsize=None)
+def interned_vocabulary(data_type: str) -> Tuple[str, ...]:
+    """
+    The values of a vocabulary as interned Python strings, for scalar lookups.
+
+    Args:
+        data_type: One of the types listed in VOCABULARY_TYPES
+
+    Returns:
+        A tuple with every possible value for the type
+    """
+    return tuple(sys.intern(value) for value in vocabulary(data_type).tolist())
+
+
+def code_dtype(size: int) -> np.dtype:
+    """
+    Smallest unsigned integer type that can index a vocabulary.
+
+    Args:
+        size: Number of values in the vocabulary
+
+    Returns:
+        uint8, uint16 or uint32
+    """
+    for dtype in (np.uint8, np.uint16):
+        if size <= np.iinfo(dtype).max + 1:
+            return np.dtype(dtype)
+    return np.dtype(np.uint32)
+
+
+class CategoricalColumn:
+    """
+    Dictionary-encoded column: small integer codes into a shared vocabulary.
+
+    Behaves like the unicode array it encodes wherever NumPy expects an
+    array (``np.asarray``, slicing, ``tolist``), while encoders that know
+    about it format each vocabulary value once and index the result.
+    """
+
+    __slots__ = ("codes", "data_type")
+
+    def __init__(self, codes: np.ndarray, data_type: str):
+        self.codes = codes
+        self.data_type = data_type
+
+    @property
+    def categories(self) -> np.ndarray:
+        """The vocabulary the codes index into"""
+        return vocabulary(self.data_type)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Dtype of the decoded values"""
+        return self.categories.dtype
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the codes (the vocabulary is shared)"""
+        return self.codes.nbytes
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, key: Any) -> Union["CategoricalColumn", str]:
+        codes = self.codes[key]
+        if np.ndim(codes) == 0:
+            return self.categories[codes]
+        return CategoricalColumn(codes, self.data_type)
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        values = self.decode()
+        return values if dtype is None else values.astype(dtype)
+
+    def decode(self) -> np.ndarray:
+        """
+        Materialize the column's values.
+
+        Returns:
+            A unicode array with one value per code
+        """
+        return self.categories.take(self.codes)
+
+    def tolist(self) -> List[str]:
+        """
+        The column's values as (interned) Python strings.
+
+        Returns:
+            A list with one value per code
+        """
+        pool = interned_vocabulary(self.data_type)
+        return [pool[code] for code in self.codes.tolist()]
+
+    @staticmethod
+    def concatenate(parts: List["CategoricalColumn"]) -> "CategoricalColumn":
+        """
+        Join columns over the same vocabulary end to end.
+
+        Args:
+            parts: The columns to join
+
+        Returns:
+            One column with the codes of all parts
+        """
+        return CategoricalColumn(np.concatenate([part.codes for part in parts]), parts[0].data_type)
+
+
+# A generated column: a plain NumPy array or a dictionary-encoded vocabulary column
+Column = Union[np.ndarray, CategoricalColumn]
+
+
+def _random_letters(
+    rng: np.random.Generator,
+    size: int,
+    alphabet: np.ndarray,
+    min_length: int,
+    max_length: int
+) -> np.ndarray:
+    """
+    Draw a (size, max_length) matrix of random characters from an alphabet.
+
+    Positions past each row's random length are zeroed, so a fixed-width
+    string view of a row ends where its string ends.
+
+    Returns:
+        A uint8 character matrix
+    """
+    chars = alphabet.take(rng.integers(0, len(alphabet), size=(size, max_length), dtype=np.uint8))
+    lengths = rng.integers(min_length, max_length + 1, size=size, dtype=np.uint8)
+    chars *= np.arange(max_length, dtype=np.uint8) < lengths[:, None]
+    return chars
+
+
+def _strip_spaces(chars: np.ndarray) -> np.ndarray:
+    """
+    Strip leading and trailing spaces from every row of a character matrix.
+
+    Only the (few) rows that start or end with a space are rewritten.
+
+    Returns:
+        The same matrix, with stripped rows left-aligned and zero-padded
+    """
+    width = chars.shape[1]
+    space = ord(" ")
+    last_index = np.count_nonzero(chars, axis=1) - 1
+    ends = chars[np.arange(len(chars)), np.maximum(last_index, 0)]
+    rows = np.flatnonzero((chars[:, 0] == space) | (ends == space))
+    if len(rows) == 0:
+        return chars
+
+    subset = chars[rows]
+    solid = (subset != 0) & (subset != space)
+    first = solid.argmax(axis=1)
+    last = width - 1 - solid[:, ::-1].argmax(axis=1)
+    positions = first[:, None] + np.arange(width)
+    stripped = np.take_along_axis(subset, np.minimum(positions, width - 1), axis=1)
+    stripped[(positions > last[:, None]) | ~solid.any(axis=1)[:, None]] = 0
+    chars[rows] = stripped
+    return chars
+
+
+def _as_strings(chars: np.ndarray) -> np.ndarray:
+    """
+    View a zero-padded ASCII character matrix as a unicode string array.
+
+    Returns:
+        A ``U`` array with one string per matrix row
+    """
+    return chars.astype(np.uint32).view(f"U{chars.shape[1]}").reshape(len(chars))
+
+
+class ColumnarTable:
+    """Column-oriented table: one header and one NumPy array (or CategoricalColumn) per column"""
+
+    def __init__(self, headers: List[str], data_types: List[str], columns: List[Column]):
+        self.headers = headers
+        self.data_types = data_types
+        self.columns = columns
+
+    @property
+    def num_rows(self) -> int:
+        """Number of data rows in the table"""
+        return len(self.columns[0]) if self.columns else 0
+
+    @property
+    def num_cols(self) -> int:
+        """Number of columns in the table"""
+        return len(self.columns)
+
+    def slice(self, start: int, stop: int) -> "ColumnarTable":
+        """
+        Select a contiguous range of rows (without copying the column data).
+
+        Args:
+            start: Index of the first row
+            stop: Index one past the last row
+
+        Returns:
+            A ColumnarTable viewing the selected rows
+        """
+        return ColumnarTable(self.headers, self.data_types, [column[start:stop] for column in self.columns])
+
+    def iter_rows(self):
+        """
+        Iterate over the data rows as tuples of native Python values.
+
+        Returns:
+            An iterator of row tuples
+        """
+        return zip(*(column.tolist() for column in self.columns))
+
+    def to_rows(self, include_headers: bool = True) -> List[List[Any]]:
+        """
+        Convert the table to the row-oriented list-of-lists layout.
+
+        Args:
+            include_headers: Whether to include the header row
+
+        Returns:
+            A list of lists representing the table data
+        """
+        table = [list(self.headers)] if include_headers else []
+        table.extend(list(row) for row in self.iter_rows())
+        return table
+
+    def to_dataframe(self, categorical: bool = False) -> pd.DataFrame:
+        """
+        Convert the table to a pandas DataFrame.
+
+        Args:
+            categorical: Keep vocabulary columns dictionary-encoded as
+                pandas Categorical (codes plus categories) instead of
+                materializing their strings
+
+        Returns:
+            A DataFrame with one column per header
+        """
+        data = {}
+        for header, column in zip(self.headers, self.columns):
+            if isinstance(column, CategoricalColumn):
+                if categorical:
+                    data[header] = pd.Categorical.from_codes(column.codes.astype(np.int32), column.categories)
+                else:
+                    data[header] = column.decode()
+            else:
+                data[header] = column
+        return pd.DataFrame(data, columns=self.headers)
+
+
+class ColumnGenerator:
+    """Vectorized generator that builds whole columns with NumPy"""
+
+    @classmethod
+    def generate_column(cls, data_type: str, num_rows: int, rng: np.random.Generator) -> Column:
+        """
+        Generate a full column of random values for the specified data type.
+
+        Args:
+            data_type: The type of data to generate
+            num_rows: Number of values to generate
+            rng: NumPy random generator to draw from
+
+        Returns:
+            A column with ``num_rows`` values of the specified type: a NumPy
+            array, or a CategoricalColumn for the VOCABULARY_TYPES
+        """
+        if data_type == "string":
+            chars = _random_letters(rng, num_rows, _STRING_ALPHABET, 5, 15)
+            return _as_strings(_strip_spaces(chars))
+
+        elif data_type == "integer":
+            low, high = INTEGER_RANGE
+            return rng.integers(low, high + 1, size=num_rows)
+
+        elif data_type == "float":
+            low, high = FLOAT_RANGE
+            return np.round(rng.uniform(low, high, size=num_rows), 2)
+
+        elif data_type == "boolean":
+            return rng.integers(0, 2, size=num_rows, dtype=np.uint8).astype(bool)
+
+        elif data_type == "email":
+            usernames = _as_strings(_random_letters(rng, num_rows, _LOWERCASE_ALPHABET, 5, 10))
+            domains = np.array([f"@{domain}" for domain in EMAIL_DOMAINS])
+            return np.char.add(usernames, domains[rng.integers(0, len(domains), size=num_rows)])
+
+        else:
+            # Unknown types default to "Sample-NNNN" strings
+            vocabulary_name = vocabulary_type(data_type)
+            size = len(vocabulary(vocabulary_name))
+            codes = rng.integers(0, size, size=num_rows).astype(code_dtype(size))
+            return CategoricalColumn(codes, vocabulary_name)
+
+    @classmethod
+    def generate_headers(
+        cls,
+        data_types: List[str],
+        column_names: Dict[str, List[str]],
+        rng: np.random.Generator
+    ) -> List[str]:
+        """
+        Pick a unique column header for each data type.
+
+        Args:
+            data_types: Data type of each column
+            column_names: Candidate column names by data type
+            rng: NumPy random generator to draw from
+
+        Returns:
+            A list of column headers
+        """
+        headers = []
+        for i, dtype in enumerate(data_types):
+            if dtype in column_names:
+                candidates = column_names[dtype]
+                column_name = candidates[rng.integers(0, len(candidates))]
+                # Avoid duplicate column names
+                while column_name in headers:
+                    column_name = f"{column_name}_{i+1}"
+                headers.append(column_name)
+            else:
+                headers.append(f"column_{i+1}")
+        return headers
+
+    @classmethod
+    def generate_table(
+        cls,
+        num_rows: int,
+        data_types: List[str],
+        headers: List[str],
+        rng: np.random.Generator
+    ) -> ColumnarTable:
+        """
+        Generate every column of a table, one column at a time.
+
+        Args:
+            num_rows: Number of data rows to generate
+            data_types: Data type of each column
+            headers: Column headers
+            rng: NumPy random generator to draw from
+
+        Returns:
+            The generated ColumnarTable
+        """
+        columns = [cls.generate_column(dtype, num_rows, rng) for dtype in data_types]
+        return ColumnarTable(list(headers), list(data_types), columns)
+
+
+class TableSpec:
+    """Recipe for a generated table: schema, row count and seed"""
+
+    # Rows are generated in fixed-size blocks. Every (column, block) pair has
+    # its own random stream, so any range of rows or subset of columns can be
+    # generated on its own, in any order, and always with the same values.
+    BLOCK_ROWS = 8192
+
+    def __init__(
+        self,
+        headers: List[str],
+        data_types: List[str],
+        num_rows: int,
+        entropy: int
+    ):
+        self.headers = list(headers)
+        self.data_types = list(data_types)
+        self.num_rows = num_rows
+        self.entropy = entropy
+        self._column_keys = {}
+
+    @property
+    def num_cols(self) -> int:
+        """Number of columns in the table"""
+        return len(self.data_types)
+
+    @property
+    def num_blocks(self) -> int:
+        """Number of generation blocks in the table"""
+        return -(-self.num_rows // self.BLOCK_ROWS)
+
+    @staticmethod
+    def schema_rng(entropy: int) -> np.random.Generator:
+        """
+        Random generator used to pick a spec's data types and headers.
+
+        Args:
+            entropy: Seed entropy of the spec
+
+        Returns:
+            A NumPy random generator independent of the data streams
+        """
+        return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(0,)))
+
+    def column_rng(self, column: int, block: int) -> np.random.Generator:
+        """
+        Counter-based random stream for the values of one column in one block.
+
+        The Philox key is derived from the spec's seed and the column index;
+        the block index selects a disjoint range of the counter space.
+
+        Args:
+            column: Index of the column
+            block: Index of the block
+
+        Returns:
+            A NumPy random generator positioned at the start of the block
+        """
+        key = self._column_keys.get(column)
+        if key is None:
+            key = np.random.SeedSequence(self.entropy, spawn_key=(1, column)).generate_state(2, np.uint64)
+            self._column_keys[column] = key
+        counter = np.array([0, block, 0, 0], dtype=np.uint64)
+        return np.random.Generator(np.random.Philox(key=key, counter=counter))
+
+    def generate_blocks(
+        self,
+        first_block: int,
+        stop_block: int,
+        columns: Optional[List[int]] = None
+    ) -> ColumnarTable:
+        """
+        Generate a contiguous range of blocks as one table.
+
+        Args:
+            first_block: Index of the first block to generate
+            stop_block: Index one past the last block to generate
+            columns: Indices of the columns to generate (default all)
+
+        Returns:
+            A ColumnarTable with the rows of the blocks
+        """
+        if columns is None:
+            columns = range(self.num_cols)
+        blocks = range(first_block, min(stop_block, self.num_blocks))
+        sizes = [min(self.BLOCK_ROWS, self.num_rows - block * self.BLOCK_ROWS) for block in blocks]
+
+        arrays = []
+        for column in columns:
+            dtype = self.data_types[column]
+            parts = [
+                ColumnGenerator.generate_column(dtype, size, self.column_rng(column, block))
+                for block, size in zip(blocks, sizes)
+            ]
+            if not parts:
+                parts = [ColumnGenerator.generate_column(dtype, 0, self.column_rng(column, 0))]
+            if len(parts) == 1:
+                arrays.append(parts[0])
+            elif isinstance(parts[0], CategoricalColumn):
+                arrays.append(CategoricalColumn.concatenate(parts))
+            else:
+                arrays.append(np.concatenate(parts))
+        return ColumnarTable(
+            [self.headers[column] for column in columns],
+            [self.data_types[column] for column in columns],
+            arrays,
+        )
+
+    def generate_rows(self, start: int, stop: int, columns: Optional[List[int]] = None) -> ColumnarTable:
+        """
+        Generate any range of rows without generating the rows before it.
+
+        Only the blocks overlapping the range are generated, so the cost is
+        proportional to the size of the range, not to its position.
+
+        Args:
+            start: Index of the first row
+            stop: Index one past the last row
+            columns: Indices of the columns to generate (default all)
+
+        Returns:
+            A ColumnarTable with rows ``start`` to ``stop - 1``
+        """
+        start = max(0, min(start, self.num_rows))
+        stop = max(start, min(stop, self.num_rows))
+        first_block = start // self.BLOCK_ROWS
+        stop_block = -(-stop // self.BLOCK_ROWS)
+        offset = first_block * self.BLOCK_ROWS
+        table = self.generate_blocks(first_block, stop_block, columns)
+        return table.slice(start - offset, stop - offset)
+
+    def generate(self) -> ColumnarTable:
+        """
+        Generate the whole table in one go.
+
+        Returns:
+            The generated ColumnarTable
+        """
+        return self.generate_blocks(0, self.num_blocks)
+
+    def chunk_blocks(self, chunk_rows: int) -> int:
+        """
+        Number of whole blocks in a chunk of (at least one block and) about ``chunk_rows`` rows.
+
+        Args:
+            chunk_rows: Requested rows per chunk
+
+        Returns:
+            Blocks per chunk
+        """
+        return max(1, round(chunk_rows / self.BLOCK_ROWS))
+
+    def iter_block_ranges(self, chunk_rows: int) -> Iterator[Tuple[int, int]]:
+        """
+        Split the table's blocks into consecutive chunks.
+
+        Args:
+            chunk_rows: Requested rows per chunk (rounded to whole blocks)
+
+        Returns:
+            An iterator of (first_block, stop_block) pairs
+        """
+        step = self.chunk_blocks(chunk_rows)
+        for first_block in range(0, self.num_blocks, step):
+            yield first_block, min(first_block + step, self.num_blocks)
+
+    def iter_chunks(self, chunk_rows: int) -> Iterator[ColumnarTable]:
+        """
+        Generate the table lazily as consecutive chunks of whole blocks.
+
+        Args:
+            chunk_rows: Requested rows per chunk (rounded to whole blocks)
+
+        Returns:
+            An iterator of ColumnarTable chunks
+        """
+        for first_block, stop_block in self.iter_block_ranges(chunk_rows):
+            yield self.generate_blocks(first_block, stop_block)
@@ -0,0 +1,214 @@
+"""
+Negotiated streaming compression (zstd, brotli, gzip) of response bodies
+"""
+import zlib
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+from app.api.utils.table_processor import TableProcessor
+from app.api.utils.text_encoding import encode_csv_rows, encode_json_records
+
+
+logger = logging.getLogger("app")
+
+# Supported content codings in order of preference (best ratio and speed first)
+ENCODINGS = [
+    encoding for encoding, available in (
+        ("zstd", zstandard is not None),
+        ("br", brotli is not None),
+        ("gzip", True),
+    ) if available
+]
+
+# Levels used when a format has no level configured for an encoding
+DEFAULT_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+
+# Size and training corpus of the vocabulary zstd dictionary
+ZSTD_DICTIONARY_SIZE = 64 * 1024
+_DICTIONARY_TRAINING_TABLES = 64
+_DICTIONARY_TABLE_ROWS = 512
+_DICTIONARY_SAMPLE_ROWS = 16
+
+
+def parse_accept_encoding(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """
+    Parse an Accept-Encoding header into codings and their quality values.
+
+    Args:
+        accept_encoding: The header value
+
+    Returns:
+        Dictionary of lower-cased codings to q-values (1.0 when not given)
+    """
+    qualities = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities
+
+
+class StreamEncoder:
+    """A negotiated content coding for one response, with its level and optional dictionary"""
+
+    def __init__(self, encoding: str, level: int, dictionary: Optional["zstandard.ZstdCompressionDict"] = None):
+        """
+        Args:
+            encoding: Content coding ("zstd", "br" or "gzip")
+            level: Compression level on the coding's own scale
+            dictionary: Pre-trained zstd dictionary (zstd only)
+        """
+        self.encoding = encoding
+        self.level = level
+        self.dictionary = dictionary
+
+    @property
+    def cache_token(self) -> Tuple[str, int, Optional[int]]:
+        """Identifies the compressed representation, for cache keys and ETags"""
+        return (self.encoding, self.level, self.dictionary.dict_id() if self.dictionary else None)
+
+    def _compressor(self):
+        if self.encoding == "zstd":
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionary)
+            return compressor.compressobj()
+        if self.encoding == "br":
+            return brotli.Compressor(quality=self.level)
+        return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def iter_compressed(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Compress a stream of chunks, flushing after each one.
+
+        Flushing keeps the stream incremental: every compressed chunk can be
+        decoded as soon as it arrives, at a small cost in ratio.
+
+        Args:
+            chunks: The uncompressed chunks
+
+        Returns:
+            An iterator of compressed chunks
+        """
+        compressor = self._compressor()
+        for chunk in chunks:
+            if self.encoding == "zstd":
+                data = compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            elif self.encoding == "br":
+                data = compressor.process(chunk) + compressor.flush()
+            else:
+                data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.finish() if self.encoding == "br" else compressor.flush()
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compress a complete body.
+
+        Args:
+            data: The uncompressed body
+
+        Returns:
+            The compressed body
+        """
+        if self.encoding == "zstd":
+            return zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionary).compress(data)
+        if self.encoding == "br":
+            return brotli.compress(data, quality=self.level)
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+
+def negotiate_encoding(
+    accept_encoding: Optional[str],
+    levels: Dict[str, int],
+    dictionary_id: Optional[str] = None
+) -> Optional[StreamEncoder]:
+    """
+    Pick the content coding of a response from the client's Accept-Encoding.
+
+    The coding with the highest q-value wins; ties go to the order of
+    ENCODINGS. The vocabulary zstd dictionary is only used when the client
+    names it, since generic zstd decoders cannot read dictionary frames.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+        levels: Compression level by coding for the response's format
+        dictionary_id: Dictionary ID the client announced it has, if any
+
+    Returns:
+        The negotiated encoder, or None to send the body uncompressed
+    """
+    qualities = parse_accept_encoding(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+    candidates = [
+        (qualities.get(encoding, wildcard), -rank, encoding)
+        for rank, encoding in enumerate(ENCODINGS)
+    ]
+    quality, _, encoding = max(candidates)
+    if quality <= 0:
+        return None
+
+    level = levels.get(encoding, DEFAULT_LEVELS[encoding])
+    dictionary = None
+    if encoding == "zstd" and dictionary_id is not None:
+        trained = zstd_dictionary()
+        if dictionary_id == str(trained.dict_id()):
+            dictionary = trained
+    return StreamEncoder(encoding, level, dictionary)
+
+
+def _dictionary_samples() -> List[bytes]:
+    """
+    Build a training corpus of small CSV and NDJSON snippets of generated tables.
+
+    The tables draw their schemas and values from the TableProcessor
+    vocabularies, so the trained dictionary holds the names, streets,
+    products and column headers that dominate real responses.
+
+    Returns:
+        The training samples
+    """
+    samples = []
+    for seed in range(_DICTIONARY_TRAINING_TABLES):
+        table = TableProcessor.generate_table(num_rows=_DICTIONARY_TABLE_ROWS, num_cols=10, seed=seed)
+        for start in range(0, table.num_rows, _DICTIONARY_SAMPLE_ROWS):
+            chunk = table.slice(start, start + _DICTIONARY_SAMPLE_ROWS)
+            samples.append(encode_csv_rows(chunk.columns).encode("utf-8"))
+            samples.append("\n".join(encode_json_records(chunk.headers, chunk.columns)).encode("utf-8"))
+    return samples
+
+
+@lru_cache(maxsize=None)
+def zstd_dictionary() -> "zstandard.ZstdCompressionDict":
+    """
+    Train (once) the zstd dictionary of the generator vocabularies.
+
+    Training is deterministic, so every worker process arrives at the same
+    dictionary and dictionary ID.
+
+    Returns:
+        The trained dictionary
+    """
+    dictionary = zstandard.train_dictionary(ZSTD_DICTIONARY_SIZE, _dictionary_samples())
+    logger.info(f"Trained zstd vocabulary dictionary {dictionary.dict_id()} ({len(dictionary.as_bytes())} bytes)")
+    return dictionary
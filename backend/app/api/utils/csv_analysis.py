@@ -0,0 +1,625 @@
+"""
+Bounded-memory analysis of CSV uploads, one chunk of rows at a time
+"""
+import io
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from app.api.utils.parallel import get_process_pool, map_ordered
+from app.api.utils.profiling import TableProfile
+from app.api.utils.type_sniffing import (
+    FALSE_VALUES,
+    NULL_VALUES,
+    SNIFF_ROWS,
+    TRUE_VALUES,
+    TypeMismatchError,
+    arrow_schema,
+    convert_batch,
+    read_types,
+    sniff_csv_types,
+)
+
+
+# Number of rows reported in the sample of an analysis
+SAMPLE_ROWS = 5
+
+# Dtype read_csv infers for text columns ("str" with pandas 3, "object" before)
+TEXT_DTYPE = str(pd.read_csv(io.StringIO("text\nvalue\n"))["text"].dtype)
+
+# Size of the byte ranges analyzed by each worker process
+DEFAULT_RANGE_BYTES = 16 * 1024 * 1024
+
+# Bytes of CSV the typed parser converts per record batch
+DEFAULT_BLOCK_BYTES = 4 * 1024 * 1024
+
+# Memory of the RangeIndex pandas gives a parsed table (independent of its length)
+_INDEX_MEMORY = int(pd.RangeIndex(0).memory_usage())
+
+
+class UnknownColumnsError(ValueError):
+    """Raised when columns selected for an analysis are not in the file"""
+
+    def __init__(self, missing: List[str]):
+        super().__init__(f"Columns not found: {', '.join(missing)}")
+        self.missing = missing
+
+
+class ColumnType:
+    """
+    Running dtype of one column, promoted as chunks are added.
+
+    Mirrors the inference pandas applies to a whole file: integers with
+    missing values or mixed with floats become float64, booleans with
+    missing values become object, and any other mix of kinds is text.
+    """
+
+    __slots__ = ("kind", "dtype", "has_nulls", "text_dtype")
+
+    def __init__(self):
+        # None (no values yet), "bool", "number" or "text"
+        self.kind: Optional[str] = None
+        self.dtype: Optional[np.dtype] = None
+        self.has_nulls = False
+        self.text_dtype = TEXT_DTYPE
+
+    def update(self, series: pd.Series) -> None:
+        """
+        Promote the type with one chunk of the column.
+
+        Args:
+            series: The column's values in the chunk
+        """
+        self.merge(ColumnType.of(series))
+
+    @classmethod
+    def of(cls, series: pd.Series) -> "ColumnType":
+        """
+        Get the type of one chunk of a column.
+
+        Args:
+            series: The column's values in the chunk
+
+        Returns:
+            The chunk's column type
+        """
+        column_type = cls()
+        nulls = series.isna()
+        column_type.has_nulls = bool(nulls.any())
+        if nulls.all():
+            # No values (or an empty chunk): nothing to infer from
+            return column_type
+
+        dtype = series.dtype
+        if dtype.kind == "b" or (dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "boolean"):
+            # Booleans with missing values are parsed as objects
+            column_type.kind = "bool"
+        elif dtype.kind in "iuf":
+            column_type.kind = "number"
+            column_type.dtype = dtype
+        else:
+            column_type.kind = "text"
+            column_type.text_dtype = str(dtype)
+        return column_type
+
+    def merge(self, other: "ColumnType") -> None:
+        """
+        Combine with the type of the same column in another part of the file.
+
+        Args:
+            other: The other part's type
+        """
+        self.has_nulls = self.has_nulls or other.has_nulls
+        if other.kind is None:
+            return
+        if other.kind == "text":
+            self.text_dtype = other.text_dtype
+        if self.kind is None or self.kind == other.kind:
+            self.kind = other.kind
+            if other.kind == "number":
+                self.dtype = other.dtype if self.dtype is None else np.result_type(self.dtype, other.dtype)
+        else:
+            self.kind = "text"
+
+    @property
+    def name(self) -> str:
+        """Name of the column's dtype over every chunk seen, as pandas reports it"""
+        if self.kind is None:
+            return "float64"
+        if self.kind == "bool":
+            return "object" if self.has_nulls else "bool"
+        if self.kind == "number":
+            if self.has_nulls and self.dtype.kind in "iu":
+                return "float64"
+            return str(self.dtype)
+        return self.text_dtype
+
+    @property
+    def arrow_type(self) -> pa.DataType:
+        """Arrow type that holds the column's values over every chunk seen"""
+        if self.kind == "bool":
+            # Arrow booleans are nullable, unlike NumPy ones
+            return pa.bool_()
+        if self.kind == "text":
+            return pa.string()
+        return pa.from_numpy_dtype(np.dtype(self.name))
+
+
+class CsvAnalyzer:
+    """
+    Running statistics of a CSV file fed one parsed chunk at a time.
+
+    Only the aggregates (row count, column types, memory estimate, and
+    optionally a TableProfile of per-column statistics) and the first rows
+    are kept, so memory stays bounded by the chunk size however large the
+    file is.
+    """
+
+    def __init__(self, profile: bool = False):
+        """
+        Args:
+            profile: Also compute per-column statistics (see TableProfile)
+        """
+        self.profile = TableProfile() if profile else None
+        self.columns: Optional[List[str]] = None
+        self.row_count = 0
+        self.column_types: List[ColumnType] = []
+        self.empty_types: List[str] = []
+        self.column_memory = 0
+        self.sample: Optional[pd.DataFrame] = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Add one chunk of parsed rows.
+
+        Args:
+            chunk: The next rows of the file, with the file's columns
+        """
+        if self.columns is None:
+            self.columns = chunk.columns.tolist()
+            self.column_types = [ColumnType() for _ in self.columns]
+            self.empty_types = [str(dtype) for dtype in chunk.dtypes]
+        if self.sample is None or len(self.sample) < SAMPLE_ROWS:
+            head = chunk.head(SAMPLE_ROWS)
+            self.sample = head if self.sample is None else pd.concat([self.sample, head]).head(SAMPLE_ROWS)
+
+        self.row_count += len(chunk)
+        self.column_memory += int(chunk.memory_usage(index=False, deep=True).sum())
+        for column_type, (_, series) in zip(self.column_types, chunk.items()):
+            column_type.update(series)
+        if self.profile is not None:
+            self.profile.update(chunk)
+
+    def merge(self, other: "CsvAnalyzer") -> None:
+        """
+        Combine with the statistics of the rows that follow in the same file.
+
+        Args:
+            other: Statistics of the next part of the file, with the same columns
+        """
+        if other.columns is None:
+            return
+        if self.columns is None:
+            self.columns = other.columns
+            self.column_types = [ColumnType() for _ in other.columns]
+            self.empty_types = other.empty_types
+        if other.sample is not None and (self.sample is None or len(self.sample) < SAMPLE_ROWS):
+            head = other.sample
+            self.sample = head if self.sample is None else pd.concat([self.sample, head]).head(SAMPLE_ROWS)
+
+        self.row_count += other.row_count
+        self.column_memory += other.column_memory
+        for column_type, other_type in zip(self.column_types, other.column_types):
+            column_type.merge(other_type)
+        if self.profile is not None and other.profile is not None:
+            self.profile.merge(other.profile)
+
+    def text_dtypes(self) -> Dict[str, str]:
+        """
+        Get the columns whose values, over every chunk seen, are text.
+
+        Returns:
+            Dictionary of column names to their text dtype, for read_csv
+        """
+        return {
+            name: column_type.text_dtype
+            for name, column_type in zip(self.columns or [], self.column_types)
+            if column_type.kind == "text"
+        }
+
+    def arrow_schema(self) -> pa.Schema:
+        """
+        Get the Arrow schema of the file, with the column types over every chunk seen.
+
+        Returns:
+            The schema, for storing the parsed file (see write_csv_dataset)
+        """
+        return pa.schema([
+            pa.field(name, column_type.arrow_type)
+            for name, column_type in zip(self.columns or [], self.column_types)
+        ])
+
+    def result(self, sample: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """
+        Build the statistics of every chunk added so far.
+
+        Args:
+            sample: The first rows re-parsed with the final text columns as
+                text; defaults to the first rows as parsed in their chunk
+
+        Returns:
+            Dictionary with the row and column counts, column names and types,
+            an estimate of the memory of the whole parsed table and the first
+            rows, as analyze_csv reports them, plus the per-column statistics
+            under "profile" when profiling
+        """
+        columns = self.columns or []
+        if self.row_count:
+            types = [column_type.name for column_type in self.column_types]
+        else:
+            types = self.empty_types
+        stats = {
+            "row_count": self.row_count,
+            "column_count": len(columns),
+            "columns": columns,
+            "column_types": dict(zip(columns, types)),
+            "memory_usage": self.column_memory + _INDEX_MEMORY,
+            "sample_rows": self._sample_records(self.sample if sample is None else sample, types),
+        }
+        if self.profile is not None:
+            stats["profile"] = self.profile.result()
+        return stats
+
+    @staticmethod
+    def _sample_records(sample: Optional[pd.DataFrame], types: List[str]) -> List[Dict[str, Any]]:
+        """
+        Convert the first rows to records, cast to the final column types.
+        """
+        if sample is None:
+            return []
+        sample = sample.copy()
+        for (name, series), dtype in zip(list(sample.items()), types):
+            if str(series.dtype) != dtype and dtype in ("float64", "object"):
+                sample[name] = series.astype(dtype)
+        return sample.to_dict(orient="records")
+
+
+def split_csv_records(file: IO[bytes], range_bytes: int) -> Tuple[bytes, Iterator[bytes]]:
+    """
+    Split a CSV file into its header and byte ranges that end on record boundaries.
+
+    A newline only ends a record outside quoted fields, i.e. when the
+    number of quote characters before it is even (escaped quotes come in
+    pairs, so they keep the parity). Each range is cut at its last newline
+    with even quote parity and the remainder carried over to the next one,
+    so quoted fields with embedded newlines are never split.
+
+    Args:
+        file: Binary file object positioned at the start of the CSV
+        range_bytes: Approximate size of each range
+
+    Returns:
+        The header record and an iterator of record-aligned ranges, in file order
+    """
+    header = b""
+    while True:
+        line = file.readline()
+        header += line
+        if not line or header.count(b'"') % 2 == 0:
+            break
+
+    def ranges() -> Iterator[bytes]:
+        carry = b""
+        while True:
+            block = file.read(range_bytes)
+            if not block:
+                break
+            data = carry + block
+            # The carried-over remainder always starts at a record boundary
+            quotes = data.count(b'"')
+            search = len(data)
+            while True:
+                newline = data.rfind(b"\n", 0, search)
+                if newline < 0:
+                    cut = 0
+                    break
+                quotes -= data.count(b'"', newline + 1, search)
+                search = newline
+                if quotes % 2 == 0:
+                    cut = newline + 1
+                    break
+            if cut:
+                yield data[:cut]
+            carry = data[cut:]
+        if carry:
+            yield carry
+
+    return header, ranges()
+
+
+def _analyze_csv_range(
+    header: bytes,
+    data: bytes,
+    chunk_rows: int,
+    profile: bool,
+    usecols: Optional[List[str]] = None
+) -> CsvAnalyzer:
+    """
+    Analyze one range of records (module-level so worker processes can run it).
+
+    Args:
+        header: The file's header record
+        data: Whole records of the file
+        chunk_rows: Number of rows parsed at a time
+        profile: Also compute per-column statistics
+        usecols: Only parse these columns
+
+    Returns:
+        The range's partial statistics, to be merged in file order
+    """
+    analyzer = CsvAnalyzer(profile)
+    with pd.read_csv(io.BytesIO(header + data), chunksize=chunk_rows, usecols=usecols, encoding="utf-8") as reader:
+        for chunk in reader:
+            analyzer.update(chunk)
+    return analyzer
+
+
+def write_csv_dataset(
+    file: IO[bytes],
+    path: str,
+    analyzer: CsvAnalyzer,
+    chunk_rows: int,
+    usecols: Optional[List[str]] = None,
+    max_rows: Optional[int] = None
+) -> None:
+    """
+    Parse a CSV file again, chunk by chunk, into an Arrow IPC (Feather v2) file.
+
+    The analysis of the whole file fixes the column types up front, so every
+    chunk is converted to the same schema (e.g. integers of a column that
+    later has missing values are stored as floats). The file is written
+    uncompressed, so it can be memory-mapped and read without copies.
+
+    Args:
+        file: Binary file object positioned at the start of the CSV
+        path: Path of the Arrow file to write
+        analyzer: Statistics of the whole CSV (for its column types)
+        chunk_rows: Number of rows parsed and written at a time
+        usecols: Only store these columns (as analyzed)
+        max_rows: Only store the first rows (as analyzed)
+    """
+    schema = analyzer.arrow_schema()
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        with pd.read_csv(
+            file,
+            chunksize=chunk_rows,
+            dtype=analyzer.text_dtypes(),
+            usecols=usecols,
+            nrows=max_rows,
+            encoding="utf-8"
+        ) as reader:
+            for chunk in reader:
+                writer.write_table(pa.Table.from_pandas(chunk, preserve_index=False).cast(schema))
+
+
+def analyze_csv_typed(
+    file: IO[bytes],
+    profile: bool = False,
+    store_path: Optional[str] = None,
+    usecols: Optional[List[str]] = None,
+    max_rows: Optional[int] = None,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+    sample_rows: int = SNIFF_ROWS
+) -> Optional[Dict[str, Any]]:
+    """
+    Analyze a CSV file in two phases: sniff its column types, then parse it with them.
+
+    The shape of each column (booleans, integers, floats, dates, prices,
+    emails, low-cardinality text, ...; see sniff_csv_types) is decided from
+    the first rows. The whole file is then parsed by Arrow's multithreaded
+    CSV reader straight into those types, one block at a time, without
+    inferring or promoting anything. Typed columns take less memory than
+    pandas' inferred ones: prices become float64 instead of strings, dates
+    date32 and repetitive text dictionary-encoded.
+
+    Args:
+        file: Binary file object positioned at the start of the CSV; must be seekable
+        profile: Also compute per-column statistics, in the same pass
+        store_path: Also write the typed table to an Arrow file at this path,
+            in the same pass (dictionary-encoded columns are stored decoded)
+        usecols: Only parse and analyze these columns
+        max_rows: Only parse and analyze the first rows
+        block_bytes: Bytes of CSV converted per record batch; bounds peak memory
+        sample_rows: Number of rows the column types are sniffed from
+
+    Returns:
+        Dictionary of statistics about the CSV, as analyze_csv_file reports
+        them but with Arrow column types and the sniffed "column_shapes",
+        or None if a value past the sample does not fit its column's type
+        (the file should then be analyzed by analyze_csv_file)
+    """
+    shapes = sniff_csv_types(file, sample_rows, usecols)
+    file.seek(0)
+    schema = arrow_schema(shapes)
+    # The IPC file format cannot hold a dictionary per batch
+    store_schema = arrow_schema(shapes, decode_dictionaries=True)
+    table_profile = TableProfile() if profile else None
+    row_count = 0
+    column_memory = 0
+    truncated = False
+    sample: List[Dict[str, Any]] = []
+    writer = None
+    try:
+        # Opening already converts the first block
+        reader = pa_csv.open_csv(
+            file,
+            read_options=pa_csv.ReadOptions(block_size=block_bytes, use_threads=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types=read_types(shapes),
+                include_columns=list(shapes),
+                null_values=NULL_VALUES,
+                true_values=TRUE_VALUES,
+                false_values=FALSE_VALUES,
+                strings_can_be_null=True
+            )
+        )
+        if reader.schema.names != list(shapes):
+            # E.g. duplicate names, which pandas renames but Arrow keeps
+            return None
+        if store_path is not None:
+            writer = pa.ipc.new_file(store_path, store_schema)
+        for batch in reader:
+            batch = convert_batch(batch, shapes)
+            if max_rows is not None and row_count + batch.num_rows > max_rows:
+                batch = batch.slice(0, max_rows - row_count)
+                truncated = True
+            if len(sample) < SAMPLE_ROWS:
+                sample += batch.slice(0, SAMPLE_ROWS - len(sample)).to_pylist()
+            row_count += batch.num_rows
+            column_memory += batch.nbytes
+            if table_profile is not None:
+                table_profile.update(batch.to_pandas())
+            if writer is not None:
+                writer.write_batch(batch.cast(store_schema))
+            if truncated:
+                break
+    except (pa.ArrowInvalid, TypeMismatchError):
+        return None
+    finally:
+        if writer is not None:
+            writer.close()
+
+    stats = {
+        "row_count": row_count,
+        "column_count": len(schema),
+        "columns": schema.names,
+        "column_types": {field.name: str(field.type) for field in schema},
+        "column_shapes": shapes,
+        "memory_usage": column_memory + _INDEX_MEMORY,
+        "sample_rows": sample,
+    }
+    if table_profile is not None:
+        stats["profile"] = table_profile.result()
+    if max_rows is not None:
+        stats["truncated"] = truncated
+    return stats
+
+
+def analyze_csv_file(
+    file: IO[bytes],
+    chunk_rows: int,
+    profile: bool = False,
+    workers: int = 1,
+    range_bytes: int = DEFAULT_RANGE_BYTES,
+    store_path: Optional[str] = None,
+    usecols: Optional[List[str]] = None,
+    max_rows: Optional[int] = None,
+    typed: bool = False
+) -> Dict[str, Any]:
+    """
+    Analyze a CSV file by reading and parsing it chunk by chunk.
+
+    With several workers, the file is split into record-aligned byte ranges
+    (see split_csv_records) that are parsed and profiled on the shared
+    process pool; their partial statistics are merged in file order. Counts,
+    column types, min/max, distinct-count registers and the mean and std
+    (from exact sums) are the same as with a single worker.
+
+    A column parsed as numbers in its first chunk may turn out to be text
+    later on; for seekable files the sample rows are then re-read with the
+    final column types, so they hold the values a whole-file parse would.
+
+    Selected columns (usecols) and a row limit (max_rows) are pushed down
+    into the parser: other columns are skipped by the tokenizer without
+    being converted, and reading stops after the limit. With a limit, the
+    result reports under "truncated" whether the file has more rows.
+
+    With typed=True, seekable files are first analyzed with sniffed column
+    types (see analyze_csv_typed), falling back to the inferring parse if
+    the rest of the file does not fit them; "parser" reports which ran.
+
+    Args:
+        file: Binary file object positioned at the start of the CSV
+        chunk_rows: Number of rows parsed at a time; bounds peak memory
+        profile: Also compute per-column statistics, in the same pass
+        workers: Number of worker processes (1 parses in the calling thread)
+        range_bytes: Size of the byte ranges handed to each worker
+        store_path: Also convert the file to an Arrow file at this path
+            (see write_csv_dataset); the file must be seekable
+        usecols: Only parse and analyze these columns
+        max_rows: Only parse and analyze the first rows
+        typed: Parse with sniffed column types when they fit the whole file
+
+    Returns:
+        Dictionary of statistics about the CSV (see CsvAnalyzer.result)
+
+    Raises:
+        UnknownColumnsError: If selected columns are not in the file
+    """
+    if usecols is not None:
+        header = pd.read_csv(file, nrows=0, encoding="utf-8").columns
+        missing = [column for column in usecols if column not in header]
+        if missing:
+            raise UnknownColumnsError(missing)
+        file.seek(0)
+
+    if typed and file.seekable():
+        result = analyze_csv_typed(file, profile, store_path, usecols, max_rows)
+        if result is not None:
+            result["parser"] = "typed"
+            return result
+        file.seek(0)
+
+    truncated = False
+    if workers > 1 and max_rows is None:
+        header, ranges = split_csv_records(file, range_bytes)
+        if not header:
+            raise pd.errors.EmptyDataError("No columns to parse from file")
+        analyzer = CsvAnalyzer(profile)
+        tasks = ((header, data, chunk_rows, profile, usecols) for data in ranges)
+        # Bounded in-flight ranges keep memory at about 2 * workers * range_bytes
+        for part in map_ordered(get_process_pool(workers), _analyze_csv_range, tasks, max_pending=2 * workers):
+            analyzer.merge(part)
+        if analyzer.columns is None:
+            # Header only: parse it for the column names and types
+            analyzer = _analyze_csv_range(header, b"", chunk_rows, profile, usecols)
+    else:
+        analyzer = CsvAnalyzer(profile)
+        # One row past the limit tells whether the file has more
+        nrows = None if max_rows is None else max_rows + 1
+        with pd.read_csv(
+            file,
+            chunksize=chunk_rows if nrows is None else min(chunk_rows, nrows),
+            usecols=usecols,
+            nrows=nrows,
+            encoding="utf-8"
+        ) as reader:
+            for chunk in reader:
+                if max_rows is not None and analyzer.row_count + len(chunk) > max_rows:
+                    chunk = chunk.iloc[:max_rows - analyzer.row_count]
+                    truncated = True
+                analyzer.update(chunk)
+
+    result = analyzer.result()
+    sample_types = analyzer.sample.dtypes.astype(str).tolist() if analyzer.sample is not None else []
+    if sample_types != list(result["column_types"].values()) and file.seekable():
+        file.seek(0)
+        sample = pd.read_csv(
+            file,
+            nrows=min(SAMPLE_ROWS, analyzer.row_count),
+            dtype=analyzer.text_dtypes(),
+            usecols=usecols,
+            encoding="utf-8"
+        )
+        result = analyzer.result(sample)
+    if max_rows is not None:
+        result["truncated"] = truncated
+    if store_path is not None:
+        file.seek(0)
+        write_csv_dataset(file, store_path, analyzer, chunk_rows, usecols, max_rows)
+    if typed:
+        result["parser"] = "pandas"
+    return result
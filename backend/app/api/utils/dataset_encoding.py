@@ -0,0 +1,110 @@
+"""
+Encoding of stored (Arrow) datasets in the streamed output formats
+"""
+import csv
+import io
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+import pyarrow as pa
+
+from app.api.utils.arrow_encoding import IPC_END_OF_STREAM, iter_parquet_batches
+from app.api.utils.serialization import dumps
+from app.api.utils.text_encoding import encode_csv_rows, format_column
+
+
+def _csv_text(column: pa.Array) -> np.ndarray:
+    """
+    Format an Arrow column as the text of its CSV fields, with nulls as empty fields.
+    """
+    values = column.drop_null().to_numpy(zero_copy_only=False)
+    if values.dtype == object:
+        values = values.astype(str)
+    text = format_column(values)
+    if not column.null_count:
+        return text
+    fields = np.full(len(column), "", dtype=text.dtype)
+    fields[column.is_valid().to_numpy(zero_copy_only=False)] = text
+    return fields
+
+
+def _encode_csv(batch: pa.RecordBatch) -> bytes:
+    """
+    Encode the rows of a batch as CSV, in the dialect of generated tables (csv.writer's).
+    """
+    return encode_csv_rows([_csv_text(column) for column in batch.columns]).encode('utf-8')
+
+
+def _encode_json_rows(batch: pa.RecordBatch, orient: str) -> bytes:
+    """
+    Encode the rows of a batch as comma-separated JSON objects (or arrays for "split").
+    """
+    if orient == "split":
+        rows = zip(*(column.to_pylist() for column in batch.columns))
+        return b",".join(dumps(list(row)) for row in rows)
+    return b",".join(dumps(row) for row in batch.to_pylist())
+
+
+def iter_dataset_chunks(
+    table: pa.Table,
+    output_format: str,
+    chunk_rows: int,
+    orient: str = "records",
+    metadata: Optional[Dict[str, Any]] = None
+) -> Iterator[bytes]:
+    """
+    Encode an Arrow table one record batch at a time.
+
+    Batches are zero-copy slices of the table, so a memory-mapped dataset
+    is read from its file as it is encoded.
+
+    Args:
+        table: The rows to encode
+        output_format: "csv", "ndjson", "json", "arrow" or "parquet"
+        chunk_rows: Number of rows encoded per chunk
+        orient: Layout of the rows of JSON output: "records", "split" or "columns"
+        metadata: Metadata member of the JSON envelope
+
+    Returns:
+        An iterator of encoded byte chunks
+    """
+    batches = table.to_batches(max_chunksize=chunk_rows)
+    if output_format == "csv":
+        header = io.StringIO()
+        csv.writer(header).writerow(table.column_names)
+        yield header.getvalue().encode('utf-8')
+        for batch in batches:
+            yield _encode_csv(batch)
+    elif output_format == "ndjson":
+        for batch in batches:
+            if batch.num_rows:
+                yield b"\n".join(dumps(row) for row in batch.to_pylist()) + b"\n"
+    elif output_format == "arrow":
+        yield table.schema.serialize().to_pybytes()
+        for batch in batches:
+            yield batch.serialize().to_pybytes()
+        yield IPC_END_OF_STREAM
+    elif output_format == "parquet":
+        yield from iter_parquet_batches(batches, table.schema)
+    else:  # output_format == "json"
+        yield b'{"metadata":' + dumps(metadata or {}) + b',"data":'
+        if orient == "columns":
+            yield b"{"
+            for index, name in enumerate(table.column_names):
+                yield (b"," if index else b"") + dumps(name) + b":["
+                separator = b""
+                for batch in batches:
+                    if batch.num_rows:
+                        # The values of the column's JSON array, without its brackets
+                        yield separator + dumps(batch.column(index).to_pylist())[1:-1]
+                        separator = b","
+                yield b"]"
+            yield b"}}"
+            return
+        yield b"["
+        separator = b""
+        for batch in batches:
+            if batch.num_rows:
+                yield separator + _encode_json_rows(batch, orient)
+                separator = b","
+        yield b"]}"
@@ -0,0 +1,413 @@
+"""
+Incremental, constant-memory analysis of JSON and JSON Lines uploads
+"""
+import re
+import codecs
+import itertools
+import json
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from app.api.utils.profiling import TableProfile
+from app.api.utils.serialization import loads
+
+
+# Number of rows reported in the sample of an analysis
+SAMPLE_ROWS = 5
+
+# Bytes read (and decoded) from the file at a time
+READ_BYTES = 1 << 20
+
+# Largest single JSON value (e.g. one row object) the parser buffers
+MAX_VALUE_CHARS = 64 * 1024 * 1024
+
+# Elements of an array of plain values that are reported; the rest are only counted
+MAX_ARRAY_VALUES = 1000
+
+# Marks the end of an array (null is a valid first element)
+_MISSING = object()
+
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+
+
+class JsonParseError(ValueError):
+    """Raised when an uploaded document is not valid JSON (or JSON Lines)"""
+
+
+class JsonStream:
+    """
+    Pull parser over a JSON document that is read and decoded incrementally.
+
+    Only the current value and the unread part of the last read are held in
+    memory, so arrays with any number of elements can be walked through one
+    element at a time.
+    """
+
+    def __init__(self, file: IO[bytes], read_bytes: int = READ_BYTES):
+        """
+        Args:
+            file: Binary file object positioned at the start of the document
+            read_bytes: Number of bytes read (and decoded) at a time
+        """
+        self._file = file
+        self._read_size = read_bytes
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._raw = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """
+        Append the next part of the file to the buffer, dropping what was consumed.
+
+        Returns:
+            False at the end of the file
+        """
+        if self._eof:
+            return False
+        data = self._file.read(self._read_size)
+        self._eof = not data
+        try:
+            text = self._decoder.decode(data, final=self._eof)
+        except UnicodeDecodeError as e:
+            raise JsonParseError(str(e))
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        if len(self._buffer) > MAX_VALUE_CHARS:
+            raise JsonParseError(f"JSON value larger than {MAX_VALUE_CHARS} characters")
+        return bool(text) or not self._eof
+
+    def peek(self) -> str:
+        """
+        Skip whitespace and return the next character without consuming it.
+
+        Returns:
+            The next character, or "" at the end of the document
+        """
+        while True:
+            match = _NON_WHITESPACE.search(self._buffer, self._pos)
+            if match is not None:
+                self._pos = match.start()
+                return match.group()
+            self._pos = len(self._buffer)
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """
+        Consume the next (non-whitespace) character, which must be char.
+
+        Args:
+            char: The expected character
+
+        Raises:
+            JsonParseError: If the document has another character there
+        """
+        found = self.peek()
+        if found != char:
+            raise JsonParseError(f"Expecting '{char}', found {found!r}" if found else f"Expecting '{char}', found end of file")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """
+        Decode the next complete JSON value.
+
+        Returns:
+            The decoded value
+
+        Raises:
+            JsonParseError: If the document is not valid JSON
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._raw.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                # Possibly cut off by the end of the buffer: read on and retry
+                if self._fill():
+                    continue
+                raise JsonParseError(str(e))
+            if end == len(self._buffer) and self._fill():
+                # A number at the end of the buffer may continue in the next read
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """
+        Decode the elements of the array that starts at the current position, one at a time.
+
+        Returns:
+            An iterator of the array's elements
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Walk the keys of the object that starts at the current position.
+
+        After each key is yielded, the caller must consume its value (with
+        value() or iter_array()) before asking for the next key.
+
+        Returns:
+            An iterator of the object's keys
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                self.expect('"')
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def end(self) -> None:
+        """
+        Check that nothing but whitespace follows the document.
+
+        Raises:
+            JsonParseError: If there is extra data
+        """
+        if self.peek():
+            raise JsonParseError("Extra data after the JSON document")
+
+
+class JsonRowStats:
+    """Running statistics of a stream of row objects: count, first rows and optional profile"""
+
+    def __init__(
+        self,
+        chunk_rows: int,
+        profile: bool = False,
+        columns: Optional[List[str]] = None,
+        max_rows: Optional[int] = None
+    ):
+        """
+        Args:
+            chunk_rows: Number of rows profiled at a time
+            profile: Also compute per-column statistics (see TableProfile)
+            columns: Only keep these members of row objects
+            max_rows: Stop after this many rows (see read)
+        """
+        self.chunk_rows = chunk_rows
+        self.columns = columns
+        self.max_rows = max_rows
+        self.truncated = False
+        self.row_count = 0
+        self.sample: List[Any] = []
+        self.profile = TableProfile() if profile else None
+        self._batch: List[Dict[str, Any]] = []
+
+    def update(self, row: Any) -> None:
+        """
+        Add one row.
+
+        Args:
+            row: The row object
+        """
+        if self.columns is not None and isinstance(row, dict):
+            row = {name: row[name] for name in self.columns if name in row}
+        self.row_count += 1
+        if len(self.sample) < SAMPLE_ROWS:
+            self.sample.append(row)
+        if self.profile is not None and isinstance(row, dict):
+            self._batch.append(row)
+            if len(self._batch) >= self.chunk_rows:
+                self._flush()
+
+    def read(self, rows: Iterator[Any]) -> None:
+        """
+        Add rows up to the row limit, leaving the rest of the iterator unread.
+
+        Args:
+            rows: The rows, in order
+        """
+        for row in rows:
+            if self.max_rows is not None and self.row_count >= self.max_rows:
+                # A row past the limit: the document has more rows than analyzed
+                self.truncated = True
+                return
+            self.update(row)
+
+    def _flush(self) -> None:
+        if self._batch:
+            self.profile.update(pd.DataFrame.from_records(self._batch))
+            self._batch = []
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Report the row statistics.
+
+        Returns:
+            Dictionary with the row count, column count and names (of the
+            first row) and the first rows, plus "profile" when profiling
+            and "truncated" with a row limit
+        """
+        first = self.sample[0] if self.sample and isinstance(self.sample[0], dict) else {}
+        stats = {
+            "row_count": self.row_count,
+            "column_count": len(first),
+            "columns": list(first),
+            "sample_rows": self.sample,
+        }
+        if self.profile is not None:
+            self._flush()
+            stats["profile"] = self.profile.result()
+        if self.max_rows is not None:
+            stats["truncated"] = self.truncated
+        return stats
+
+
+def _describe_values(values: Iterator[Any]) -> Dict[str, Any]:
+    """
+    Describe an array of plain values, keeping at most MAX_ARRAY_VALUES of them.
+
+    Args:
+        values: The elements of the array
+
+    Returns:
+        Dictionary with the values under "data", plus "value_count" and
+        "truncated" when the array is longer than MAX_ARRAY_VALUES
+    """
+    kept = list(itertools.islice(values, MAX_ARRAY_VALUES))
+    count = len(kept) + sum(1 for _ in values)
+    stats: Dict[str, Any] = {"data": kept}
+    if count > len(kept):
+        stats.update({"value_count": count, "truncated": True})
+    return stats
+
+
+def analyze_json_file(
+    file: IO[bytes],
+    chunk_rows: int,
+    profile: bool = False,
+    columns: Optional[List[str]] = None,
+    max_rows: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Analyze a JSON document without loading it into memory.
+
+    Arrays of objects and {"metadata": ..., "data": [...]} envelopes are
+    walked one row at a time, so memory does not grow with the number of
+    rows. Arrays of other values are returned up to MAX_ARRAY_VALUES of
+    them and otherwise only counted. Other documents are small by nature
+    and are returned as parsed.
+
+    With a row limit, parsing stops right after the limit: the rest of the
+    document is neither decoded nor validated (and metadata that follows
+    the data array is not reported).
+
+    Args:
+        file: Binary file object positioned at the start of the document
+        chunk_rows: Number of rows profiled at a time
+        profile: Also compute per-column statistics of the rows
+        columns: Only analyze these members of the row objects
+        max_rows: Only analyze the first rows
+
+    Returns:
+        Dictionary with information about the JSON data
+
+    Raises:
+        JsonParseError: If the document is not valid JSON
+    """
+    stream = JsonStream(file)
+    first = stream.peek()
+    row_stats: Optional[JsonRowStats] = None
+    if first == "[":
+        rows = stream.iter_array()
+        head = next(rows, _MISSING)
+        if head is _MISSING:
+            stats = {"data": []}
+        elif not isinstance(head, dict):
+            # An array of plain values is described by its first values and length
+            stats = _describe_values(itertools.chain([head], rows))
+        else:
+            row_stats = JsonRowStats(chunk_rows, profile, columns, max_rows)
+            row_stats.read(itertools.chain([head], rows))
+            stats = row_stats.result()
+    elif first == "{":
+        members: Dict[str, Any] = {}
+        for key in stream.iter_object():
+            if key == "data" and stream.peek() == "[":
+                row_stats = JsonRowStats(chunk_rows, profile, columns, max_rows)
+                row_stats.read(stream.iter_array())
+                if row_stats.truncated:
+                    break
+            else:
+                members[key] = stream.value()
+        if row_stats is None:
+            stats = members
+        else:
+            rows = row_stats.result()
+            stats = {
+                "row_count": rows["row_count"],
+                "metadata": members.get("metadata", {}),
+                "sample_rows": rows["sample_rows"],
+            }
+            if profile:
+                stats["profile"] = rows["profile"]
+            if max_rows is not None:
+                stats["truncated"] = row_stats.truncated
+    else:
+        stats = {"data": stream.value()}
+    if row_stats is None or not row_stats.truncated:
+        stream.end()
+    return stats
+
+
+def analyze_json_lines_file(
+    file: IO[bytes],
+    chunk_rows: int,
+    profile: bool = False,
+    columns: Optional[List[str]] = None,
+    max_rows: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Analyze a JSON Lines (NDJSON) file, one line at a time.
+
+    Args:
+        file: Binary file object positioned at the start of the file
+        chunk_rows: Number of rows profiled at a time
+        profile: Also compute per-column statistics of the rows
+        columns: Only analyze these members of the row objects
+        max_rows: Only read and analyze the first rows
+
+    Returns:
+        Dictionary with the row count, columns and first rows (see JsonRowStats.result)
+
+    Raises:
+        JsonParseError: If a line is not valid JSON
+    """
+    def rows() -> Iterator[Any]:
+        for number, line in enumerate(file, start=1):
+            if number == 1:
+                line = line.removeprefix(codecs.BOM_UTF8)
+            if not line.strip():
+                continue
+            try:
+                yield loads(line)
+            except ValueError as e:
+                raise JsonParseError(f"Invalid JSON on line {number}: {e}")
+
+    row_stats = JsonRowStats(chunk_rows, profile, columns, max_rows)
+    row_stats.read(rows())
+    return row_stats.result()
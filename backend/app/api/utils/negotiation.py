@@ -0,0 +1,188 @@
+"""
+Request negotiation and validation shared by the data, dataset and job routers
+"""
+import os
+import re
+import unicodedata
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, status
+
+from app.api.utils.column_generator import TableSpec
+from app.api.utils.compression import StreamEncoder, negotiate_encoding
+from app.api.utils.parallel import default_worker_count
+from app.api.utils.serialization import JSON_ORIENTS
+from app.api.utils.table_processor import TableProcessor
+from app.core.config import settings
+
+
+# Media types of the supported output formats
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Download file extensions of the formats that are returned as attachments
+FILE_EXTENSIONS = {
+    "csv": "csv",
+    "arrow": "arrows",
+    "parquet": "parquet",
+}
+
+# Characters kept in the plain filename of a Content-Disposition header
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def content_disposition(filename: str) -> str:
+    """
+    Build the Content-Disposition header of a download.
+
+    Names that are not plain ASCII tokens (e.g. uploaded file names with
+    accents, spaces, quotes or semicolons) get a quoted ASCII fallback and
+    the exact name percent-encoded as UTF-8 (RFC 6266 filename*).
+
+    Args:
+        filename: Name of the downloaded file
+
+    Returns:
+        The header value
+    """
+    stem, extension = (
+        _UNSAFE_FILENAME_CHARS.sub("_", unicodedata.normalize("NFKD", part).encode("ascii", "ignore").decode("ascii"))
+        for part in os.path.splitext(filename)
+    )
+    fallback = (stem.strip("._") or "download") + extension
+    if fallback == filename:
+        return f"attachment; filename={filename}"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def negotiate_format(format: Optional[str], accept: Optional[str]) -> str:
+    """
+    Determine the output format from the format parameter or Accept header.
+
+    Args:
+        format: Optional format override (csv, json, ndjson, arrow or parquet)
+        accept: HTTP Accept header
+
+    Returns:
+        The output format, one of MEDIA_TYPES (default json)
+
+    Raises:
+        HTTPException: 400 if the format parameter is not a supported format
+    """
+    # If format parameter is provided, it overrides Accept header
+    if format is not None:
+        format = format.lower()
+        if format in MEDIA_TYPES:
+            return format
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format: {format}. Supported formats are: {', '.join(MEDIA_TYPES)}"
+        )
+    # Otherwise, use Accept header for content negotiation
+    if accept is not None:
+        for output_format in ("csv", "ndjson", "arrow", "parquet"):
+            if MEDIA_TYPES[output_format] in accept:
+                return output_format
+    return "json"
+
+
+def validate_orient(orient: str, output_format: str) -> str:
+    """
+    Validate the JSON row layout of a request.
+
+    Args:
+        orient: Requested layout (records, split or columns)
+        output_format: The negotiated output format
+
+    Returns:
+        The layout to use; always "records" for formats other than json
+
+    Raises:
+        HTTPException: 400 if the layout is not one of JSON_ORIENTS
+    """
+    if orient not in JSON_ORIENTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid orient: {orient}. Supported layouts are: {', '.join(JSON_ORIENTS)}"
+        )
+    return orient if output_format == "json" else "records"
+
+
+def validate_data_types(data_types: Optional[List[str]]) -> None:
+    """
+    Reject unknown column data types.
+
+    Args:
+        data_types: Optional list of data types for columns
+
+    Raises:
+        HTTPException: 400 if a data type is not one of TableProcessor.DATA_TYPES
+    """
+    if data_types:
+        for dt in data_types:
+            if dt not in TableProcessor.DATA_TYPES:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid data type: {dt}. Valid types are: {TableProcessor.DATA_TYPES}"
+                )
+
+
+def generation_worker_count(spec: TableSpec) -> int:
+    """
+    Number of worker processes to generate a table with.
+
+    Args:
+        spec: The table to generate
+
+    Returns:
+        1 for small tables, otherwise the configured (or per-core) worker count
+    """
+    if spec.num_rows < settings.PARALLEL_MIN_ROWS:
+        return 1
+    return settings.GENERATION_WORKERS or default_worker_count()
+
+
+def negotiate_response_encoding(request: Request, output_format: str, cells: int) -> Optional[StreamEncoder]:
+    """
+    Determine the content coding of a response from the Accept-Encoding header.
+
+    Args:
+        request: The FastAPI request object
+        output_format: One of MEDIA_TYPES
+        cells: Number of values (rows x columns) in the response
+
+    Returns:
+        The negotiated encoder, or None for tiny or uncompressible responses
+    """
+    if cells < settings.COMPRESSION_MIN_CELLS:
+        return None
+    dictionary_id = request.headers.get("x-zstd-dictionary-id") if settings.COMPRESSION_ZSTD_DICTIONARY else None
+    return negotiate_encoding(
+        request.headers.get("accept-encoding"),
+        settings.COMPRESSION_LEVELS.get(output_format, {}),
+        dictionary_id
+    )
+
+
+def encoding_headers(encoder: Optional[StreamEncoder]) -> Dict[str, str]:
+    """
+    Response headers describing the content coding of a body.
+
+    Args:
+        encoder: The negotiated encoder, if any
+
+    Returns:
+        Vary (always) and Content-Encoding / X-Zstd-Dictionary-Id headers
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if encoder is not None:
+        headers["Content-Encoding"] = encoder.encoding
+        if encoder.dictionary is not None:
+            headers["X-Zstd-Dictionary-Id"] = str(encoder.dictionary.dict_id())
+    return headers
@@ -0,0 +1,101 @@
+"""
+Process-pool sharding of table generation across CPU cores
+"""
+import os
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+
+logger = logging.getLogger("app")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def default_worker_count() -> int:
+    """
+    Number of worker processes to use when none is configured: one per core.
+
+    Returns:
+        The number of usable CPU cores
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Get the shared generation process pool, creating it on first use.
+
+    Workers are started with the "spawn" method, which is safe to use from
+    the threads of a running server.
+
+    Args:
+        max_workers: Pool size on creation (defaults to one worker per core)
+
+    Returns:
+        The shared ProcessPoolExecutor
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = max_workers or default_worker_count()
+            logger.info(f"Starting generation process pool with {workers} workers")
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    """
+    Shut down the shared generation process pool, if it was started.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            logger.info("Shutting down generation process pool")
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def map_ordered(
+    executor: Executor,
+    fn: Callable[..., Any],
+    tasks: Iterable[tuple],
+    max_pending: int
+) -> Iterator[Any]:
+    """
+    Run tasks on an executor and yield their results in submission order.
+
+    At most ``max_pending`` tasks are in flight at a time, so a slow consumer
+    holds back the workers instead of letting results pile up in memory.
+
+    Args:
+        executor: The executor to run the tasks on
+        fn: Function to call with each task's arguments
+        tasks: Argument tuples, one per task
+        max_pending: Maximum number of submitted but unconsumed tasks
+
+    Returns:
+        An iterator of task results, in order
+    """
+    pending = deque()
+    tasks = iter(tasks)
+    try:
+        for args in tasks:
+            pending.append(executor.submit(fn, *args))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Consumer stopped early (e.g. client disconnected): drop queued work
+        for future in pending:
+            future.cancel()
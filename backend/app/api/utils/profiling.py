@@ -0,0 +1,642 @@
+"""
+Single-pass column profiling with mergeable sketches
+
+Every statistic is kept as a small state that is updated with one
+vectorized pass over each chunk of a column and that can be merged with
+the state of another chunk or shard:
+
+- HyperLogLog for distinct counts
+- t-digest for quantiles
+- Misra-Gries for the most frequent values
+- count and exact sums of the values and of their squares for the mean
+  and standard deviation, which do not depend on how the data was split
+"""
+import json
+import math
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Quantiles reported for numeric columns
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Number of most frequent values reported per column
+TOP_VALUES = 10
+
+
+def _number_text(value: float) -> str:
+    """
+    Format a number as it is written in a CSV file (1, not 1.0).
+    """
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+def _key_kind(value_type: type) -> str:
+    """
+    Classify the type of an object value: "number", "text", "nested" or "other".
+    """
+    if issubclass(value_type, (bool, np.bool_)):
+        return "other"
+    if issubclass(value_type, (int, float, np.number)):
+        return "number"
+    if issubclass(value_type, str):
+        return "text"
+    if issubclass(value_type, (list, dict, tuple)):
+        return "nested"
+    return "other"
+
+
+def _text_keys(text: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Key text values, turning text written exactly as a number into the number.
+
+    Each distinct text is parsed once, so low-cardinality columns are cheap.
+
+    Args:
+        text: Strings
+
+    Returns:
+        The keys, and a mask of the keys that are numbers
+    """
+    codes, uniques = pd.factorize(text)
+    parsed = pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce").astype(np.float64)
+    canonical = (parsed.map(_number_text, na_action="ignore") == uniques).to_numpy()
+    keys = uniques.astype(object)
+    keys[canonical] = parsed.to_numpy()[canonical]
+    return keys[codes], canonical[codes]
+
+
+def _sketch_keys(values: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Map values to the keys counted by the distinct and frequent value sketches.
+
+    A column can be parsed as numbers in one chunk and as text in another
+    (when a later chunk promotes it), so keys must not depend on the
+    representation: numbers, and text written exactly as a number, are
+    keyed by their float64 value (1, 1.0 and "1" are one value). Any other
+    value is keyed by its text, nested values (JSON arrays and objects) by
+    their JSON text.
+
+    Args:
+        values: Non-null values of one column
+
+    Returns:
+        The keys, and a mask of the keys that are numbers (None when all are)
+    """
+    if values.dtype.kind in "iuf":
+        return values.astype(np.float64), None
+    if values.dtype.kind == "O" and pd.api.types.infer_dtype(values, skipna=True) == "string":
+        return _text_keys(values)
+    keys = pd.Series(values, dtype=object)
+    types = keys.map(type)
+    kinds = types.map({value_type: _key_kind(value_type) for value_type in types.unique()})
+
+    nested = kinds == "nested"
+    if nested.any():
+        keys[nested] = [json.dumps(value, sort_keys=True, default=str) for value in keys[nested]]
+    other = kinds == "other"
+    if other.any():
+        keys[other] = keys[other].astype(str)
+    numbers = (kinds == "number").to_numpy(copy=True)
+    if numbers.any():
+        keys[numbers] = keys[numbers].astype(np.float64)
+
+    text = (kinds == "text").to_numpy()
+    keys = keys.to_numpy(copy=True)
+    if text.any():
+        keys[text], numbers[text] = _text_keys(keys[text])
+    return keys, numbers
+
+
+def _hash_keys(keys: np.ndarray, numbers: Optional[np.ndarray]) -> np.ndarray:
+    """
+    Hash sketch keys to uniformly distributed 64-bit integers.
+
+    Args:
+        keys: Keys of the values (see _sketch_keys)
+        numbers: Mask of the keys that are numbers, None when all are
+
+    Returns:
+        The uint64 hash of each key
+    """
+    if numbers is None:
+        return pd.util.hash_array(keys, categorize=False)
+    hashes = np.empty(len(keys), dtype=np.uint64)
+    hashes[numbers] = pd.util.hash_array(keys[numbers].astype(np.float64), categorize=False)
+    hashes[~numbers] = pd.util.hash_array(keys[~numbers], categorize=False)
+    return hashes
+
+
+class HyperLogLog:
+    """Distinct count estimate with 2**precision registers (about 1.04 / sqrt(2**precision) error)"""
+
+    def __init__(self, precision: int = 14):
+        # With at least 11 index bits, the remaining bits are exact as float64
+        if not 11 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 11 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes: np.ndarray) -> None:
+        """
+        Add hashed values.
+
+        Args:
+            hashes: uint64 hashes of the values (see _hash_keys)
+        """
+        if not len(hashes):
+            return
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # Position of the leftmost 1 bit in the remaining bits (frexp's exponent is the bit length)
+        rank = (rest_bits + 1 - np.frexp(rest.astype(np.float64))[1]).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        Combine with a sketch of other values (same precision).
+
+        Args:
+            other: The other sketch
+        """
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        """
+        Estimate the number of distinct values added.
+
+        Returns:
+            The estimated distinct count
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class TDigest:
+    """
+    Quantile sketch of clustered centroids (merging t-digest).
+
+    Clusters are small near the tails and large near the median, so extreme
+    quantiles stay accurate with a few hundred centroids.
+    """
+
+    def __init__(self, compression: int = 200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Add values.
+
+        Args:
+            values: Non-null numeric values
+        """
+        if not len(values):
+            return
+        values = values.astype(np.float64)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+
+    def merge(self, other: "TDigest") -> None:
+        """
+        Combine with a digest of other values.
+
+        Args:
+            other: The other digest
+        """
+        if not len(other.means):
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        """
+        Re-cluster centroids so that each cluster spans at most one unit of the k1 scale.
+        """
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Quantile at the left edge of each centroid, mapped onto the k1 scale
+        left = (np.cumsum(weights) - weights) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * left - 1)
+        cluster = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, cluster[1:] != cluster[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile.
+
+        Args:
+            q: The quantile, between 0 and 1
+
+        Returns:
+            The estimated value, or None if no values were added
+        """
+        if not len(self.means):
+            return None
+        total = self.weights.sum()
+        # Centroid means sit at the middle of their cluster's weight
+        centers = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate([[0.0], centers, [total]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q * total, positions, values))
+
+
+class MisraGries:
+    """Most frequent values, with counts underestimated by at most n / (capacity + 1)"""
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.counters = pd.Series(dtype=np.int64)
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Add values.
+
+        The chunk's exact value counts form a summary of their own, which
+        is merged in, so the work per chunk is one vectorized value count.
+
+        Args:
+            values: Keys of non-null values of one column (see _sketch_keys)
+        """
+        if len(values):
+            self._merge_counts(pd.Series(values).value_counts(sort=False))
+
+    def merge(self, other: "MisraGries") -> None:
+        """
+        Combine with a summary of other values.
+
+        Args:
+            other: The other summary
+        """
+        self._merge_counts(other.counters)
+
+    def _merge_counts(self, counts: pd.Series) -> None:
+        if len(self.counters):
+            counts = counts.add(self.counters, fill_value=0).astype(np.int64)
+        if len(counts) > self.capacity:
+            # Subtracting the (capacity + 1)-th largest count keeps at most capacity counters
+            cut = counts.nlargest(self.capacity + 1).iloc[-1]
+            counts = counts[counts > cut] - cut
+        self.counters = counts
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        """
+        Get the most frequent values.
+
+        Args:
+            k: Number of values to return
+
+        Returns:
+            Up to k values with their (lower bound) counts, most frequent first
+        """
+        top = self.counters.sort_values(ascending=False, kind="stable").head(k)
+        return [{"value": value, "count": count} for value, count in zip(top.index.tolist(), top.tolist())]
+
+
+def _exact_parts(values: List[float]) -> List[float]:
+    """
+    Represent the exact sum of a few floats by as few floats as needed.
+
+    math.fsum rounds the exact sum correctly; the part it rounds off is
+    summed again, until nothing is left.
+
+    Args:
+        values: Floats whose sums cannot overflow
+
+    Returns:
+        Floats of decreasing magnitude whose exact sum is that of the values
+    """
+    parts = []
+    remainder = math.fsum(values)
+    while remainder:
+        parts.append(remainder)
+        remainder = math.fsum(values + [-part for part in parts])
+    return parts
+
+
+def _split_sum(values: np.ndarray) -> List[float]:
+    """
+    Sum an array of floats exactly, as a few floats.
+
+    Each pass rounds every value to a multiple of the same power of two,
+    large enough that the rounded values add up without rounding (the
+    extraction of Rump, Ogita and Oishi's AccSum), and goes on with the
+    exact remainders, which are smaller by about 2 ** 52 / len(values).
+
+    Args:
+        values: Floats whose sums cannot overflow
+
+    Returns:
+        Floats whose exact sum is that of the values
+    """
+    parts = []
+    values = values[values != 0]
+    while len(values):
+        scale = math.ldexp(1.0, math.frexp(4.0 * len(values) * float(np.abs(values).max()))[1])
+        high = (values + scale) - scale
+        parts.append(float(high.sum()))
+        values = values - high
+        values = values[values != 0]
+    return parts
+
+
+def _square_parts(values: np.ndarray) -> np.ndarray:
+    """
+    Split the squares of floats into rounded squares and their rounding errors.
+
+    The errors are exact (Dekker's product with Veltkamp's split) for values
+    in Moments.EXACT_RANGE, so the parts add up to the exact squares.
+
+    Args:
+        values: Floats in Moments.EXACT_RANGE
+
+    Returns:
+        The rounded squares followed by their errors
+    """
+    squares = values * values
+    scaled = values * 134217729.0  # 2 ** 27 + 1
+    high = scaled - (scaled - values)
+    low = values - high
+    errors = ((high * high - squares) + 2.0 * high * low) + low * low
+    return np.concatenate([squares, errors])
+
+
+def _to_float(value: Fraction) -> float:
+    """Round an exact value to the nearest float (infinite beyond the float range)"""
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+
+
+class Moments:
+    """
+    Count and exact sums of the values and of their squares.
+
+    The sums are kept as a few floats adding up to them exactly, so the
+    mean and standard deviation are rounded once, from exact values, and do
+    not depend on the chunks the values were added or merged in.
+    """
+
+    # Magnitudes whose squares and their rounding errors are exact normal floats;
+    # other nonzero values are added as fractions
+    EXACT_RANGE = (2.0 ** -400, 2.0 ** 400)
+
+    def __init__(self):
+        self.count = 0
+        self.sums: List[float] = []
+        self.squares: List[float] = []
+        # Sums of the values outside EXACT_RANGE
+        self.extra_sum = Fraction(0)
+        self.extra_squares = Fraction(0)
+        # Sum of the infinite and NaN values
+        self.non_finite = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Add values.
+
+        Args:
+            values: Non-null numeric values
+        """
+        if not len(values):
+            return
+        values = values.astype(np.float64)
+        self.count += len(values)
+        magnitudes = np.abs(values)
+        exact = ((magnitudes >= self.EXACT_RANGE[0]) | (values == 0)) & (magnitudes <= self.EXACT_RANGE[1])
+        if not exact.all():
+            for value in values[~exact].tolist():
+                if math.isfinite(value):
+                    self.extra_sum += Fraction(value)
+                    self.extra_squares += Fraction(value) ** 2
+                else:
+                    self.non_finite += value
+            values = values[exact]
+        self.sums = _exact_parts(self.sums + _split_sum(values))
+        self.squares = _exact_parts(self.squares + _split_sum(_square_parts(values)))
+
+    def merge(self, other: "Moments") -> None:
+        """
+        Combine with the moments of other values.
+
+        Args:
+            other: The other moments
+        """
+        self.count += other.count
+        self.sums = _exact_parts(self.sums + other.sums)
+        self.squares = _exact_parts(self.squares + other.squares)
+        self.extra_sum += other.extra_sum
+        self.extra_squares += other.extra_squares
+        self.non_finite += other.non_finite
+
+    def _total(self) -> Fraction:
+        return sum(map(Fraction, self.sums), self.extra_sum)
+
+    @property
+    def mean(self) -> float:
+        """Mean of the values, correctly rounded"""
+        if self.non_finite or not self.count:
+            return self.non_finite
+        return _to_float(self._total() / self.count)
+
+    @property
+    def std(self) -> Optional[float]:
+        """Sample standard deviation (as pandas defines it), None for fewer than two values"""
+        if self.count < 2:
+            return None
+        if self.non_finite:
+            return math.nan
+        total = self._total()
+        m2 = sum(map(Fraction, self.squares), self.extra_squares) - total * total / self.count
+        return math.sqrt(_to_float(m2 / (self.count - 1)))
+
+
+class ColumnProfile:
+    """Mergeable statistics of one column"""
+
+    def __init__(self):
+        self.count = 0
+        self.null_count = 0
+        self.numeric = True
+        # Whether every value is an integer or a boolean, for reporting the top values
+        self.integral = True
+        self.boolean = True
+        self.min: Any = None
+        self.max: Any = None
+        self.moments = Moments()
+        self.digest = TDigest()
+        self.distinct = HyperLogLog()
+        self.frequent = MisraGries()
+
+    def update(self, series: pd.Series) -> None:
+        """
+        Add one chunk of the column.
+
+        Args:
+            series: The column's values in the chunk
+        """
+        nulls = series.isna().to_numpy()
+        values = series.to_numpy()[~nulls] if nulls.any() else series.to_numpy()
+        self.null_count += int(nulls.sum())
+        self.count += len(values)
+        if not len(values):
+            return
+
+        keys, numbers = _sketch_keys(values)
+        self.distinct.update(_hash_keys(keys, numbers))
+        self.frequent.update(keys)
+        kind = values.dtype.kind
+        self.integral = self.integral and kind in "iu"
+        self.boolean = self.boolean and (
+            kind == "b" or (kind == "O" and pd.api.types.infer_dtype(values, skipna=True) == "boolean")
+        )
+        if kind not in "iuf":
+            # Text (or mixed) values: the column has no numeric statistics
+            self.numeric = False
+            return
+        if self.numeric:
+            low, high = values.min().item(), values.max().item()
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+            self.moments.update(values)
+            self.digest.update(values)
+
+    def merge(self, other: "ColumnProfile") -> None:
+        """
+        Combine with the profile of the same column in another part of the data.
+
+        Args:
+            other: The other part's profile
+        """
+        self.count += other.count
+        self.null_count += other.null_count
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+        self.numeric = self.numeric and other.numeric
+        self.integral = self.integral and other.integral
+        self.boolean = self.boolean and other.boolean
+        if self.numeric and other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+            self.moments.merge(other.moments)
+            self.digest.merge(other.digest)
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Report the column's statistics.
+
+        Returns:
+            Dictionary with value and null counts, the estimated distinct count
+            and most frequent values and, for numeric columns, min, max, mean,
+            standard deviation and estimated quantiles
+        """
+        profile = {
+            "count": self.count,
+            "null_count": self.null_count,
+            "distinct_count": min(self.distinct.estimate(), self.count),
+            "top_values": [
+                {"value": self._value(top["value"]), "count": top["count"]}
+                for top in self.frequent.top(TOP_VALUES)
+            ],
+        }
+        if self.numeric and self.min is not None:
+            profile.update({
+                "min": self.min,
+                "max": self.max,
+                "mean": self.moments.mean,
+                "std": self.moments.std,
+                "quantiles": {f"p{round(q * 100)}": self.digest.quantile(q) for q in QUANTILES},
+            })
+        return profile
+
+    def _value(self, key: Any) -> Any:
+        """
+        Convert a sketch key back to a value of the column's type over every chunk.
+        """
+        if isinstance(key, float):
+            if not self.numeric:
+                return _number_text(key)
+            # Like pandas, integer columns with missing values are floats
+            return int(key) if self.integral and not self.null_count else key
+        if self.boolean:
+            return key == "True"
+        return key
+
+
+class TableProfile:
+    """Mergeable statistics of every column of a table, fed one chunk at a time"""
+
+    def __init__(self):
+        self.columns: Dict[str, ColumnProfile] = {}
+
+    @classmethod
+    def of_arrow(cls, table: Any, chunk_rows: int) -> "TableProfile":
+        """
+        Profile an Arrow table (e.g. a memory-mapped dataset), one record batch at a time.
+
+        Args:
+            table: The pyarrow Table
+            chunk_rows: Number of rows converted to pandas at a time
+
+        Returns:
+            The profile of every column of the table
+        """
+        profile = cls()
+        for batch in table.to_batches(max_chunksize=chunk_rows):
+            profile.update(batch.to_pandas())
+        return profile
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Add one chunk of rows.
+
+        Args:
+            chunk: The next rows of the table
+        """
+        for name, series in chunk.items():
+            if name not in self.columns:
+                self.columns[name] = ColumnProfile()
+            self.columns[name].update(series)
+
+    def merge(self, other: "TableProfile") -> None:
+        """
+        Combine with the profile of other rows of the same table.
+
+        Args:
+            other: The other rows' profile
+        """
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = column
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Report the statistics of every column.
+
+        Returns:
+            Dictionary of column names to their statistics (see ColumnProfile.result)
+        """
+        return {name: column.result() for name, column in self.columns.items()}
@@ -0,0 +1,78 @@
+"""
+JSON serialization layer: orjson when installed, the json module otherwise
+"""
+import json
+from typing import Any, Union
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+# Layouts of a table's rows in a JSON document
+JSON_ORIENTS = ("records", "split", "columns")
+
+
+def _default(obj: Any) -> Any:
+    """
+    Convert values the json module cannot serialize (NumPy scalars and arrays).
+
+    Args:
+        obj: The unsupported value
+
+    Returns:
+        An equivalent built-in value
+    """
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize an object as compact UTF-8 JSON.
+
+    The output matches what JSONResponse renders (no whitespace, non-ASCII
+    characters kept), and NumPy values are supported natively. orjson writes
+    non-finite floats as null; the json module fallback rejects them, as
+    JSONResponse does.
+
+    Args:
+        obj: The object to serialize
+
+    Returns:
+        The JSON document
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Parse a JSON document.
+
+    Args:
+        data: The JSON document, as UTF-8 bytes or text
+
+    Returns:
+        The parsed object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered through the serialization layer"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -3,15 +3,35 @@ Utility module for generating and processing tabular data
 """
 import io
 import csv
-import random
-import string
 import logging
-from typing import List, Dict, Any, Union, Optional
-from datetime import datetime, timedelta
+from typing import IO, List, Dict, Any, Union, Optional, Iterator, Callable
 
 import pandas as pd
 import numpy as np
 
+from app.api.utils.column_generator import (
+    ColumnarTable,
+    ColumnGenerator,
+    TableSpec,
+)
+from app.api.utils.text_encoding import (
+    encode_csv_rows,
+    encode_json_arrays,
+    encode_json_records,
+    encode_json_values,
+)
+from app.api.utils.serialization import dumps
+from app.api.utils.csv_analysis import DEFAULT_RANGE_BYTES, UnknownColumnsError, analyze_csv_file
+from app.api.utils.arrow_encoding import (
+    IPC_END_OF_STREAM,
+    arrow_schema,
+    encode_ipc_batch,
+    encode_ipc_schema,
+    iter_parquet,
+)
+from app.api.utils.parallel import get_process_pool, map_ordered
+from app.core.metrics import BYTES_SERIALIZED, ROWS_GENERATED, UPLOAD_BYTES_PARSED
+
 
 logger = logging.getLogger("app")
 
@@ -39,118 +59,150 @@ class TableProcessor:
         "price": ["price", "cost", "retail_price", "discount", "tax"]
     }
 
+    # Fixed schemas (headers and data types) of the sample datasets
+    SAMPLE_SCHEMAS = {
+        "users": {
+            "headers": ["id", "full_name", "email", "registration_date", "is_active"],
+            "data_types": ["integer", "name", "email", "date", "boolean"],
+        },
+        "products": {
+            "headers": ["id", "product_name", "price", "stock", "in_stock"],
+            "data_types": ["integer", "product", "price", "integer", "boolean"],
+        },
+        "transactions": {
+            "headers": ["id", "user_id", "transaction_date", "amount", "status"],
+            "data_types": ["integer", "integer", "date", "price", "string"],
+        },
+    }
+
     @classmethod
-    def generate_table_data(
-        cls, 
-        num_rows: int = 10, 
-        num_cols: int = 5, 
+    def create_table_spec(
+        cls,
+        num_rows: int = 10,
+        num_cols: int = 5,
         data_types: Optional[List[str]] = None,
-        include_headers: bool = True,
         seed: Optional[int] = None
-    ) -> List[List[Any]]:
+    ) -> TableSpec:
         """
-        Generate a table with random data based on specified parameters.
+        Resolve the schema of a random table without generating any rows.
         
         Args:
             num_rows: Number of data rows to generate
             num_cols: Number of columns to generate
             data_types: List of data types for columns (if None, random types will be chosen)
-            include_headers: Whether to include header row
             seed: Random seed for reproducibility
             
         Returns:
-            A list of lists representing the table data
+            A TableSpec describing the table
         """
-        # Set random seed if provided
-        if seed is not None:
-            random.seed(seed)
-            np.random.seed(seed)
+        entropy = seed if seed is not None else np.random.SeedSequence().entropy
+        rng = TableSpec.schema_rng(entropy)
         
         # Generate or use provided data types
         if data_types is None or len(data_types) != num_cols:
-            data_types = [random.choice(cls.DATA_TYPES) for _ in range(num_cols)]
-        
-        # Generate column headers
-        headers = []
-        for i, dtype in enumerate(data_types):
-            if dtype in cls.COLUMN_NAMES:
-                column_name = random.choice(cls.COLUMN_NAMES[dtype])
-                # Avoid duplicate column names
-                while column_name in headers:
-                    column_name = f"{column_name}_{i+1}"
-                headers.append(column_name)
-            else:
-                headers.append(f"column_{i+1}")
-        
-        # Initialize table with headers if requested
-        table = []
-        if include_headers:
-            table.append(headers)
-        
-        # Generate data rows
-        for _ in range(num_rows):
-            row = []
-            for dtype in data_types:
-                row.append(cls._generate_value_for_type(dtype))
-            table.append(row)
+            data_types = [cls.DATA_TYPES[i] for i in rng.integers(0, len(cls.DATA_TYPES), size=num_cols)]
         
-        return table
+        headers = ColumnGenerator.generate_headers(data_types, cls.COLUMN_NAMES, rng)
+        return TableSpec(headers, data_types, num_rows, entropy)
 
     @classmethod
-    def _generate_value_for_type(cls, data_type: str) -> Any:
+    def create_sample_spec(
+        cls,
+        sample_type: str,
+        rows: int = 100,
+        seed: Optional[int] = None
+    ) -> TableSpec:
         """
-        Generate a random value for the specified data type.
+        Resolve the schema of a sample dataset of the specified type.
         
         Args:
-            data_type: The type of data to generate
+            sample_type: Type of sample to generate (users, products, transactions)
+            rows: Number of rows to generate
+            seed: Random seed for reproducibility
             
         Returns:
-            A random value of the specified type
+            A TableSpec describing the sample dataset
         """
-        if data_type == "string":
-            return ''.join(random.choices(string.ascii_letters + ' ', k=random.randint(5, 15))).strip()
-        
-        elif data_type == "integer":
-            return random.randint(1, 1000)
-        
-        elif data_type == "float":
-            return round(random.uniform(1.0, 100.0), 2)
-        
-        elif data_type == "date":
-            start_date = datetime(2020, 1, 1)
-            days = random.randint(0, 1095)  # Up to ~3 years from start date
-            return (start_date + timedelta(days=days)).strftime('%Y-%m-%d')
-        
-        elif data_type == "boolean":
-            return random.choice([True, False])
-        
-        elif data_type == "email":
-            domains = ["example.com", "test.org", "company.net", "mail.co"]
-            username = ''.join(random.choices(string.ascii_lowercase, k=random.randint(5, 10)))
-            domain = random.choice(domains)
-            return f"{username}@{domain}"
+        schema = cls.SAMPLE_SCHEMAS.get(sample_type)
+        if schema is None:
+            # Default to a generic table
+            return cls.create_table_spec(num_rows=rows, num_cols=5, seed=seed)
         
-        elif data_type == "name":
-            first_names = ["John", "Jane", "Alice", "Bob", "Maria", "David", "Sarah", "Michael"]
-            last_names = ["Smith", "Johnson", "Brown", "Lee", "Garcia", "Miller", "Davis", "Wilson"]
-            return f"{random.choice(first_names)} {random.choice(last_names)}"
+        entropy = seed if seed is not None else np.random.SeedSequence().entropy
+        return TableSpec(schema["headers"], schema["data_types"], rows, entropy)
+
+    @classmethod
+    def generate_table(
+        cls,
+        num_rows: int = 10,
+        num_cols: int = 5,
+        data_types: Optional[List[str]] = None,
+        seed: Optional[int] = None
+    ) -> ColumnarTable:
+        """
+        Generate a column-oriented table with random data.
         
-        elif data_type == "address":
-            streets = ["Main St", "Oak Ave", "Park Rd", "Maple Ln", "Cedar Blvd"]
-            cities = ["Springfield", "Rivertown", "Oakville", "Maplewood", "Franklin"]
-            return f"{random.randint(100, 999)} {random.choice(streets)}, {random.choice(cities)}"
+        Args:
+            num_rows: Number of data rows to generate
+            num_cols: Number of columns to generate
+            data_types: List of data types for columns (if None, random types will be chosen)
+            seed: Random seed for reproducibility
+            
+        Returns:
+            The generated ColumnarTable
+        """
+        table = cls.create_table_spec(num_rows, num_cols, data_types, seed).generate()
+        ROWS_GENERATED.inc(table.num_rows)
+        return table
+
+    @classmethod
+    def generate_table_data(
+        cls, 
+        num_rows: int = 10, 
+        num_cols: int = 5, 
+        data_types: Optional[List[str]] = None,
+        include_headers: bool = True,
+        seed: Optional[int] = None
+    ) -> List[List[Any]]:
+        """
+        Generate a table with random data based on specified parameters.
         
-        elif data_type == "product":
-            adjectives = ["Premium", "Deluxe", "Basic", "Advanced", "Smart", "Ultra"]
-            products = ["Widget", "Gadget", "Tool", "Device", "System", "Solution"]
-            return f"{random.choice(adjectives)} {random.choice(products)}"
+        Row-oriented wrapper around generate_table.
         
-        elif data_type == "price":
-            return f"${round(random.uniform(9.99, 499.99), 2)}"
+        Args:
+            num_rows: Number of data rows to generate
+            num_cols: Number of columns to generate
+            data_types: List of data types for columns (if None, random types will be chosen)
+            include_headers: Whether to include header row
+            seed: Random seed for reproducibility
+            
+        Returns:
+            A list of lists representing the table data
+        """
+        table = cls.generate_table(num_rows=num_rows, num_cols=num_cols, data_types=data_types, seed=seed)
+        return table.to_rows(include_headers=include_headers)
+
+    @classmethod
+    def generate_sample_table(
+        cls,
+        sample_type: str,
+        rows: int = 100,
+        seed: Optional[int] = None
+    ) -> ColumnarTable:
+        """
+        Generate a column-oriented sample dataset of the specified type.
         
-        else:
-            # Default to string for unknown types
-            return f"Sample-{random.randint(1000, 9999)}"
+        Args:
+            sample_type: Type of sample to generate (users, products, transactions)
+            rows: Number of rows to generate
+            seed: Random seed for reproducibility
+            
+        Returns:
+            The generated ColumnarTable
+        """
+        table = cls.create_sample_spec(sample_type, rows, seed).generate()
+        ROWS_GENERATED.inc(table.num_rows)
+        return table
 
     @classmethod
     def table_to_csv_string(cls, table: List[List[Any]]) -> str:
@@ -180,61 +232,508 @@ class TableProcessor:
             CSV formatted bytes
         """
         return cls.table_to_csv_string(table).encode('utf-8')
+
+    @classmethod
+    def encode_chunk(
+        cls,
+        table: ColumnarTable,
+        output_format: str,
+        orient: str = "records",
+        categorical: bool = False
+    ) -> bytes:
+        """
+        Encode the rows of a chunk for one of the streamed output formats.
+        
+        Args:
+            table: The chunk to encode
+            output_format: "csv", "ndjson", "json" (rows of the data array)
+                or "arrow" (one IPC record batch message)
+            orient: Row layout of JSON output: "records" (objects) or "split" (arrays)
+            categorical: Dictionary-encode vocabulary columns of Arrow output
+            
+        Returns:
+            Encoded bytes of the chunk's rows
+        """
+        if output_format == "csv":
+            return encode_csv_rows(table.columns).encode('utf-8')
+        if output_format == "arrow":
+            return encode_ipc_batch(table, arrow_schema(table.headers, table.data_types, categorical))
+        if output_format == "json" and orient == "split":
+            records = encode_json_arrays(table.columns)
+        else:
+            records = encode_json_records(table.headers, table.columns)
+        if output_format == "ndjson":
+            return ("\n".join(records) + "\n").encode('utf-8')
+        return ",".join(records).encode('utf-8')
+
+    @classmethod
+    def iter_encoded_chunks(
+        cls,
+        spec: TableSpec,
+        output_format: str,
+        chunk_rows: int = 10000,
+        workers: int = 1,
+        orient: str = "records",
+        categorical: bool = False
+    ) -> Iterator[bytes]:
+        """
+        Generate and encode a table chunk by chunk, optionally on several processes.
+        
+        With more than one worker, chunks become shards that run on the shared
+        process pool and are yielded back in order. Every block of rows has its
+        own sub-seed, so the output is byte-identical for any worker count.
+        
+        Args:
+            spec: The table to generate
+            output_format: "csv", "ndjson", "json" or "arrow"
+            chunk_rows: Number of rows generated and encoded per chunk
+            workers: Number of worker processes (1 generates in the calling thread)
+            orient: Row layout of JSON output ("records" or "split")
+            categorical: Dictionary-encode vocabulary columns of Arrow output
+            
+        Returns:
+            An iterator of encoded chunks, in row order
+        """
+        args = (output_format, orient, categorical)
+        return cls._map_block_ranges(_encode_blocks, spec, args, chunk_rows, workers)
+
+    @classmethod
+    def iter_tables(cls, spec: TableSpec, chunk_rows: int = 10000, workers: int = 1) -> Iterator[ColumnarTable]:
+        """
+        Generate a table chunk by chunk, optionally on several processes.
+        
+        Used by encoders that must run in a single stream (e.g. Parquet),
+        where only the generation itself can be sharded.
+        
+        Args:
+            spec: The table to generate
+            chunk_rows: Number of rows generated per chunk
+            workers: Number of worker processes (1 generates in the calling thread)
+            
+        Returns:
+            An iterator of ColumnarTable chunks, in row order
+        """
+        return cls._map_block_ranges(_generate_blocks, spec, (), chunk_rows, workers)
+
+    @classmethod
+    def _map_block_ranges(
+        cls,
+        fn: Callable[..., Any],
+        spec: TableSpec,
+        args: tuple,
+        chunk_rows: int,
+        workers: int,
+        count_rows: bool = True
+    ) -> Iterator[Any]:
+        """
+        Call fn(spec, first_block, stop_block, *args) for each chunk of a table, in order.
+        
+        Args:
+            fn: Module-level function to call for each chunk
+            spec: The table to generate
+            args: Extra arguments for fn
+            chunk_rows: Number of rows per chunk
+            workers: Number of worker processes (1 runs in the calling thread)
+            count_rows: Count the chunks' rows as generated (off when the
+                same rows are generated again, e.g. one column at a time)
+            
+        Returns:
+            An iterator of fn's results, in row order
+        """
+        block_ranges = spec.iter_block_ranges(chunk_rows)
+        if workers > 1 and spec.num_blocks > spec.chunk_blocks(chunk_rows):
+            tasks = ((spec, first, stop, *args) for first, stop in block_ranges)
+            results = map_ordered(get_process_pool(workers), fn, tasks, max_pending=2 * workers)
+        else:
+            results = (fn(spec, first, stop, *args) for first, stop in block_ranges)
+        for (first, stop), result in zip(spec.iter_block_ranges(chunk_rows), results):
+            if count_rows:
+                # Counted here, in the calling process, as chunks come back from workers
+                ROWS_GENERATED.inc(min(stop * spec.BLOCK_ROWS, spec.num_rows) - first * spec.BLOCK_ROWS)
+            yield result
+
+    @classmethod
+    def encode_page(
+        cls,
+        spec: TableSpec,
+        offset: int,
+        limit: int,
+        output_format: str,
+        orient: str = "records",
+        categorical: bool = False
+    ) -> bytes:
+        """
+        Generate and encode one page of a (possibly huge) virtual table.
+        
+        Only the rows of the page are generated, whatever its offset.
+        
+        Args:
+            spec: The virtual table
+            offset: Index of the first row of the page
+            limit: Maximum number of rows in the page
+            output_format: "csv", "ndjson", "json", "arrow" or "parquet"
+            orient: Layout of the rows of JSON output (see stream_json)
+            categorical: Dictionary-encode vocabulary columns of Arrow and Parquet output
+            
+        Returns:
+            The encoded page; JSON pages carry paging metadata in their envelope
+        """
+        page = spec.generate_rows(offset, offset + limit)
+        ROWS_GENERATED.inc(page.num_rows)
+        content = cls._encode_page_rows(spec, page, offset, limit, output_format, orient, categorical)
+        BYTES_SERIALIZED.labels(output_format).inc(len(content))
+        return content
+
+    @classmethod
+    def _encode_page_rows(
+        cls,
+        spec: TableSpec,
+        page: ColumnarTable,
+        offset: int,
+        limit: int,
+        output_format: str,
+        orient: str,
+        categorical: bool
+    ) -> bytes:
+        """
+        Encode the generated rows of a page (see encode_page).
+        
+        Args:
+            spec: The virtual table
+            page: The page's rows
+            offset: Index of the first row of the page
+            limit: Maximum number of rows in the page
+            output_format: "csv", "ndjson", "json", "arrow" or "parquet"
+            orient: Layout of the rows of JSON output
+            categorical: Dictionary-encode vocabulary columns of Arrow and Parquet output
+            
+        Returns:
+            The encoded page
+        """
+        if output_format == "arrow":
+            schema = arrow_schema(spec.headers, spec.data_types, categorical)
+            head = encode_ipc_schema(schema, dictionaries=page)
+            return head + cls.encode_chunk(page, "arrow", categorical=categorical) + IPC_END_OF_STREAM
+        if output_format == "parquet":
+            return b"".join(iter_parquet([page], arrow_schema(spec.headers, spec.data_types, categorical)))
+        if output_format == "csv":
+            rows = cls.encode_chunk(page, output_format) if page.num_rows else b""
+            return cls.table_to_csv_bytes([spec.headers]) + rows
+        if output_format == "ndjson":
+            return cls.encode_chunk(page, output_format) if page.num_rows else b""
+        
+        end = offset + page.num_rows
+        metadata = {
+            "rows": spec.num_rows,
+            "columns": spec.num_cols,
+            "headers": spec.headers,
+            "offset": offset,
+            "limit": limit,
+            "returned": page.num_rows,
+            "next_offset": end if end < spec.num_rows else None,
+        }
+        return b'{"metadata":' + dumps(metadata) + b',"data":' + cls._encode_json_data(page, orient) + b'}'
+
+    @classmethod
+    def stream_csv(cls, spec: TableSpec, chunk_rows: int = 10000, workers: int = 1) -> Iterator[bytes]:
+        """
+        Generate a table and encode it as CSV one chunk of rows at a time.
+        
+        Only a bounded number of chunks is held in memory, so memory use does
+        not depend on the table size and the first bytes are ready right away.
+        
+        Args:
+            spec: The table to generate
+            chunk_rows: Number of rows generated and encoded per chunk
+            workers: Number of worker processes generating chunks
+            
+        Returns:
+            An iterator of CSV formatted byte chunks, header row first
+        """
+        yield cls.table_to_csv_bytes([spec.headers])
+        yield from cls.iter_encoded_chunks(spec, "csv", chunk_rows, workers)
+
+    @classmethod
+    def stream_ndjson(cls, spec: TableSpec, chunk_rows: int = 10000, workers: int = 1) -> Iterator[bytes]:
+        """
+        Generate a table and encode it as newline-delimited JSON, chunk by chunk.
+        
+        Args:
+            spec: The table to generate
+            chunk_rows: Number of rows generated and encoded per chunk
+            workers: Number of worker processes generating chunks
+            
+        Returns:
+            An iterator of NDJSON byte chunks, one JSON object per line
+        """
+        yield from cls.iter_encoded_chunks(spec, "ndjson", chunk_rows, workers)
+
+    @classmethod
+    def _encode_json_data(cls, table: ColumnarTable, orient: str = "records") -> bytes:
+        """
+        Encode the rows of an in-memory table as the "data" member of a JSON envelope.
+        
+        Args:
+            table: The rows to encode
+            orient: Layout of the rows: "records", "split" or "columns"
+            
+        Returns:
+            The JSON text of the data array (or object, for "columns")
+        """
+        if orient == "columns":
+            members = (
+                dumps(header) + b":[" + encode_json_values(column).encode('utf-8') + b"]"
+                for header, column in zip(table.headers, table.columns)
+            )
+            return b"{" + b",".join(members) + b"}"
+        rows = cls.encode_chunk(table, "json", orient) if table.num_rows else b""
+        return b"[" + rows + b"]"
+
+    @classmethod
+    def stream_json(
+        cls,
+        spec: TableSpec,
+        chunk_rows: int = 10000,
+        workers: int = 1,
+        orient: str = "records"
+    ) -> Iterator[bytes]:
+        """
+        Generate a table and write it incrementally as a JSON response envelope.
+        
+        The output has the same structure as table_to_json_response, written
+        as compact JSON: the metadata first, then the data chunk by chunk.
+        With orient="records" the data is an array of row objects, with
+        "split" an array of row arrays (keys are only in the metadata
+        headers), and with "columns" an object mapping each header to an
+        array of its values, generated one column at a time.
+        
+        Args:
+            spec: The table to generate
+            chunk_rows: Number of rows generated and encoded per chunk
+            workers: Number of worker processes generating chunks
+            orient: Layout of the rows: "records", "split" or "columns"
+            
+        Returns:
+            An iterator of JSON byte chunks
+        """
+        metadata = {"rows": spec.num_rows, "columns": spec.num_cols, "headers": spec.headers}
+        yield b'{"metadata":' + dumps(metadata) + b',"data":'
+        
+        if orient == "columns":
+            yield b"{"
+            for index, header in enumerate(spec.headers):
+                yield (b"," if index else b"") + dumps(header) + b":["
+                separator = b""
+                column_chunks = cls._map_block_ranges(
+                    _encode_column_blocks, spec, (index,), chunk_rows, workers, count_rows=index == 0
+                )
+                for chunk in column_chunks:
+                    yield separator + chunk
+                    separator = b","
+                yield b"]"
+            yield b"}}"
+            return
+        
+        yield b"["
+        separator = b""
+        for chunk in cls.iter_encoded_chunks(spec, "json", chunk_rows, workers, orient):
+            yield separator + chunk
+            separator = b","
+        yield b']}'
+
+    @classmethod
+    def stream_arrow(
+        cls,
+        spec: TableSpec,
+        chunk_rows: int = 10000,
+        workers: int = 1,
+        categorical: bool = False
+    ) -> Iterator[bytes]:
+        """
+        Generate a table and encode it as an Arrow IPC stream, one record batch per chunk.
+        
+        Batches are built directly from the generated NumPy columns, and with
+        several workers they are encoded on the worker processes too. With
+        categorical=True, vocabulary columns are dictionary arrays: each
+        vocabulary is sent once after the schema and batches carry only codes.
+        
+        Args:
+            spec: The table to generate
+            chunk_rows: Number of rows per record batch
+            workers: Number of worker processes generating chunks
+            categorical: Dictionary-encode vocabulary columns
+            
+        Returns:
+            An iterator of Arrow IPC byte chunks: schema, record batches, end of stream
+        """
+        schema = arrow_schema(spec.headers, spec.data_types, categorical)
+        yield encode_ipc_schema(schema, dictionaries=spec.generate_rows(0, 0))
+        yield from cls.iter_encoded_chunks(spec, "arrow", chunk_rows, workers, categorical=categorical)
+        yield IPC_END_OF_STREAM
+
+    @classmethod
+    def stream_parquet(
+        cls,
+        spec: TableSpec,
+        chunk_rows: int = 10000,
+        workers: int = 1,
+        categorical: bool = False
+    ) -> Iterator[bytes]:
+        """
+        Generate a table and encode it as a Parquet file, one row group per chunk.
+        
+        Args:
+            spec: The table to generate
+            chunk_rows: Number of rows per row group
+            workers: Number of worker processes generating chunks
+            categorical: Store vocabulary columns as dictionary (categorical) columns
+            
+        Returns:
+            An iterator of Parquet byte chunks, footer last
+        """
+        schema = arrow_schema(spec.headers, spec.data_types, categorical)
+        yield from iter_parquet(cls.iter_tables(spec, chunk_rows, workers), schema)
+
+    @classmethod
+    def stream_table(
+        cls,
+        spec: TableSpec,
+        output_format: str,
+        chunk_rows: int = 10000,
+        workers: int = 1,
+        orient: str = "records",
+        categorical: bool = False
+    ) -> Iterator[bytes]:
+        """
+        Generate a table and encode it in one of the streamed output formats.
+        
+        Args:
+            spec: The table to generate
+            output_format: "csv", "ndjson", "json", "arrow" or "parquet"
+            chunk_rows: Number of rows generated and encoded per chunk
+            workers: Number of worker processes generating chunks
+            orient: Layout of the rows of JSON output: "records", "split" or "columns"
+            categorical: Dictionary-encode vocabulary columns of Arrow and Parquet output
+            
+        Returns:
+            An iterator of encoded byte chunks
+        """
+        if output_format == "csv":
+            chunks = cls.stream_csv(spec, chunk_rows=chunk_rows, workers=workers)
+        elif output_format == "ndjson":
+            chunks = cls.stream_ndjson(spec, chunk_rows=chunk_rows, workers=workers)
+        elif output_format == "arrow":
+            chunks = cls.stream_arrow(spec, chunk_rows=chunk_rows, workers=workers, categorical=categorical)
+        elif output_format == "parquet":
+            chunks = cls.stream_parquet(spec, chunk_rows=chunk_rows, workers=workers, categorical=categorical)
+        else:
+            chunks = cls.stream_json(spec, chunk_rows=chunk_rows, workers=workers, orient=orient)
+        return cls._count_bytes(chunks, output_format)
+
+    @classmethod
+    def stream_chunk_count(
+        cls,
+        spec: TableSpec,
+        output_format: str,
+        chunk_rows: int = 10000,
+        orient: str = "records"
+    ) -> int:
+        """
+        Number of byte chunks stream_table yields for a table, framing chunks included.
         
+        Args:
+            spec: The table to generate
+            output_format: "csv", "ndjson", "json", "arrow" or "parquet"
+            chunk_rows: Number of rows generated and encoded per chunk
+            orient: Layout of the rows of JSON output: "records", "split" or "columns"
+            
+        Returns:
+            The chunk count: one per chunk of whole blocks (per column, for JSON
+            by columns), plus the format's header, separator and footer chunks
+        """
+        row_chunks = -(-spec.num_blocks // spec.chunk_blocks(chunk_rows))
+        if output_format == "csv":
+            return row_chunks + 1
+        if output_format == "ndjson":
+            return row_chunks
+        if output_format in ("arrow", "parquet"):
+            return row_chunks + (2 if output_format == "arrow" else 1)
+        if orient == "columns":
+            return 3 + spec.num_cols * (row_chunks + 2)
+        return row_chunks + 3
+
     @classmethod
-    def table_to_json(cls, table: List[List[Any]]) -> List[Dict[str, Any]]:
+    def _count_bytes(cls, chunks: Iterator[bytes], output_format: str) -> Iterator[bytes]:
+        """
+        Pass a stream of encoded chunks through, counting them as serialized bytes.
+        
+        Args:
+            chunks: The encoded chunks
+            output_format: Their format, the label of the count
+            
+        Returns:
+            The same chunks; closing it closes the underlying stream
+        """
+        counter = BYTES_SERIALIZED.labels(output_format)
+        try:
+            for chunk in chunks:
+                counter.inc(len(chunk))
+                yield chunk
+        finally:
+            chunks.close()
+        
+    @classmethod
+    def table_to_json(cls, table: List[List[Any]], orient: str = "records") -> Union[List[Any], Dict[str, List[Any]]]:
         """
         Convert a table (list of lists) to JSON format.
         
         Args:
             table: The table data as a list of lists
+            orient: Layout of the rows: "records" (one object per row), "split"
+                (one array per row) or "columns" (one array per header)
             
         Returns:
-            List of dictionaries representing the table in JSON format
+            The rows in the requested layout, ready for JSON serialization
         """
         if not table or len(table) < 2:
-            return []
+            return {} if orient == "columns" else []
             
         headers = table[0]
         rows = table[1:]
         
-        json_data = []
-        for row in rows:
-            row_dict = {}
-            for i, value in enumerate(row):
-                if i < len(headers):  # Ensure we don't go out of bounds
-                    row_dict[headers[i]] = value
-            json_data.append(row_dict)
-            
-        return json_data
-        
+        if orient == "split":
+            return [list(row) for row in rows]
+        if orient == "columns":
+            return {header: list(values) for header, values in zip(headers, zip(*rows))}
+        return [dict(zip(headers, row)) for row in rows]
+
     @classmethod
-    def table_to_json_string(cls, table: List[List[Any]]) -> str:
+    def table_to_json_string(cls, table: List[List[Any]], orient: str = "records") -> str:
         """
-        Convert a table (list of lists) to a JSON string.
+        Convert a table (list of lists) to a compact JSON string.
         
         Args:
             table: The table data as a list of lists
+            orient: Layout of the rows (see table_to_json)
             
         Returns:
             JSON formatted string
         """
-        import json
-        json_data = cls.table_to_json(table)
-        return json.dumps(json_data, indent=2)
+        return cls.table_to_json_bytes(table, orient).decode('utf-8')
         
     @classmethod
-    def table_to_json_bytes(cls, table: List[List[Any]]) -> bytes:
+    def table_to_json_bytes(cls, table: List[List[Any]], orient: str = "records") -> bytes:
         """
-        Convert a table (list of lists) to JSON bytes.
+        Convert a table (list of lists) to compact JSON bytes.
         
         Args:
             table: The table data as a list of lists
+            orient: Layout of the rows (see table_to_json)
             
         Returns:
             JSON formatted bytes
         """
-        return cls.table_to_json_string(table).encode('utf-8')
+        return dumps(cls.table_to_json(table, orient))
 
     @classmethod
     def table_to_dataframe(cls, table: List[List[Any]], has_header: bool = True) -> pd.DataFrame:
@@ -267,82 +766,118 @@ class TableProcessor:
         Returns:
             CSV formatted bytes
         """
-        if sample_type == "users":
-            data_types = ["integer", "name", "email", "date", "boolean"]
-            headers = ["id", "full_name", "email", "registration_date", "is_active"]
-        
-        elif sample_type == "products":
-            data_types = ["integer", "product", "price", "integer", "boolean"]
-            headers = ["id", "product_name", "price", "stock", "in_stock"]
-        
-        elif sample_type == "transactions":
-            data_types = ["integer", "integer", "date", "price", "string"]
-            headers = ["id", "user_id", "transaction_date", "amount", "status"]
-        
-        else:
-            # Default to a generic table
-            return cls.table_to_csv_bytes(cls.generate_table_data(num_rows=rows, num_cols=5))
-        
-        # Generate data with specific headers
-        table = [headers]
-        for _ in range(rows):
-            row = []
-            for dtype in data_types:
-                row.append(cls._generate_value_for_type(dtype))
-            table.append(row)
-        
-        return cls.table_to_csv_bytes(table)
+        table = cls.generate_sample_table(sample_type, rows)
+        return cls.table_to_csv_bytes(table.to_rows())
 
     @classmethod
-    def analyze_csv(cls, csv_content: Union[str, bytes]) -> Dict[str, Any]:
+    def analyze_csv(
+        cls,
+        csv_content: Union[str, bytes],
+        chunk_rows: int = 50_000,
+        profile: bool = False
+    ) -> Dict[str, Any]:
         """
         Analyze a CSV file and return statistics.
         
         Args:
             csv_content: The CSV content as string or bytes
+            chunk_rows: Number of rows parsed at a time
+            profile: Also compute per-column statistics (see analyze_csv_file)
             
         Returns:
             Dictionary of statistics about the CSV
         """
+        if isinstance(csv_content, str):
+            csv_content = csv_content.encode('utf-8')
+        return cls.analyze_csv_file(io.BytesIO(csv_content), chunk_rows, profile)
+    
+    @classmethod
+    def analyze_csv_file(
+        cls,
+        file: IO[bytes],
+        chunk_rows: int = 50_000,
+        profile: bool = False,
+        workers: int = 1,
+        range_bytes: int = DEFAULT_RANGE_BYTES,
+        store_path: Optional[str] = None,
+        usecols: Optional[List[str]] = None,
+        max_rows: Optional[int] = None,
+        typed: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Analyze a CSV file incrementally and return statistics.
+        
+        The file is read and parsed chunk_rows rows at a time, keeping only
+        running aggregates (row count, promoted column types, memory estimate,
+        first rows), so peak memory depends on the chunk size rather than on
+        the size of the file.
+        
+        With profile=True, the same pass also computes per-column statistics
+        (null counts, min/max/mean/std, distinct counts, quantiles and most
+        frequent values) with mergeable sketches, reported under "profile".
+        
+        With several workers, record-aligned byte ranges of the file are
+        parsed and profiled on the shared process pool and their partial
+        statistics merged, with the same counts and types as the serial path.
+        
+        Column selection (usecols) and the row limit (max_rows) are pushed
+        down into the parser, so unselected columns and rows past the limit
+        are never converted.
+        
+        With typed=True, column types are sniffed from the first rows and the
+        whole file parsed into them by Arrow's multithreaded CSV reader, with
+        smaller column types than pandas infers; files whose later values do
+        not fit the sniffed types are analyzed as usual.
+        
+        Args:
+            file: Binary file object (e.g. an upload's spooled file) at the start of the CSV
+            chunk_rows: Number of rows parsed at a time
+            profile: Also compute per-column statistics
+            workers: Number of worker processes (1 parses in the calling thread)
+            range_bytes: Size of the byte ranges handed to each worker
+            store_path: Also store the parsed table as an Arrow (Feather) file at this path
+            usecols: Only parse and analyze these columns
+            max_rows: Only parse and analyze the first rows
+            typed: Parse with sniffed column types when they fit the whole file
+            
+        Returns:
+            Dictionary of statistics about the CSV
+        
+        Raises:
+            UnknownColumnsError: If selected columns are not in the file
+        """
+        start = file.tell()
         try:
-            # Convert bytes to string if needed
-            if isinstance(csv_content, bytes):
-                csv_content = csv_content.decode('utf-8')
-            
-            # Parse CSV with pandas
-            df = pd.read_csv(io.StringIO(csv_content))
-            
-            # Generate basic statistics
-            stats = {
-                "row_count": len(df),
-                "column_count": len(df.columns),
-                "columns": df.columns.tolist(),
-                "column_types": {col: str(df[col].dtype) for col in df.columns},
-                "memory_usage": df.memory_usage(deep=True).sum(),
-                "sample_rows": df.head(5).to_dict(orient='records')
-            }
-            
-            return stats
+            return analyze_csv_file(
+                file, chunk_rows, profile, workers, range_bytes, store_path, usecols, max_rows, typed
+            )
+        except UnknownColumnsError:
+            raise
         except Exception as e:
             logger.error(f"Error analyzing CSV: {str(e)}")
             raise ValueError(f"Error analyzing CSV: {str(e)}")
+        finally:
+            # The analysis stops reading early with max_rows, so count what it read
+            if not file.closed:
+                UPLOAD_BYTES_PARSED.labels("csv").inc(max(file.tell() - start, 0))
         
     @classmethod
-    def table_to_json_response(cls, table: List[List[Any]]) -> Dict[str, Any]:
+    def table_to_json_response(cls, table: List[List[Any]], orient: str = "records") -> Dict[str, Any]:
         """
         Convert a table (list of lists) to a structured JSON response with metadata.
         
         Args:
             table: The table data as a list of lists
+            orient: Layout of the rows (see table_to_json)
             
         Returns:
             Dictionary with metadata and data ready for JSON serialization
         """
         if not table or len(table) < 2:
-            return {"metadata": {"rows": 0, "columns": 0, "headers": []}, "data": []}
+            return {"metadata": {"rows": 0, "columns": 0, "headers": []}, "data": cls.table_to_json([], orient)}
         
         headers = table[0]
-        json_data = cls.table_to_json(table)
+        json_data = cls.table_to_json(table, orient)
         
         return {
             "metadata": {
@@ -365,28 +900,63 @@ class TableProcessor:
         Returns:
             Dictionary with metadata and data ready for JSON serialization
         """
-        if sample_type == "users":
-            data_types = ["integer", "name", "email", "date", "boolean"]
-            headers = ["id", "full_name", "email", "registration_date", "is_active"]
-        
-        elif sample_type == "products":
-            data_types = ["integer", "product", "price", "integer", "boolean"]
-            headers = ["id", "product_name", "price", "stock", "in_stock"]
-        
-        elif sample_type == "transactions":
-            data_types = ["integer", "integer", "date", "price", "string"]
-            headers = ["id", "user_id", "transaction_date", "amount", "status"]
-        
-        else:
-            # Default to a generic table
-            return cls.table_to_json_response(cls.generate_table_data(num_rows=rows, num_cols=5))
-        
-        # Generate data with specific headers
-        table = [headers]
-        for _ in range(rows):
-            row = []
-            for dtype in data_types:
-                row.append(cls._generate_value_for_type(dtype))
-            table.append(row)
-        
-        return cls.table_to_json_response(table)
\ No newline at end of file
+        table = cls.generate_sample_table(sample_type, rows)
+        return cls.table_to_json_response(table.to_rows())
+
+
+def _encode_blocks(
+    spec: TableSpec,
+    first_block: int,
+    stop_block: int,
+    output_format: str,
+    orient: str = "records",
+    categorical: bool = False
+) -> bytes:
+    """
+    Generate and encode a range of blocks (module-level so worker processes can run it).
+    
+    Args:
+        spec: The table being generated
+        first_block: Index of the first block of the range
+        stop_block: Index one past the last block of the range
+        output_format: "csv", "ndjson", "json" or "arrow"
+        orient: Row layout of JSON output ("records" or "split")
+        categorical: Dictionary-encode vocabulary columns of Arrow output
+        
+    Returns:
+        Encoded bytes of the range's rows
+    """
+    table = spec.generate_blocks(first_block, stop_block)
+    return TableProcessor.encode_chunk(table, output_format, orient, categorical)
+
+
+def _encode_column_blocks(spec: TableSpec, first_block: int, stop_block: int, column: int) -> bytes:
+    """
+    Generate one column of a range of blocks and encode its values as JSON.
+    
+    Args:
+        spec: The table being generated
+        first_block: Index of the first block of the range
+        stop_block: Index one past the last block of the range
+        column: Index of the column
+        
+    Returns:
+        The comma-separated JSON values of the column in the range
+    """
+    table = spec.generate_blocks(first_block, stop_block, columns=[column])
+    return encode_json_values(table.columns[0]).encode('utf-8')
+
+
+def _generate_blocks(spec: TableSpec, first_block: int, stop_block: int) -> ColumnarTable:
+    """
+    Generate a range of blocks (module-level so worker processes can run it).
+    
+    Args:
+        spec: The table being generated
+        first_block: Index of the first block of the range
+        stop_block: Index one past the last block of the range
+        
+    Returns:
+        The range's rows
+    """
+    return spec.generate_blocks(first_block, stop_block)
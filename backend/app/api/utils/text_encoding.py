@@ -0,0 +1,296 @@
+"""
+Vectorized text encoding of NumPy columns for streamed output formats
+"""
+import re
+import json
+from functools import lru_cache
+from typing import List, Tuple, Iterator
+
+import numpy as np
+
+from app.api.utils.column_generator import CategoricalColumn, Column, vocabulary
+
+
+# Integers in [0, _DECIMAL_TABLE_SIZE) are formatted by table lookup
+_DECIMAL_TABLE_SIZE = 1 << 16
+
+# Characters that force a CSV field to be quoted (csv.QUOTE_MINIMAL)
+_CSV_SPECIAL_CHARS = (",", '"', "\r", "\n")
+
+# Characters that must be escaped inside a JSON string
+_JSON_ESCAPE_CHARS = re.compile(r'["\\\x00-\x1f]')
+
+
+@lru_cache(maxsize=None)
+def _decimal_table() -> np.ndarray:
+    """
+    Build (once) the decimal text of every small non-negative integer.
+
+    Returns:
+        A unicode array where entry ``i`` is ``str(i)``
+    """
+    return np.arange(_DECIMAL_TABLE_SIZE).astype(str)
+
+
+@lru_cache(maxsize=None)
+def _cents_table() -> np.ndarray:
+    """
+    Build (once) the fractional part of every whole-cent amount.
+
+    Returns:
+        A unicode array where entry ``c`` is the text after the integer part
+        of ``repr(n + c / 100)``, e.g. ``".5"`` for 50 and ``".05"`` for 5
+    """
+    return np.array(["." + (f"{cents:02d}".rstrip("0") or "0") for cents in range(100)])
+
+
+@lru_cache(maxsize=None)
+def _vocabulary_csv_fields(data_type: str) -> Tuple[str, ...]:
+    """
+    Quote (once) every value of a vocabulary as a CSV field.
+
+    Returns:
+        The CSV field of each vocabulary value, by code
+    """
+    return tuple(quote_csv_fields(vocabulary(data_type)).tolist())
+
+
+@lru_cache(maxsize=None)
+def _vocabulary_json_literals(data_type: str) -> Tuple[str, ...]:
+    """
+    Encode (once) every value of a vocabulary as a JSON string literal.
+
+    Returns:
+        The JSON literal of each vocabulary value, by code
+    """
+    return tuple(format_json_strings(vocabulary(data_type)).tolist())
+
+
+def _lookup(pool: Tuple[str, ...], column: CategoricalColumn) -> List[str]:
+    """
+    Map the codes of a categorical column to pre-encoded strings.
+
+    The result shares the pool's string objects, so nothing is allocated
+    per cell.
+
+    Returns:
+        The encoded text of each value
+    """
+    return [pool[code] for code in column.codes.tolist()]
+
+
+def format_integers(column: np.ndarray) -> np.ndarray:
+    """
+    Format an integer column as decimal text.
+
+    Returns:
+        A unicode array of ``str(value)`` for each value
+    """
+    if len(column) and column.min() >= 0 and column.max() < _DECIMAL_TABLE_SIZE:
+        return _decimal_table()[column]
+    return column.astype(str)
+
+
+def format_floats(column: np.ndarray) -> np.ndarray:
+    """
+    Format a float column exactly as Python's ``repr`` would.
+
+    Columns of whole-cent amounts (what the generators produce) are built
+    from lookup tables; anything else falls back to NumPy's shortest repr.
+
+    Returns:
+        A unicode array of ``repr(value)`` for each value
+    """
+    if len(column) and column.min() >= 0 and column.max() < _DECIMAL_TABLE_SIZE:
+        cents = np.rint(column * 100).astype(np.int64)
+        if np.array_equal(cents / 100, column):
+            whole, fraction = np.divmod(cents, 100)
+            return np.char.add(_decimal_table()[whole], _cents_table()[fraction])
+    return np.array([repr(value) for value in column.tolist()], dtype=str)
+
+
+def format_column(column: Column, booleans: Tuple[str, str] = ("True", "False")) -> np.ndarray:
+    """
+    Format a column of any supported dtype as text.
+
+    Args:
+        column: The column to format
+        booleans: Text for true and false values
+
+    Returns:
+        A unicode array with the text of each value
+    """
+    if isinstance(column, CategoricalColumn):
+        return column.decode()
+    kind = column.dtype.kind
+    if kind == "b":
+        return np.where(column, *booleans)
+    if kind in "iu":
+        return format_integers(column)
+    if kind == "f":
+        return format_floats(column)
+    if kind == "U":
+        return column
+    return np.array([str(value) for value in column.tolist()], dtype=str)
+
+
+def quote_csv_fields(fields: np.ndarray) -> np.ndarray:
+    """
+    Quote the fields that need it, following csv.QUOTE_MINIMAL.
+
+    Returns:
+        A unicode array of CSV-ready fields
+    """
+    text = "".join(fields.tolist())
+    if not any(char in text for char in _CSV_SPECIAL_CHARS):
+        return fields
+
+    needs_quotes = np.zeros(len(fields), dtype=bool)
+    for char in _CSV_SPECIAL_CHARS:
+        if char in text:
+            needs_quotes |= np.char.find(fields, char) >= 0
+    quoted = fields[needs_quotes]
+    if '"' in text:
+        quoted = np.char.replace(quoted, '"', '""')
+    quoted = np.char.add(np.char.add('"', quoted), '"')
+    if needs_quotes.all():
+        return quoted
+
+    fields = fields.astype(quoted.dtype)
+    fields[needs_quotes] = quoted
+    return fields
+
+
+def encode_csv_rows(columns: List[Column]) -> str:
+    """
+    Encode columns as CSV rows, matching the output of ``csv.writer``.
+
+    Args:
+        columns: The columns of the rows to encode
+
+    Returns:
+        The CSV text of the rows, each terminated by CRLF
+    """
+    if not columns or not len(columns[0]):
+        return ""
+
+    fields = []
+    for column in columns:
+        if isinstance(column, CategoricalColumn):
+            fields.append(_lookup(_vocabulary_csv_fields(column.data_type), column))
+            continue
+        text = format_column(column)
+        # Only string columns can contain delimiters or quotes
+        fields.append((quote_csv_fields(text) if column.dtype.kind in "UO" else text).tolist())
+    if len(fields) == 1:
+        # csv.writer quotes an empty field when it is the only one in a row
+        fields[0] = ['""' if field == "" else field for field in fields[0]]
+
+    lines = map(",".join, zip(*fields))
+    return "\r\n".join(lines) + "\r\n"
+
+
+def format_json_strings(column: np.ndarray) -> np.ndarray:
+    """
+    Encode a string column as JSON string literals.
+
+    Values without quotes, backslashes or control characters (everything
+    the generators produce) are wrapped in quotes directly; any others are
+    escaped by the json module.
+
+    Returns:
+        A unicode array of JSON string literals
+    """
+    text = "".join(column.tolist())
+    literals = np.char.add(np.char.add('"', column), '"')
+    if not _JSON_ESCAPE_CHARS.search(text):
+        return literals
+
+    needs_escape = np.array([bool(_JSON_ESCAPE_CHARS.search(value)) for value in column.tolist()])
+    escaped = [json.dumps(value, ensure_ascii=False) for value in column[needs_escape].tolist()]
+    literals = literals.astype(object)
+    literals[needs_escape] = escaped
+    return literals.astype(str)
+
+
+def format_json_column(column: Column) -> np.ndarray:
+    """
+    Encode a column of any supported dtype as JSON value literals.
+
+    Returns:
+        A unicode array with the JSON text of each value
+    """
+    if isinstance(column, CategoricalColumn):
+        return format_json_strings(column.decode())
+    kind = column.dtype.kind
+    if kind == "U":
+        return format_json_strings(column)
+    if kind == "b":
+        return np.where(column, "true", "false")
+    if kind in "iu":
+        return format_integers(column)
+    if kind == "f" and np.isfinite(column).all():
+        return format_floats(column)
+    return np.array([json.dumps(value, ensure_ascii=False) for value in column.tolist()], dtype=str)
+
+
+def json_literals(column: Column) -> List[str]:
+    """
+    Encode a column as a list of JSON value literals.
+
+    Categorical columns reuse the pre-encoded literals of their vocabulary.
+
+    Returns:
+        The JSON text of each value
+    """
+    if isinstance(column, CategoricalColumn):
+        return _lookup(_vocabulary_json_literals(column.data_type), column)
+    return format_json_column(column).tolist()
+
+
+def encode_json_records(headers: List[str], columns: List[Column]) -> Iterator[str]:
+    """
+    Encode columns as compact JSON objects, one per row, without building dicts.
+
+    Each row is rendered by filling a ``{"header":%s,...}`` template with the
+    pre-encoded value literals of that row.
+
+    Args:
+        headers: Object keys, one per column
+        columns: The columns of the rows to encode
+
+    Returns:
+        An iterator of JSON object texts
+    """
+    keys = [json.dumps(str(header), ensure_ascii=False).replace("%", "%%") for header in headers]
+    template = "{" + ",".join(f"{key}:%s" for key in keys) + "}"
+    literals = [json_literals(column) for column in columns]
+    return map(template.__mod__, zip(*literals))
+
+
+def encode_json_arrays(columns: List[Column]) -> Iterator[str]:
+    """
+    Encode columns as compact JSON arrays, one per row (the "split" layout).
+
+    Args:
+        columns: The columns of the rows to encode
+
+    Returns:
+        An iterator of JSON array texts
+    """
+    template = "[" + ",".join("%s" for _ in columns) + "]"
+    literals = [json_literals(column) for column in columns]
+    return map(template.__mod__, zip(*literals))
+
+
+def encode_json_values(column: Column) -> str:
+    """
+    Encode the values of one column as the comma-separated body of a JSON array.
+
+    Args:
+        column: The column to encode
+
+    Returns:
+        The JSON text of the values, without the enclosing brackets
+    """
+    return ",".join(json_literals(column))
@@ -0,0 +1,180 @@
+"""
+Sniffing of CSV column types from a bounded sample, for typed Arrow parsing
+"""
+from typing import IO, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+# Number of rows whose values decide the type of each column
+SNIFF_ROWS = 10_000
+
+# Text columns with at most this ratio of distinct values are dictionary-encoded
+DICTIONARY_MAX_RATIO = 0.5
+
+# Values read as missing, as pandas reads them by default
+NULL_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+TRUE_VALUES = ["True", "TRUE", "true"]
+FALSE_VALUES = ["False", "FALSE", "false"]
+
+# Shapes of values, tried in order; a column takes the first shape all of its values have
+SHAPE_PATTERNS = {
+    "boolean": "|".join(TRUE_VALUES + FALSE_VALUES),
+    # At most 18 digits always fit in an int64
+    "integer": r"[+-]?\d{1,18}",
+    "float": r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?",
+    "date": r"\d{4}-\d{2}-\d{2}",
+    "datetime": r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?",
+    # Prices as TableProcessor writes them, e.g. $49.5
+    "price": r"\$\d+(?:\.\d+)?",
+    "email": r"[^@\s]+@[^@\s]+\.[^@\s]+",
+}
+
+# Arrow type of the values of each shape
+SHAPE_TYPES = {
+    "boolean": pa.bool_(),
+    "integer": pa.int64(),
+    "float": pa.float64(),
+    "date": pa.date32(),
+    "datetime": pa.timestamp("us"),
+    "price": pa.float64(),
+    "email": pa.string(),
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "text": pa.string(),
+    # No values in the sample: keep whatever comes later as text
+    "empty": pa.string(),
+}
+
+# Whole-value match of a price, for Arrow's regex kernels
+_PRICE_PATTERN = f"^(?:{SHAPE_PATTERNS['price']})$"
+
+
+class TypeMismatchError(ValueError):
+    """Raised when a value does not have the shape sniffed for its column"""
+
+    def __init__(self, column: str, shape: str):
+        super().__init__(f"Column {column} has values that are not of shape {shape}")
+        self.column = column
+        self.shape = shape
+
+
+def sniff_column(values: pd.Series) -> str:
+    """
+    Get the shape of the values of one column.
+
+    Args:
+        values: The column's values in the sample, as strings (missing values as NA)
+
+    Returns:
+        One of SHAPE_TYPES
+    """
+    values = values.dropna()
+    if values.empty:
+        return "empty"
+    for shape, pattern in SHAPE_PATTERNS.items():
+        if values.str.fullmatch(pattern).all():
+            return shape
+    if values.nunique() <= DICTIONARY_MAX_RATIO * len(values):
+        return "category"
+    return "text"
+
+
+def sniff_csv_types(
+    file: IO[bytes],
+    sample_rows: int = SNIFF_ROWS,
+    usecols: Optional[List[str]] = None
+) -> Dict[str, str]:
+    """
+    Sniff the shape of every column of a CSV file from its first rows.
+
+    Args:
+        file: Binary file object positioned at the start of the CSV
+        sample_rows: Number of rows to sniff
+        usecols: Only sniff these columns
+
+    Returns:
+        Dictionary of column names, in file order, to their shape
+    """
+    sample = pd.read_csv(
+        file,
+        nrows=sample_rows,
+        dtype=str,
+        usecols=usecols,
+        na_values=NULL_VALUES,
+        keep_default_na=False,
+        encoding="utf-8"
+    )
+    return {name: sniff_column(values) for name, values in sample.items()}
+
+
+def read_types(shapes: Dict[str, str]) -> Dict[str, pa.DataType]:
+    """
+    Get the types the Arrow CSV reader converts each column to.
+
+    Prices are read as text and converted by convert_batch, as the reader
+    cannot parse their currency sign.
+
+    Args:
+        shapes: Dictionary of column names to their shape
+
+    Returns:
+        Dictionary of column names to Arrow types, for ConvertOptions
+    """
+    return {
+        name: pa.string() if shape == "price" else SHAPE_TYPES[shape]
+        for name, shape in shapes.items()
+    }
+
+
+def arrow_schema(shapes: Dict[str, str], decode_dictionaries: bool = False) -> pa.Schema:
+    """
+    Get the schema of the batches returned by convert_batch.
+
+    Args:
+        shapes: Dictionary of column names to their shape
+        decode_dictionaries: Give dictionary-encoded columns their value type
+            instead (e.g. for an IPC file, which holds one dictionary per column)
+
+    Returns:
+        The schema of the typed table
+    """
+    fields = []
+    for name, shape in shapes.items():
+        arrow_type = SHAPE_TYPES[shape]
+        if decode_dictionaries and pa.types.is_dictionary(arrow_type):
+            arrow_type = arrow_type.value_type
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def convert_batch(batch: pa.RecordBatch, shapes: Dict[str, str]) -> pa.RecordBatch:
+    """
+    Convert the price columns of a batch read with read_types to numbers.
+
+    Args:
+        batch: Rows as read by the Arrow CSV reader
+        shapes: Dictionary of column names to their shape
+
+    Returns:
+        The batch with every column of its shape's type
+
+    Raises:
+        TypeMismatchError: If a price column has other values
+    """
+    if "price" not in shapes.values():
+        return batch
+    columns = batch.columns
+    for index, name in enumerate(batch.schema.names):
+        if shapes.get(name) != "price":
+            continue
+        # Nulls are skipped by all()
+        if pc.all(pc.match_substring_regex(columns[index], _PRICE_PATTERN)).as_py() is False:
+            raise TypeMismatchError(name, "price")
+        columns[index] = pc.cast(pc.utf8_slice_codeunits(columns[index], 1), pa.float64())
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
@@ -1,7 +1,7 @@
 """
 Application configuration settings loaded from environment variables
 """
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -24,6 +24,59 @@ class Settings(BaseSettings):
     CORS_METHODS: List[str] = ["*"]
     CORS_HEADERS: List[str] = ["*"]
     
+    # Data generation settings
+    MAX_GENERATE_ROWS: int = 10_000_000  # Upper bound for streamed responses
+    STREAM_CHUNK_ROWS: int = 10_000  # Rows generated and encoded per streamed chunk
+    GENERATE_DELAY_PER_COLUMN: float = 1.0  # Artificial delay (seconds) per generated column
+    GENERATION_WORKERS: int = 0  # Worker processes for large tables (0 = one per CPU core)
+    PARALLEL_MIN_ROWS: int = 250_000  # Smaller tables are generated in-process
+    MAX_DATASET_ROWS: int = 1_000_000_000_000  # Upper bound for virtual (paged) datasets
+    MAX_PAGE_ROWS: int = 10_000  # Upper bound for one page of a virtual dataset
+    SAMPLE_SEED: int = 42  # Seed of sample datasets when the request gives none
+    
+    # Heavy work executor settings (generation streams, pages, upload analysis)
+    EXECUTOR_MAX_ACTIVE: int = 4  # Heavy tasks running concurrently on executor threads
+    EXECUTOR_MAX_QUEUED: int = 16  # Admitted tasks waiting for a thread; beyond this requests get 503
+    EXECUTOR_RETRY_AFTER: int = 5  # Retry-After (seconds) sent with 503 responses
+    INLINE_MAX_ROWS: int = 10_000  # Smaller tables are streamed without going through the executor
+    
+    # Upload analysis settings
+    UPLOAD_CHUNK_ROWS: int = 50_000  # CSV rows parsed at a time; bounds peak memory of an analysis
+    UPLOAD_PARALLEL_MIN_BYTES: int = 64 * 1024 * 1024  # Larger CSV uploads are analyzed on the process pool
+    UPLOAD_RANGE_BYTES: int = 16 * 1024 * 1024  # Size of the byte ranges analyzed by each worker process
+    ANALYSIS_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # Budget for cached analyses of uploads (by content hash)
+    
+    # Dataset store settings (uploads kept as memory-mapped Arrow files)
+    DATASET_DIR: str = "data/datasets"  # Directory of the stored datasets
+    DATASET_MAX_BYTES: int = 10 * 1024 * 1024 * 1024  # Disk budget; least recently used datasets are deleted beyond it
+    
+    # Background job settings (long generation and analysis work, see /api/jobs)
+    JOB_DIR: str = "data/jobs"  # Directory of the job database and result files
+    JOB_WORKERS: int = 2  # Jobs running concurrently on worker threads
+    JOB_MAX_QUEUED: int = 100  # Jobs waiting for a worker; beyond this submissions get 503
+    JOB_DRAIN_SECONDS: float = 30.0  # On shutdown, running jobs get this long to finish before being requeued
+    JOB_RETENTION_SECONDS: float = 24 * 60 * 60  # Finished jobs and their results are deleted after this
+    JOB_PROGRESS_INTERVAL: float = 0.5  # Seconds between progress events of a job (SSE and WebSocket)
+    JOB_HEARTBEAT_SECONDS: float = 15.0  # Keep-alive interval of idle progress streams
+    
+    # Response compression settings (negotiated via Accept-Encoding: zstd, br, gzip)
+    COMPRESSION_MIN_CELLS: int = 2_000  # Smaller responses (rows x columns) are sent uncompressed
+    COMPRESSION_LEVELS: Dict[str, Dict[str, int]] = {  # Level per output format and coding
+        "csv": {"zstd": 3, "br": 4, "gzip": 6},
+        "json": {"zstd": 3, "br": 4, "gzip": 6},
+        "ndjson": {"zstd": 3, "br": 4, "gzip": 6},
+        "arrow": {"zstd": 3, "br": 4, "gzip": 6},
+        "parquet": {"zstd": 1, "br": 1, "gzip": 1},  # Already snappy-compressed
+    }
+    COMPRESSION_ZSTD_DICTIONARY: bool = False  # Offer the vocabulary-trained zstd dictionary to clients
+    
+    # Response cache settings (seeded and sample requests)
+    RESPONSE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # Budget for all cached bodies
+    RESPONSE_CACHE_MAX_ENTRY_BYTES: int = 32 * 1024 * 1024  # Larger bodies are never cached
+    
+    # Metrics settings (Prometheus text format at /metrics)
+    METRICS_ENABLED: bool = True  # Time requests and expose /metrics
+    
     # Environment-specific configuration
     model_config = SettingsConfigDict(
         env_file=".env",
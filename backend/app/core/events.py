@@ -1,11 +1,21 @@
 """
 Application lifecycle event handlers for startup and shutdown
 """
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from app.api.analysis_cache import AnalysisCache
+from app.api.dataset_store import DatasetStore
+from app.api.job_runners import job_runners
+from app.api.jobs import JobQueue
+from app.api.response_cache import ResponseCache
+from app.api.utils.compression import ENCODINGS, zstd_dictionary
+from app.core.config import settings
+from app.core.executors import ExecutorManager
+
 
 logger = logging.getLogger("app")
 
@@ -22,6 +32,45 @@ async def lifespan(app: FastAPI):
     # Startup: Initialize resources
     logger.info("Starting up application...")
     
+    # Cache for deterministic (seeded and sample) data responses
+    app.state.response_cache = ResponseCache(
+        max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+        max_entry_bytes=settings.RESPONSE_CACHE_MAX_ENTRY_BYTES,
+    )
+    
+    # Analyses of uploads by content hash, so repeated uploads are not parsed again
+    app.state.analysis_cache = AnalysisCache(max_bytes=settings.ANALYSIS_CACHE_MAX_BYTES)
+    
+    # Bounded executor that keeps heavy generation and analysis off the event loop
+    app.state.executors = ExecutorManager(
+        max_active=settings.EXECUTOR_MAX_ACTIVE,
+        max_queued=settings.EXECUTOR_MAX_QUEUED,
+        retry_after=settings.EXECUTOR_RETRY_AFTER,
+    )
+    
+    # Stored uploads; opening the store indexes (and trims) the datasets of previous runs
+    app.state.dataset_store = await asyncio.to_thread(
+        DatasetStore,
+        settings.DATASET_DIR,
+        settings.DATASET_MAX_BYTES,
+    )
+    
+    # Background jobs; queued and interrupted jobs of previous runs are resumed
+    app.state.jobs = await asyncio.to_thread(
+        JobQueue,
+        settings.JOB_DIR,
+        job_runners(app.state.dataset_store),
+        settings.JOB_WORKERS,
+        settings.JOB_MAX_QUEUED,
+        settings.EXECUTOR_RETRY_AFTER,
+        settings.JOB_RETENTION_SECONDS,
+    )
+    app.state.jobs.start()
+    
+    # Train the zstd vocabulary dictionary up front rather than on a request
+    if settings.COMPRESSION_ZSTD_DICTIONARY and "zstd" in ENCODINGS:
+        await asyncio.to_thread(zstd_dictionary)
+    
     # Here you would initialize resources like:
     # - Database connections
     # - Background tasks
@@ -33,6 +82,12 @@ async def lifespan(app: FastAPI):
     # Shutdown: Clean up resources
     logger.info("Shutting down application...")
     
+    # Let running jobs finish (or requeue them) before their worker processes go away
+    await asyncio.to_thread(app.state.jobs.shutdown, settings.JOB_DRAIN_SECONDS)
+    
+    # Stop the executor threads and the generation worker processes
+    app.state.executors.shutdown()
+    
     # Here you would clean up resources like:
     # - Closing database connections
     # - Stopping background tasks
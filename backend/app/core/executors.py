@@ -0,0 +1,185 @@
+"""
+Bounded executors for CPU-bound work, with admission control
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+
+from app.api.utils.parallel import shutdown_process_pool
+
+
+logger = logging.getLogger("app")
+
+# Marks the end of a synchronous iterator advanced on a worker thread
+_EXHAUSTED = object()
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when heavy work is refused because every slot and queue place is taken"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy, retry later")
+        self.retry_after = retry_after
+
+
+class ExecutorSlot:
+    """An admitted unit of heavy work; releasing it more than once is harmless"""
+
+    def __init__(self, manager: "ExecutorManager"):
+        self._manager = manager
+        self._released = False
+
+    def release(self) -> None:
+        """
+        Give the slot back to the executor manager.
+        """
+        if not self._released:
+            self._released = True
+            self._manager._release()
+
+
+class ExecutorManager:
+    """
+    Runs heavy generation and analysis work off the event loop.
+
+    At most ``max_active`` tasks run at a time on a dedicated thread pool and
+    at most ``max_queued`` more wait for a thread. Anything beyond that is
+    refused immediately with ExecutorSaturatedError instead of piling up, so
+    the event loop (and cheap endpoints such as /health) stay responsive.
+    """
+
+    def __init__(self, max_active: int, max_queued: int, retry_after: int):
+        """
+        Create the executor threads.
+
+        Large tables are additionally sharded across the generation process
+        pool from these threads; the manager owns that pool's shutdown.
+
+        Args:
+            max_active: Number of heavy tasks that run concurrently
+            max_queued: Number of admitted tasks that may wait for a thread
+            retry_after: Seconds clients are asked to wait when work is refused
+        """
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.retry_after = retry_after
+        self.threads = ThreadPoolExecutor(max_workers=max_active, thread_name_prefix="heavy-work")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of admitted tasks waiting for a thread"""
+        return max(0, self._admitted - self.max_active)
+
+    def acquire(self) -> ExecutorSlot:
+        """
+        Admit one unit of heavy work without waiting.
+
+        Returns:
+            A slot that must be released when the work is done
+
+        Raises:
+            ExecutorSaturatedError: If all threads are busy and the queue is full
+        """
+        with self._lock:
+            if self._admitted >= self.max_active + self.max_queued:
+                self.rejected += 1
+                raise ExecutorSaturatedError(self.retry_after)
+            self._admitted += 1
+        return ExecutorSlot(self)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._admitted -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a function on the executor threads and wait for its result.
+
+        Args:
+            fn: The function to run
+            *args: Positional arguments for the function
+            **kwargs: Keyword arguments for the function
+
+        Returns:
+            The function's return value
+
+        Raises:
+            ExecutorSaturatedError: If the work is refused
+        """
+        slot = self.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.threads, partial(fn, *args, **kwargs))
+        finally:
+            slot.release()
+
+    async def iterate(self, chunks: Iterator[bytes], slot: ExecutorSlot) -> AsyncIterator[bytes]:
+        """
+        Advance a synchronous chunk iterator on the executor threads.
+
+        The slot is acquired by the caller before the response starts (so a
+        refusal can still become an error response) and is released here
+        when the stream ends or is abandoned.
+
+        Args:
+            chunks: The iterator producing response chunks
+            slot: The admitted slot the stream runs under
+
+        Returns:
+            An async iterator of the same chunks
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.threads, next, chunks, _EXHAUSTED)
+                if chunk is _EXHAUSTED:
+                    break
+                yield chunk
+        finally:
+            slot.release()
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                # Close off the loop: a cancelled next() may still be running
+                try:
+                    self.threads.submit(self._close_quietly, close)
+                except RuntimeError:
+                    pass  # executor already shut down
+
+    @staticmethod
+    def _close_quietly(close: Callable[[], None]) -> None:
+        try:
+            close()
+        except ValueError:
+            # Still being advanced by another thread; it is dropped when that finishes
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report executor usage.
+
+        Returns:
+            Dictionary with active, queued and rejected task counts and the limits
+        """
+        with self._lock:
+            admitted = self._admitted
+        return {
+            "active": min(admitted, self.max_active),
+            "queued": max(0, admitted - self.max_active),
+            "max_active": self.max_active,
+            "max_queued": self.max_queued,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        """
+        Stop the executor threads and the generation process pool.
+        """
+        logger.info("Shutting down heavy work executors")
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        shutdown_process_pool()
@@ -0,0 +1,379 @@
+"""
+Prometheus-compatible metrics with lock-free per-thread counters
+"""
+import bisect
+import math
+import threading
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+
+# Upper bounds (seconds) of the request latency buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Media type of the text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class _ThreadCells:
+    """
+    Per-thread arrays of values, summed when read.
+
+    Each thread only ever updates its own array, so updates need no lock:
+    an in-place add by the single writer of a cell cannot be lost, and a
+    reader at worst sees a value one update old. Threads get their array
+    on first use, through an atomic dict.setdefault.
+    """
+
+    def __init__(self, size: int):
+        """
+        Args:
+            size: Number of values per thread
+        """
+        self._size = size
+        self._cells: Dict[int, List[float]] = {}
+
+    def cell(self) -> List[float]:
+        """
+        Get the calling thread's values.
+
+        Returns:
+            The mutable array of the thread
+        """
+        ident = threading.get_ident()
+        cell = self._cells.get(ident)
+        if cell is None:
+            cell = self._cells.setdefault(ident, [0] * self._size)
+        return cell
+
+    def totals(self) -> List[float]:
+        """
+        Sum the values of every thread.
+
+        Returns:
+            One total per value
+        """
+        totals = [0] * self._size
+        for cell in list(self._cells.values()):
+            for index, value in enumerate(cell):
+                totals[index] += value
+        return totals
+
+
+class _CounterChild:
+    """A counter with fixed label values"""
+
+    def __init__(self):
+        self._cells = _ThreadCells(1)
+
+    def inc(self, amount: float = 1) -> None:
+        """
+        Add to the counter.
+
+        Args:
+            amount: Non-negative increment
+        """
+        self._cells.cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        """Current total"""
+        return self._cells.totals()[0]
+
+
+class _GaugeChild:
+    """A gauge with fixed label values"""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """
+        Set the gauge.
+
+        Args:
+            value: The current value
+        """
+        self.value = value
+
+
+class _HistogramChild:
+    """A histogram with fixed label values"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = buckets
+        # One count per bucket and +Inf, then the sum of observations
+        self._cells = _ThreadCells(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        """
+        Count an observation.
+
+        Args:
+            value: The observed value (e.g. seconds)
+        """
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self._buckets, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """
+        Read the histogram.
+
+        Returns:
+            Cumulative counts of each bucket and +Inf, and the sum
+        """
+        totals = self._cells.totals()
+        cumulative = []
+        running = 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1]
+
+
+class Metric:
+    """A named family of time series with the same labels"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Args:
+            name: Metric name (counters get a _total suffix when exposed)
+            documentation: Help text
+            labelnames: Names of the labels of each series
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: object):
+        """
+        Get the series with the given label values, creating it on first use.
+
+        Args:
+            values: One value per label name, in order
+
+        Returns:
+            The series (with inc, set or observe)
+
+        Raises:
+            ValueError: If the number of values does not match the label names
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _series(self) -> Iterator[Tuple[Dict[str, str], object]]:
+        """
+        Iterate over the series with their labels.
+        """
+        for key, child in list(self._children.items()):
+            yield dict(zip(self.labelnames, key)), child
+
+    def samples(self) -> Iterator[Sample]:
+        """
+        Get the exposed samples of every series.
+
+        Returns:
+            (sample name, labels, value) tuples
+        """
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonic total, e.g. of rows or bytes"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        """
+        Add to the counter of a metric without labels.
+
+        Args:
+            amount: Non-negative increment
+        """
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self._series():
+            yield f"{self.name}_total", labels, child.value
+
+
+class Gauge(Metric):
+    """Value that goes up and down, e.g. a queue depth"""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        """
+        Set the gauge of a metric without labels.
+
+        Args:
+            value: The current value
+        """
+        self.labels().set(value)
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self._series():
+            yield self.name, labels, child.value
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets, e.g. of latencies"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        """
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels of each series
+            buckets: Increasing upper bounds of the buckets (+Inf is implied)
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """
+        Count an observation of a metric without labels.
+
+        Args:
+            value: The observed value
+        """
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self._series():
+            counts, total = child.snapshot()
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, counts[-1]
+
+
+def _format_value(value: float) -> str:
+    """
+    Format a sample value or bucket bound for the text format.
+    """
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """
+    Escape a label value for the text format.
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    """The metrics exposed by /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Add a metric.
+
+        Args:
+            metric: The metric
+
+        Returns:
+            The same metric
+
+        Raises:
+            ValueError: If a metric with the same name is registered
+        """
+        if self._metrics.setdefault(metric.name, metric) is not metric:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        return metric
+
+    def metrics(self) -> List[Metric]:
+        """
+        Get the registered metrics.
+
+        Returns:
+            The metrics, in registration order
+        """
+        return list(self._metrics.values())
+
+    @staticmethod
+    def render(metrics: Iterable[Metric]) -> str:
+        """
+        Format metrics in the Prometheus text exposition format (0.0.4).
+
+        Args:
+            metrics: The metrics to format
+
+        Returns:
+            The exposition text
+        """
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    pairs = ",".join(f'{label}="{_escape(text)}"' for label, text in labels.items())
+                    name = f"{name}{{{pairs}}}"
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the end of its response body",
+    ("method", "route", "format", "status"),
+))
+HTTP_RESPONSE_BYTES = REGISTRY.register(Counter(
+    "http_response_bytes",
+    "Response body bytes sent (after compression)",
+    ("route", "format"),
+))
+ROWS_GENERATED = REGISTRY.register(Counter(
+    "table_rows_generated",
+    "Rows generated by TableProcessor",
+))
+BYTES_SERIALIZED = REGISTRY.register(Counter(
+    "table_bytes_serialized",
+    "Bytes of generated tables encoded by TableProcessor, before compression",
+    ("format",),
+))
+UPLOAD_BYTES_PARSED = REGISTRY.register(Counter(
+    "upload_bytes_parsed",
+    "Bytes of uploaded files read by their analysis",
+    ("file_type",),
+))
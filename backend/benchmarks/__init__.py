@@ -0,0 +1,5 @@
+"""
+Benchmark suite for table generation, serialization, analysis and the data API
+
+Run from the backend directory with `python -m benchmarks` (see __main__).
+"""
@@ -0,0 +1,77 @@
+"""
+Command-line entry point of the benchmark suite
+
+Examples (from the backend directory):
+
+    python -m benchmarks                          # quick scale, saved to benchmarks/results/
+    python -m benchmarks --scale full -k analyze  # 1e3 to 1e7 rows, analysis cases only
+    python -m benchmarks --compare benchmarks/results/base.json
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from benchmarks.runner import (
+    DEFAULT_SCALE,
+    DEFAULT_TIMEOUT,
+    MIN_REPEAT,
+    REGRESSION_THRESHOLD,
+    SCALES,
+    compare_reports,
+    default_output_path,
+    discover,
+    format_result,
+    load_report,
+    run_suite,
+    save_report,
+)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the benchmarks selected on the command line.
+
+    Args:
+        argv: Command-line arguments (defaults to sys.argv)
+
+    Returns:
+        Exit status: 1 if a case failed or regressed against --compare, else 0
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark generation, serialization, analysis and the data API")
+    parser.add_argument("--scale", choices=list(SCALES), default=DEFAULT_SCALE, help="Row counts to run (full: 1e3 to 1e7)")
+    parser.add_argument("-k", "--filter", help="Only run cases whose name or parameters contain this text")
+    parser.add_argument("-o", "--output", help="JSON file for the results (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare median times with an earlier results file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Relative slowdown reported as a regression")
+    parser.add_argument("--repeat", type=int, default=MIN_REPEAT, help="Minimum number of timed calls per case")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds after which a case is killed")
+    parser.add_argument("--list", action="store_true", help="List the cases without running them")
+    args = parser.parse_args(argv)
+
+    cases = discover(args.scale, args.filter)
+    if args.list:
+        for case in cases:
+            print(case.label)
+        return 0
+
+    report = run_suite(
+        cases, args.scale, args.repeat, args.timeout,
+        progress=lambda case, result: print(format_result(case, result), flush=True)
+    )
+    output = args.output or default_output_path(report["commit"])
+    save_report(report, output)
+    print(f"Results saved to {output}")
+    failed = any("error" in result for result in report["results"])
+
+    regressed = False
+    if args.compare:
+        for comparison in compare_reports(load_report(args.compare), report, args.threshold):
+            if comparison["change"] == "same":
+                continue
+            regressed |= comparison["change"] == "regression"
+            print(f"{comparison['change']}: {comparison['benchmark']}{comparison['params']} x{comparison['ratio']:.2f}")
+    return 1 if failed or regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""
+Benchmarks of CSV upload analysis
+"""
+import io
+
+from app.api.utils.table_processor import TableProcessor
+from benchmarks.runner import Rows
+from benchmarks.tables import COLUMN_COUNTS, DATA_TYPE_SETS, csv_bytes
+
+
+class AnalyzeCsv:
+    """Analysis of CSV content with each parser and profile level"""
+
+    params = [Rows(), COLUMN_COUNTS, list(DATA_TYPE_SETS)]
+    param_names = ["rows", "columns", "data_types"]
+
+    def setup(self, rows: int, columns: int, data_type_set: str) -> None:
+        self.rows = rows
+        self.content = csv_bytes(rows, columns, data_type_set)
+        # Throughput of analysis is that of the parsed CSV
+        self.nbytes = len(self.content)
+
+    def time_analyze_csv(self, rows: int, columns: int, data_type_set: str) -> None:
+        TableProcessor.analyze_csv(self.content)
+
+    def time_analyze_csv_profile(self, rows: int, columns: int, data_type_set: str) -> None:
+        TableProcessor.analyze_csv(self.content, profile=True)
+
+    def time_analyze_csv_typed(self, rows: int, columns: int, data_type_set: str) -> None:
+        TableProcessor.analyze_csv_file(io.BytesIO(self.content), typed=True)
@@ -0,0 +1,92 @@
+"""
+Benchmarks of the data endpoints, called in-process through the ASGI app
+"""
+import logging
+
+from fastapi.testclient import TestClient
+
+from app.api.analysis_cache import AnalysisCache
+from app.api.response_cache import ResponseCache
+from app.api.utils.table_processor import TableProcessor
+from app.core.config import settings
+from benchmarks.runner import Rows
+from benchmarks.tables import DATA_TYPE_SETS, SEED, csv_bytes
+from main import app
+
+
+# Uploads are held in memory by the client
+UPLOAD_ROW_LIMIT = 1_000_000
+
+API_FORMATS = ["csv", "json", "arrow", "parquet"]
+
+# The client logs every request, which would drown the results
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class _ApiBenchmark:
+    """Runs the app's lifespan around a case, with its caches and artificial delays disabled"""
+
+    def setup_client(self) -> None:
+        self.client = TestClient(app)
+        self.client.__enter__()
+        # Every call does the full work instead of replaying the first response
+        app.state.response_cache = ResponseCache(max_bytes=0, max_entry_bytes=0)
+        app.state.analysis_cache = AnalysisCache(max_bytes=0)
+        # Cases run in their own process, so the setting does not leak
+        settings.GENERATE_DELAY_PER_COLUMN = 0
+
+    def teardown(self, *params) -> None:
+        self.client.__exit__(None, None, None)
+
+
+class GenerateEndpoint(_ApiBenchmark):
+    """GET /api/data/generate in each output format"""
+
+    params = [Rows(), API_FORMATS]
+    param_names = ["rows", "format"]
+
+    def setup(self, rows: int, output_format: str) -> None:
+        self.rows = rows
+        self.setup_client()
+
+    def time_generate(self, rows: int, output_format: str) -> bytes:
+        response = self.client.get("/api/data/generate", params={"rows": rows, "columns": 10, "format": output_format})
+        response.raise_for_status()
+        return response.content
+
+
+class SampleEndpoint(_ApiBenchmark):
+    """GET /api/data/sample/{sample_type} as JSON"""
+
+    params = [Rows(), list(TableProcessor.SAMPLE_SCHEMAS)]
+    param_names = ["rows", "sample_type"]
+
+    def setup(self, rows: int, sample_type: str) -> None:
+        self.rows = rows
+        self.setup_client()
+
+    def time_sample(self, rows: int, sample_type: str) -> bytes:
+        response = self.client.get(f"/api/data/sample/{sample_type}", params={"rows": rows, "seed": SEED, "format": "json"})
+        response.raise_for_status()
+        return response.content
+
+
+class UploadEndpoint(_ApiBenchmark):
+    """POST /api/data/upload of a CSV file with each parser"""
+
+    params = [Rows(limit=UPLOAD_ROW_LIMIT), list(DATA_TYPE_SETS), ["pandas", "typed"]]
+    param_names = ["rows", "data_types", "parser"]
+
+    def setup(self, rows: int, data_type_set: str, parser: str) -> None:
+        self.rows = rows
+        self.content = csv_bytes(rows, 10, data_type_set)
+        self.nbytes = len(self.content)
+        self.setup_client()
+
+    def time_upload(self, rows: int, data_type_set: str, parser: str) -> None:
+        response = self.client.post(
+            "/api/data/upload",
+            params={"parser": parser},
+            files={"file": ("upload.csv", self.content, "text/csv")}
+        )
+        response.raise_for_status()
@@ -0,0 +1,59 @@
+"""
+Benchmarks of table generation
+"""
+from typing import Any, List
+
+from app.api.utils.table_processor import TableProcessor
+from benchmarks.runner import Rows
+from benchmarks.tables import COLUMN_COUNTS, DATA_TYPE_SETS, SEED, data_types
+
+
+# Row-oriented output holds every value as a Python object
+ROW_LIMIT = 1_000_000
+
+
+class GenerateTable:
+    """Column-oriented generation (the engine behind every output format)"""
+
+    params = [Rows(), COLUMN_COUNTS, list(DATA_TYPE_SETS)]
+    param_names = ["rows", "columns", "data_types"]
+
+    def setup(self, rows: int, columns: int, data_type_set: str) -> None:
+        self.rows = rows
+        self.types = data_types(data_type_set, columns)
+
+    def time_generate_table(self, rows: int, columns: int, data_type_set: str) -> None:
+        TableProcessor.generate_table(rows, columns, self.types, SEED)
+
+
+class GenerateTableData:
+    """Row-oriented generation, as lists of values"""
+
+    params = [Rows(limit=ROW_LIMIT), COLUMN_COUNTS, list(DATA_TYPE_SETS)]
+    param_names = ["rows", "columns", "data_types"]
+
+    def setup(self, rows: int, columns: int, data_type_set: str) -> None:
+        self.rows = rows
+        self.types = data_types(data_type_set, columns)
+
+    def time_generate_table_data(self, rows: int, columns: int, data_type_set: str) -> List[List[Any]]:
+        return TableProcessor.generate_table_data(rows, columns, self.types, seed=SEED)
+
+
+class GenerateSample:
+    """Sample datasets in each of their output forms"""
+
+    params = [Rows(limit=ROW_LIMIT), list(TableProcessor.SAMPLE_SCHEMAS)]
+    param_names = ["rows", "sample_type"]
+
+    def setup(self, rows: int, sample_type: str) -> None:
+        self.rows = rows
+
+    def time_generate_sample_table(self, rows: int, sample_type: str) -> None:
+        TableProcessor.generate_sample_table(sample_type, rows, SEED)
+
+    def time_generate_sample_csv(self, rows: int, sample_type: str) -> bytes:
+        return TableProcessor.generate_sample_csv(sample_type, rows)
+
+    def time_generate_sample_json(self, rows: int, sample_type: str) -> None:
+        TableProcessor.generate_sample_json(sample_type, rows)
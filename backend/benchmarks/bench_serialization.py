@@ -0,0 +1,72 @@
+"""
+Benchmarks of the row-oriented converters and the streamed output formats
+"""
+from app.api.utils.table_processor import TableProcessor
+from benchmarks.runner import Rows
+from benchmarks.tables import COLUMN_COUNTS, DATA_TYPE_SETS, SEED, data_types
+
+
+# Row-oriented tables hold every value as a Python object
+ROW_LIMIT = 1_000_000
+
+STREAM_FORMATS = ["csv", "ndjson", "json", "arrow", "parquet"]
+
+
+class TableConverters:
+    """The table_to_* converters of row-oriented tables"""
+
+    params = [Rows(limit=ROW_LIMIT), COLUMN_COUNTS, list(DATA_TYPE_SETS)]
+    param_names = ["rows", "columns", "data_types"]
+
+    def setup(self, rows: int, columns: int, data_type_set: str) -> None:
+        self.rows = rows
+        self.table = TableProcessor.generate_table_data(rows, columns, data_types(data_type_set, columns), seed=SEED)
+
+    def time_table_to_csv_string(self, rows: int, columns: int, data_type_set: str) -> str:
+        return TableProcessor.table_to_csv_string(self.table)
+
+    def time_table_to_csv_bytes(self, rows: int, columns: int, data_type_set: str) -> bytes:
+        return TableProcessor.table_to_csv_bytes(self.table)
+
+    def time_table_to_json(self, rows: int, columns: int, data_type_set: str) -> None:
+        TableProcessor.table_to_json(self.table)
+
+    def time_table_to_json_string(self, rows: int, columns: int, data_type_set: str) -> str:
+        return TableProcessor.table_to_json_string(self.table)
+
+    def time_table_to_json_bytes(self, rows: int, columns: int, data_type_set: str) -> bytes:
+        return TableProcessor.table_to_json_bytes(self.table)
+
+    def time_table_to_json_response(self, rows: int, columns: int, data_type_set: str) -> None:
+        TableProcessor.table_to_json_response(self.table)
+
+    def time_table_to_dataframe(self, rows: int, columns: int, data_type_set: str) -> None:
+        TableProcessor.table_to_dataframe(self.table)
+
+
+class JsonOrients:
+    """JSON encoding of each row layout"""
+
+    params = [Rows(limit=ROW_LIMIT), ["records", "split", "columns"]]
+    param_names = ["rows", "orient"]
+
+    def setup(self, rows: int, orient: str) -> None:
+        self.rows = rows
+        self.table = TableProcessor.generate_table_data(rows, 10, seed=SEED)
+
+    def time_table_to_json_bytes(self, rows: int, orient: str) -> bytes:
+        return TableProcessor.table_to_json_bytes(self.table, orient)
+
+
+class StreamTable:
+    """Generation and encoding of the streamed formats, end to end"""
+
+    params = [Rows(), STREAM_FORMATS, list(DATA_TYPE_SETS)]
+    param_names = ["rows", "format", "data_types"]
+
+    def setup(self, rows: int, output_format: str, data_type_set: str) -> None:
+        self.rows = rows
+        self.spec = TableProcessor.create_table_spec(rows, 10, data_types(data_type_set, 10), SEED)
+
+    def time_stream_table(self, rows: int, output_format: str, data_type_set: str) -> None:
+        self.nbytes = sum(len(chunk) for chunk in TableProcessor.stream_table(self.spec, output_format))
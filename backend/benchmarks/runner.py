@@ -0,0 +1,435 @@
+"""
+Discovery, timing and reporting of the benchmark cases
+
+Benchmarks are written in the style of airspeed velocity (ASV): each module
+named in MODULES holds classes with `params` (one list of values per
+parameter, or Rows for the row counts of the chosen scale), `param_names`,
+an optional `setup(*params)` / `teardown(*params)`, and `time_*(*params)`
+methods. Setup raising NotImplementedError skips a combination.
+
+Every case (method and combination of parameters) runs in a fresh forked
+process, so that its peak RSS is its own. Throughput is derived from
+`self.rows`, set by setup, and from the size of the timed method's return
+value when it is bytes or text, or else `self.nbytes`.
+"""
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# Row counts of each scale; "full" covers the whole supported range
+SCALES = {
+    "smoke": [1_000],
+    "quick": [1_000, 100_000],
+    "full": [1_000, 100_000, 1_000_000, 10_000_000],
+}
+DEFAULT_SCALE = "quick"
+
+# Benchmark modules of this package, in run order
+MODULES = ("bench_generation", "bench_serialization", "bench_analysis", "bench_api")
+
+# Timed calls per case: at least MIN_REPEAT, then more until MIN_SECONDS have passed
+MIN_REPEAT = 3
+MAX_REPEAT = 10
+MIN_SECONDS = 1.0
+
+# Cases killed after this long, e.g. a 10M-row case on a slow machine
+DEFAULT_TIMEOUT = 900.0
+
+# A case is reported as a regression when its median time grows by more than this
+REGRESSION_THRESHOLD = 0.10
+
+# Packages whose versions are recorded with the results
+PACKAGES = ("numpy", "pandas", "pyarrow", "orjson", "fastapi", "starlette")
+
+_MB = 1024 * 1024
+
+
+class Rows:
+    """Parameter taking the row counts of the scale being run"""
+
+    def __init__(self, limit: Optional[int] = None):
+        """
+        Args:
+            limit: Largest row count, for cases that hold every row as Python objects
+        """
+        self.limit = limit
+
+    def values(self, scale: str) -> List[int]:
+        """
+        Get the row counts of a scale.
+
+        Args:
+            scale: One of SCALES
+
+        Returns:
+            The scale's row counts up to the limit
+        """
+        return [rows for rows in SCALES[scale] if self.limit is None or rows <= self.limit]
+
+
+@dataclass
+class Case:
+    """One benchmark method with one combination of parameters"""
+
+    module: str
+    class_name: str
+    method: str
+    params: Tuple[Any, ...]
+    param_names: Tuple[str, ...]
+
+    @property
+    def name(self) -> str:
+        """Dotted name of the benchmark method"""
+        return f"{self.module}.{self.class_name}.{self.method}"
+
+    @property
+    def label(self) -> str:
+        """Name and parameters, for progress output and filtering"""
+        values = ", ".join(f"{name}={value}" for name, value in zip(self.param_names, self.params))
+        return f"{self.name}({values})"
+
+
+def discover(scale: str = DEFAULT_SCALE, pattern: Optional[str] = None) -> List[Case]:
+    """
+    Find the benchmark cases of the suite.
+
+    Args:
+        scale: One of SCALES, for the Rows parameters
+        pattern: Only keep cases whose label contains this text
+
+    Returns:
+        The cases, in module, class and method order
+    """
+    cases = []
+    for module_name in MODULES:
+        module = importlib.import_module(f"{__package__}.{module_name}")
+        for class_name, benchmark in vars(module).items():
+            if not isinstance(benchmark, type) or benchmark.__module__ != module.__name__:
+                continue
+            methods = sorted(name for name in vars(benchmark) if name.startswith("time_"))
+            if not methods:
+                continue
+            params = [
+                values.values(scale) if isinstance(values, Rows) else list(values)
+                for values in getattr(benchmark, "params", [])
+            ]
+            param_names = tuple(getattr(benchmark, "param_names", [f"param{i}" for i in range(len(params))]))
+            for method in methods:
+                for combination in itertools.product(*params):
+                    case = Case(module_name, class_name, method, combination, param_names)
+                    if pattern is None or pattern in case.label:
+                        cases.append(case)
+    return cases
+
+
+def _rss_mb() -> float:
+    """
+    Get the current resident set size of this process.
+
+    Returns:
+        RSS in MB
+    """
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / _MB
+
+
+def _time_case(case: Case, min_repeat: int) -> Dict[str, Any]:
+    """
+    Set up and time one case in the current process.
+
+    Args:
+        case: The case to run
+        min_repeat: Minimum number of timed calls
+
+    Returns:
+        The case's measurements (see run_case)
+    """
+    module = importlib.import_module(f"{__package__}.{case.module}")
+    benchmark = getattr(module, case.class_name)()
+    baseline_rss = _rss_mb()
+    try:
+        if hasattr(benchmark, "setup"):
+            benchmark.setup(*case.params)
+    except NotImplementedError:
+        return {"skipped": True}
+    method: Callable[..., Any] = getattr(benchmark, case.method)
+
+    try:
+        # Warm-up call, which also gives the output size
+        output = method(*case.params)
+        timings: List[float] = []
+        while len(timings) < MAX_REPEAT and (len(timings) < min_repeat or sum(timings) < MIN_SECONDS):
+            start = time.perf_counter()
+            method(*case.params)
+            timings.append(time.perf_counter() - start)
+    finally:
+        if hasattr(benchmark, "teardown"):
+            benchmark.teardown(*case.params)
+
+    if isinstance(output, (bytes, bytearray, memoryview, str)):
+        nbytes = len(output)
+    else:
+        nbytes = getattr(benchmark, "nbytes", None)
+    rows = getattr(benchmark, "rows", None)
+    median = statistics.median(timings)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "repeat": len(timings),
+        "min_seconds": min(timings),
+        "median_seconds": median,
+        "rows_per_second": rows / median if rows else None,
+        "bytes": nbytes,
+        "mb_per_second": nbytes / _MB / median if nbytes else None,
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+    }
+
+
+def _case_process(case: Case, min_repeat: int, connection: Any) -> None:
+    """
+    Entry point of the process running one case; sends back its measurements.
+    """
+    try:
+        connection.send(_time_case(case, min_repeat))
+    except BaseException:
+        connection.send({"error": traceback.format_exc(limit=5)})
+    finally:
+        connection.close()
+
+
+def run_case(case: Case, min_repeat: int = MIN_REPEAT, timeout: float = DEFAULT_TIMEOUT) -> Dict[str, Any]:
+    """
+    Run one case in a forked process.
+
+    Args:
+        case: The case to run
+        min_repeat: Minimum number of timed calls
+        timeout: Seconds after which the case is killed
+
+    Returns:
+        The case's name and parameters with its measurements: repeat,
+        min_seconds, median_seconds, rows_per_second, bytes, mb_per_second,
+        baseline_rss_mb and peak_rss_mb; or "skipped", or "error"
+    """
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_case_process, args=(case, min_repeat, sender), daemon=True)
+    process.start()
+    sender.close()
+    try:
+        if receiver.poll(timeout):
+            measurements = receiver.recv()
+        else:
+            measurements = {"error": f"Timed out after {timeout:g} seconds"}
+    except EOFError:
+        measurements = None
+    finally:
+        process.kill()
+        process.join()
+        receiver.close()
+    if measurements is None:
+        # Killed without a word, typically by the OOM killer
+        measurements = {"error": f"Benchmark process exited with code {process.exitcode}"}
+    return {"benchmark": case.name, "params": dict(zip(case.param_names, case.params)), **measurements}
+
+
+def _git_commit() -> Optional[str]:
+    """
+    Get the commit of the working tree, if it is a git checkout.
+
+    Returns:
+        The commit hash, or None
+    """
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+def machine_info() -> Dict[str, Any]:
+    """
+    Describe the machine and environment the benchmarks run on.
+
+    Returns:
+        Python version, platform, CPU count and package versions
+    """
+    packages = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = importlib.import_module(package).__version__
+        except (ImportError, AttributeError):
+            packages[package] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": packages,
+    }
+
+
+def run_suite(
+    cases: List[Case],
+    scale: str = DEFAULT_SCALE,
+    min_repeat: int = MIN_REPEAT,
+    timeout: float = DEFAULT_TIMEOUT,
+    progress: Optional[Callable[[Case, Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Run benchmark cases one after the other.
+
+    Args:
+        cases: The cases to run (see discover)
+        scale: The scale the cases were discovered at, recorded with the results
+        min_repeat: Minimum number of timed calls per case
+        timeout: Seconds after which a case is killed
+        progress: Called with each case and its result as it finishes
+
+    Returns:
+        The report: run metadata (started_at, commit, scale, machine) and results
+    """
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "scale": scale,
+        "machine": machine_info(),
+        "results": [],
+    }
+    for case in cases:
+        result = run_case(case, min_repeat, timeout)
+        report["results"].append(result)
+        if progress is not None:
+            progress(case, result)
+    return report
+
+
+def save_report(report: Dict[str, Any], path: str) -> None:
+    """
+    Write a report as JSON.
+
+    Args:
+        report: The report of run_suite
+        path: The file to write (its directory is created)
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    """
+    Read a report saved by save_report.
+
+    Args:
+        path: The report's file
+
+    Returns:
+        The report
+    """
+    with open(path) as file:
+        return json.load(file)
+
+
+def _result_key(result: Dict[str, Any]) -> str:
+    """
+    Get the key matching results of the same case across reports.
+    """
+    return f"{result['benchmark']}{json.dumps(result['params'], sort_keys=True)}"
+
+
+def compare_reports(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = REGRESSION_THRESHOLD
+) -> Iterator[Dict[str, Any]]:
+    """
+    Compare the median times of the cases two reports have in common.
+
+    Args:
+        baseline: The earlier report
+        current: The report to check
+        threshold: Relative slowdown beyond which a case is a regression
+            (and relative speedup beyond which it is an improvement)
+
+    Returns:
+        For each common case: benchmark, params, baseline and current
+        median_seconds, their ratio, and change ("regression",
+        "improvement" or "same")
+    """
+    baseline_results = {
+        _result_key(result): result for result in baseline["results"] if "median_seconds" in result
+    }
+    for result in current["results"]:
+        before = baseline_results.get(_result_key(result))
+        if before is None or "median_seconds" not in result:
+            continue
+        ratio = result["median_seconds"] / before["median_seconds"]
+        if ratio > 1 + threshold:
+            change = "regression"
+        elif ratio < 1 / (1 + threshold):
+            change = "improvement"
+        else:
+            change = "same"
+        yield {
+            "benchmark": result["benchmark"],
+            "params": result["params"],
+            "baseline_seconds": before["median_seconds"],
+            "current_seconds": result["median_seconds"],
+            "ratio": ratio,
+            "change": change,
+        }
+
+
+def format_result(case: Case, result: Dict[str, Any]) -> str:
+    """
+    Format a case's result as one line of progress output.
+
+    Args:
+        case: The case
+        result: Its result (see run_case)
+
+    Returns:
+        The line
+    """
+    if result.get("skipped"):
+        return f"{case.label}: skipped"
+    if "error" in result:
+        return f"{case.label}: failed\n{result['error']}"
+    parts = [f"{result['median_seconds'] * 1000:.2f} ms"]
+    if result["rows_per_second"]:
+        parts.append(f"{result['rows_per_second']:,.0f} rows/s")
+    if result["mb_per_second"]:
+        parts.append(f"{result['mb_per_second']:.1f} MB/s")
+    parts.append(f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    return f"{case.label}: " + ", ".join(parts)
+
+
+def default_output_path(commit: Optional[str] = None) -> str:
+    """
+    Get the file a run's results are saved to by default.
+
+    Args:
+        commit: The benchmarked commit, if known
+
+    Returns:
+        results/<timestamp>[-<commit>].json next to this module
+    """
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    suffix = f"-{commit[:10]}" if commit else ""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", f"{timestamp}{suffix}.json")
@@ -0,0 +1,56 @@
+"""
+Inputs shared by the benchmark modules
+"""
+import io
+from typing import Dict, List, Optional
+
+from app.api.utils.table_processor import TableProcessor
+
+
+# Fixed seed, so that every run benchmarks the same tables
+SEED = 20240101
+
+# Column type mixes; None lets the seed pick types from all of them
+DATA_TYPE_SETS: Dict[str, Optional[List[str]]] = {
+    "numeric": ["integer", "float", "boolean", "price", "date"],
+    "text": ["string", "email", "name", "address", "product"],
+    "mixed": None,
+}
+
+COLUMN_COUNTS = [5, 20]
+
+
+def data_types(data_type_set: str, columns: int) -> Optional[List[str]]:
+    """
+    Get the column types of a table with one of the type mixes.
+
+    Args:
+        data_type_set: One of DATA_TYPE_SETS
+        columns: Number of columns
+
+    Returns:
+        The types, cycling through the mix, or None for random types
+    """
+    types = DATA_TYPE_SETS[data_type_set]
+    if types is None:
+        return None
+    return [types[i % len(types)] for i in range(columns)]
+
+
+def csv_bytes(rows: int, columns: int, data_type_set: str) -> bytes:
+    """
+    Generate a CSV file, as an upload would hold it.
+
+    Args:
+        rows: Number of rows
+        columns: Number of columns
+        data_type_set: One of DATA_TYPE_SETS
+
+    Returns:
+        The CSV content, with a header row
+    """
+    spec = TableProcessor.create_table_spec(rows, columns, data_types(data_type_set, columns), SEED)
+    buffer = io.BytesIO()
+    for chunk in TableProcessor.stream_csv(spec):
+        buffer.write(chunk)
+    return buffer.getvalue()
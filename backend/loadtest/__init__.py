@@ -0,0 +1,6 @@
+"""
+Closed-loop load testing of the API, run against a local uvicorn server
+
+Use it from the backend directory with `python -m loadtest` (see __main__),
+or from tests with the fixtures of loadtest.pytest_plugin.
+"""
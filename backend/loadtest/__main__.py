@@ -0,0 +1,98 @@
+"""
+Command-line entry point of the load generator
+
+Examples (from the backend directory):
+
+    python -m loadtest                                     # mixed traffic, 8 clients, 30 s
+    python -m loadtest --rate 50 --concurrency 32 --max-p99-ms 500
+    python -m loadtest --mix generate --env GENERATE_DELAY_PER_COLUMN=0 --json report.json
+    python -m loadtest --url http://staging:8000 --mix my_mix.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Dict, List, Optional
+
+from loadtest.generator import DEFAULT_TIMEOUT, run_load
+from loadtest.server import LocalServer
+from loadtest.traffic import MIXES, load_mix
+
+
+def _parse_env(assignments: List[str]) -> Dict[str, str]:
+    """
+    Parse KEY=VALUE arguments into environment variables.
+    """
+    env = {}
+    for assignment in assignments:
+        key, separator, value = assignment.partition("=")
+        if not separator:
+            raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got {assignment}")
+        env[key] = value
+    return env
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run a load test with the options given on the command line.
+
+    Args:
+        argv: Command-line arguments (defaults to sys.argv)
+
+    Returns:
+        Exit status: 1 if the error rate or p99 latency is beyond its limit, else 0
+    """
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Replay a traffic mix against the API and report latency percentiles")
+    parser.add_argument("--url", help="Server to load (default: start main:app with uvicorn on a free port)")
+    parser.add_argument("--mix", default="mixed", help=f"Traffic mix: {', '.join(MIXES)}, or a JSON file of operations")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of measured traffic")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of unmeasured traffic first")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients")
+    parser.add_argument("--rate", type=float, help="Target requests per second (default: as fast as the clients can)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds after which a request fails")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the choice of operations")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Setting of the local server (repeatable)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes of the local server")
+    parser.add_argument("--json", metavar="PATH", help="Write the report as JSON")
+    parser.add_argument("--hgrm-dir", metavar="DIR", help="Write HdrHistogram .hgrm latency distributions")
+    parser.add_argument("--max-error-rate", type=float, help="Fail if more requests than this fraction fail")
+    parser.add_argument("--max-p99-ms", type=float, help="Fail if the p99 latency is above this")
+    args = parser.parse_args(argv)
+
+    try:
+        operations = load_mix(args.mix)
+        env = _parse_env(args.env)
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        parser.error(str(e))
+
+    def run(url: str):
+        return asyncio.run(run_load(
+            url, operations, args.duration, args.concurrency, args.rate, args.warmup, args.timeout, args.seed
+        ))
+
+    if args.url:
+        report = run(args.url)
+    else:
+        with LocalServer(env=env, workers=args.workers) as server:
+            report = run(server.url)
+
+    print(report.format())
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report.to_dict(), file, indent=2)
+    if args.hgrm_dir:
+        report.write_histograms(args.hgrm_dir)
+
+    summary = report.to_dict()
+    failed = False
+    if args.max_error_rate is not None and summary["error_rate"] > args.max_error_rate:
+        print(f"Error rate {summary['error_rate']:.2%} is above {args.max_error_rate:.2%}")
+        failed = True
+    if args.max_p99_ms is not None and summary["latency"]["p99_ms"] > args.max_p99_ms:
+        print(f"p99 latency {summary['latency']['p99_ms']:.1f} ms is above {args.max_p99_ms:g} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Closed-loop asyncio load generator and its report
+"""
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.api.utils.table_processor import TableProcessor
+from loadtest.histogram import LatencyHistogram
+from loadtest.traffic import Operation
+
+
+# Seconds after which a request fails
+DEFAULT_TIMEOUT = 60.0
+
+
+class LoadReport:
+    """Latency histograms and status counts of a load test, overall and per operation"""
+
+    def __init__(self, operations: List[Operation], concurrency: int, target_rps: Optional[float]):
+        """
+        Args:
+            operations: The traffic mix
+            concurrency: Number of concurrent clients
+            target_rps: Request rate aimed at, or None for as fast as possible
+        """
+        self.concurrency = concurrency
+        self.target_rps = target_rps
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.duration = 0.0
+        self.latency = LatencyHistogram()
+        self.operations = {operation.name: LatencyHistogram() for operation in operations}
+        self.statuses = {operation.name: Counter() for operation in operations}
+
+    def record(self, operation: str, latency_us: int, status: str) -> None:
+        """
+        Count a finished request.
+
+        Args:
+            operation: Name of the request's operation
+            latency_us: Its latency in microseconds
+            status: Its HTTP status code, or the name of the error that ended it
+        """
+        self.latency.record(latency_us)
+        self.operations[operation].record(latency_us)
+        self.statuses[operation][status] += 1
+
+    @staticmethod
+    def _errors(statuses: Counter) -> int:
+        """
+        Count the failed requests: error statuses and requests without a response.
+        """
+        return sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 400)
+
+    def _summary(self, histogram: LatencyHistogram, statuses: Counter) -> Dict[str, Any]:
+        """
+        Summarize the requests of one operation, or all of them.
+        """
+        errors = self._errors(statuses)
+        return {
+            "requests": histogram.total_count,
+            "errors": errors,
+            "error_rate": errors / histogram.total_count if histogram.total_count else 0.0,
+            "rps": histogram.total_count / self.duration if self.duration else 0.0,
+            "statuses": dict(sorted(statuses.items())),
+            "latency": histogram.summary(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the report as a JSON-serializable dictionary.
+
+        Returns:
+            Run settings, the summary of all requests (requests, errors,
+            error_rate, rps, statuses, latency percentiles in ms) and the
+            same summary per operation
+        """
+        total = sum(self.statuses.values(), Counter())
+        return {
+            "started_at": self.started_at,
+            "duration_seconds": self.duration,
+            "concurrency": self.concurrency,
+            "target_rps": self.target_rps,
+            **self._summary(self.latency, total),
+            "operations": {
+                name: self._summary(histogram, self.statuses[name])
+                for name, histogram in self.operations.items()
+            },
+        }
+
+    def format(self) -> str:
+        """
+        Format the report as a table, one row per operation and one for all.
+
+        Returns:
+            The table
+        """
+        report = self.to_dict()
+        target = f"{self.target_rps:g} rps target" if self.target_rps else "unthrottled"
+        lines = [
+            f"{report['duration_seconds']:.1f} s, {self.concurrency} clients, {target}",
+            f"{'operation':<16} {'requests':>9} {'rps':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}",
+        ]
+        rows = [*report["operations"].items(), ("all", report)]
+        for name, summary in rows:
+            latency = summary["latency"]
+            lines.append(
+                f"{name:<16} {summary['requests']:>9} {summary['rps']:>8.1f} {summary['error_rate']:>7.1%} "
+                f"{latency['p50_ms']:>9.1f} {latency['p95_ms']:>9.1f} {latency['p99_ms']:>9.1f} {latency['max_ms']:>9.1f}"
+            )
+        return "\n".join(lines)
+
+    def write_histograms(self, directory: str) -> List[str]:
+        """
+        Write the latency distributions as HdrHistogram .hgrm files.
+
+        Args:
+            directory: Directory of the files (created if needed)
+
+        Returns:
+            Paths of the files: all.hgrm and one per operation
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for name, histogram in [("all", self.latency), *self.operations.items()]:
+            path = os.path.join(directory, f"{name}.hgrm")
+            with open(path, "w") as file:
+                file.write(histogram.percentile_distribution())
+            paths.append(path)
+        return paths
+
+
+def _request_kwargs(operation: Operation) -> Dict[str, Any]:
+    """
+    Build the httpx arguments of an operation's requests, uploads included.
+    """
+    kwargs: Dict[str, Any] = {"params": operation.params}
+    if operation.upload_rows:
+        content = TableProcessor.generate_sample_csv("products", operation.upload_rows)
+        kwargs["files"] = {"file": (f"{operation.name}.csv", content, "text/csv")}
+    return kwargs
+
+
+async def run_load(
+    base_url: str,
+    operations: List[Operation],
+    duration: float = 10.0,
+    concurrency: int = 8,
+    rate: Optional[float] = None,
+    warmup: float = 0.0,
+    timeout: float = DEFAULT_TIMEOUT,
+    seed: int = 0
+) -> LoadReport:
+    """
+    Replay a traffic mix against a server with a fixed number of clients.
+
+    Each client sends one request at a time, drawing its operation from the
+    mix by weight. With a rate, requests are scheduled at evenly spaced
+    intended start times shared by the clients, and latency is measured from
+    the intended start, so that time spent waiting behind slow requests
+    (e.g. head-of-line blocking) is counted rather than hidden by the
+    clients slowing down (coordinated omission).
+
+    Args:
+        base_url: The server's base URL
+        operations: The traffic mix (see load_mix)
+        duration: Seconds of measured traffic
+        concurrency: Number of concurrent clients (and connections)
+        rate: Requests per second to aim at; None sends as fast as the clients can
+        warmup: Seconds of traffic sent before measuring, not counted in the report
+        timeout: Seconds after which a request fails
+        seed: Seed of the choice of operations
+
+    Returns:
+        The report of the measured requests
+    """
+    report = LoadReport(operations, concurrency, rate)
+    chooser = random.Random(seed)
+    weights = [operation.weight for operation in operations]
+    request_kwargs = {operation.name: _request_kwargs(operation) for operation in operations}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    start = time.monotonic()
+    measure_from = start + warmup
+    stop = measure_from + duration
+    next_slot = 0
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        nonlocal next_slot
+        while True:
+            now = time.monotonic()
+            if rate:
+                intended = start + next_slot / rate
+                next_slot += 1
+                if intended >= stop:
+                    return
+                if intended > now:
+                    await asyncio.sleep(intended - now)
+            else:
+                intended = now
+                if intended >= stop:
+                    return
+            operation = chooser.choices(operations, weights)[0]
+            try:
+                response = await client.request(operation.method, operation.path, **request_kwargs[operation.name])
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if intended >= measure_from:
+                report.record(operation.name, int((time.monotonic() - intended) * 1_000_000), status)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    report.duration = max(time.monotonic(), stop) - measure_from
+    return report
@@ -0,0 +1,207 @@
+"""
+High dynamic range (HDR) histogram of latencies
+
+Follows the bucket layout of HdrHistogram: values are counted in buckets
+whose width grows with the value, so that any recorded value is known to
+the configured number of significant figures over the whole range, in a
+fixed amount of memory. Reports use the .hgrm percentile distribution
+format of HdrHistogram, so they can be plotted with its tools.
+"""
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Percentiles reported in summaries
+SUMMARY_PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9)
+
+# Values are recorded in microseconds; reports are in milliseconds
+_REPORT_SCALE = 1000.0
+
+
+class LatencyHistogram:
+    """Counts of latencies in microseconds, to a fixed relative precision"""
+
+    def __init__(self, lowest: int = 1, highest: int = 60_000_000, significant_figures: int = 3):
+        """
+        Args:
+            lowest: Smallest distinguishable value (1 microsecond)
+            highest: Largest trackable value (60 seconds); larger values are clamped
+            significant_figures: Decimal digits of precision of every value (1 to 5)
+        """
+        if not 1 <= significant_figures <= 5:
+            raise ValueError("significant_figures must be between 1 and 5")
+        if lowest < 1 or highest < 2 * lowest:
+            raise ValueError("highest must be at least twice lowest, and lowest at least 1")
+        self.lowest = lowest
+        self.highest = highest
+        self.significant_figures = significant_figures
+
+        self._unit_magnitude = int(math.floor(math.log2(lowest)))
+        sub_bucket_count_magnitude = int(math.ceil(math.log2(2 * 10 ** significant_figures)))
+        self._sub_bucket_half_count_magnitude = max(sub_bucket_count_magnitude, 1) - 1
+        self._sub_bucket_count = 1 << (self._sub_bucket_half_count_magnitude + 1)
+        self._sub_bucket_half_count = self._sub_bucket_count // 2
+        self._sub_bucket_mask = (self._sub_bucket_count - 1) << self._unit_magnitude
+
+        # Buckets double in width until the highest value fits
+        bucket_count = 1
+        smallest_untrackable = self._sub_bucket_count << self._unit_magnitude
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self._counts = [0] * ((bucket_count + 1) * self._sub_bucket_half_count)
+
+        self.total_count = 0
+        self.min_value: Optional[int] = None
+        self.max_value = 0
+        self._total = 0
+
+    def _index(self, value: int) -> int:
+        """
+        Get the counts index of a value.
+        """
+        bucket = (value | self._sub_bucket_mask).bit_length() - (
+            self._unit_magnitude + self._sub_bucket_half_count_magnitude + 1
+        )
+        sub_bucket = value >> (bucket + self._unit_magnitude)
+        return ((bucket + 1) << self._sub_bucket_half_count_magnitude) + (sub_bucket - self._sub_bucket_half_count)
+
+    def _value_at_index(self, index: int) -> int:
+        """
+        Get the lowest value counted at an index.
+        """
+        bucket = (index >> self._sub_bucket_half_count_magnitude) - 1
+        sub_bucket = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket < 0:
+            sub_bucket -= self._sub_bucket_half_count
+            bucket = 0
+        return sub_bucket << (bucket + self._unit_magnitude)
+
+    def _highest_equivalent(self, value: int) -> int:
+        """
+        Get the largest value counted together with a value.
+        """
+        bucket = (value | self._sub_bucket_mask).bit_length() - (
+            self._unit_magnitude + self._sub_bucket_half_count_magnitude + 1
+        )
+        sub_bucket = value >> (bucket + self._unit_magnitude)
+        if sub_bucket >= self._sub_bucket_count:
+            bucket += 1
+        lowest_equivalent = self._value_at_index(self._index(value))
+        return lowest_equivalent + (1 << (self._unit_magnitude + bucket)) - 1
+
+    def record(self, value: int, count: int = 1) -> None:
+        """
+        Count a latency.
+
+        Args:
+            value: The latency in microseconds (clamped to the trackable range)
+            count: Number of times it occurred
+        """
+        value = min(max(int(value), 0), self.highest)
+        self._counts[self._index(value)] += count
+        self.total_count += count
+        self._total += value * count
+        self.min_value = value if self.min_value is None else min(self.min_value, value)
+        self.max_value = max(self.max_value, value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """
+        Add the counts of a histogram with the same layout.
+
+        Args:
+            other: The histogram to add
+
+        Raises:
+            ValueError: If the histograms have different ranges or precision
+        """
+        if (other.lowest, other.highest, other.significant_figures) != (self.lowest, self.highest, self.significant_figures):
+            raise ValueError("Only histograms with the same range and precision can be merged")
+        for index, count in enumerate(other._counts):
+            if count:
+                self._counts[index] += count
+        self.total_count += other.total_count
+        self._total += other._total
+        if other.min_value is not None:
+            self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+        self.max_value = max(self.max_value, other.max_value)
+
+    @property
+    def mean(self) -> float:
+        """Mean of the recorded values, in microseconds"""
+        return self._total / self.total_count if self.total_count else 0.0
+
+    def _iter_counts(self) -> Iterator[Tuple[int, int]]:
+        """
+        Iterate over the non-empty buckets, lowest first.
+        """
+        for index, count in enumerate(self._counts):
+            if count:
+                yield index, count
+
+    def value_at_percentile(self, percentile: float) -> int:
+        """
+        Get the value below or at which a percentage of the recorded values are.
+
+        Args:
+            percentile: Percentage, from 0 to 100
+
+        Returns:
+            The value in microseconds, to the histogram's precision (0 if empty)
+        """
+        if not self.total_count:
+            return 0
+        target = max(math.ceil(min(percentile, 100.0) / 100.0 * self.total_count), 1)
+        cumulative = 0
+        for index, count in self._iter_counts():
+            cumulative += count
+            if cumulative >= target:
+                return min(self._highest_equivalent(self._value_at_index(index)), self.max_value)
+        return self.max_value
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Summarize the distribution in milliseconds.
+
+        Returns:
+            count, min, mean, max and the SUMMARY_PERCENTILES (as p50, p99.9, ...)
+        """
+        summary = {
+            "count": self.total_count,
+            "min_ms": (self.min_value or 0) / _REPORT_SCALE,
+            "mean_ms": self.mean / _REPORT_SCALE,
+            "max_ms": self.max_value / _REPORT_SCALE,
+        }
+        for percentile in SUMMARY_PERCENTILES:
+            summary[f"p{percentile:g}_ms"] = self.value_at_percentile(percentile) / _REPORT_SCALE
+        return summary
+
+    def percentile_distribution(self, ticks_per_half_distance: int = 5) -> str:
+        """
+        Format the distribution as an HdrHistogram .hgrm report, in milliseconds.
+
+        Args:
+            ticks_per_half_distance: Rows per halving of the distance to 100%
+
+        Returns:
+            The report: value, percentile, total count and 1/(1-percentile)
+            per row, and the mean, max and count at the end
+        """
+        lines: List[str] = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}", ""]
+        if self.total_count:
+            percentile = 0.0
+            while True:
+                value = self.value_at_percentile(percentile)
+                reached = sum(count for index, count in self._iter_counts() if self._value_at_index(index) <= value)
+                fraction = reached / self.total_count
+                inverse = f"{1 / (1 - fraction):14.2f}" if fraction < 1 else f"{'inf':>14}"
+                lines.append(f"{value / _REPORT_SCALE:12.3f} {fraction:14.12f} {reached:10d} {inverse}")
+                if fraction >= 1:
+                    break
+                # Halve the distance to 100% every ticks_per_half_distance rows
+                half_distance = 2 ** int(math.log2(100.0 / max(100.0 - percentile, 1e-12)) + 1)
+                percentile += 100.0 / (half_distance * ticks_per_half_distance)
+                percentile = min(percentile, 100.0)
+        lines.append(f"#[Mean    = {self.mean / _REPORT_SCALE:12.3f}, Max     = {self.max_value / _REPORT_SCALE:12.3f}]")
+        lines.append(f"#[Total count    = {self.total_count:12d}]")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,76 @@
+"""
+Pytest fixtures running load tests against a local server
+
+Import the fixtures into a conftest.py:
+
+    from loadtest.pytest_plugin import load_server, load_server_env, load_test  # noqa: F401
+
+and override load_server_env there to change the server's settings.
+"""
+import asyncio
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+import pytest
+
+from loadtest.generator import LoadReport, run_load
+from loadtest.server import LocalServer
+from loadtest.traffic import Operation, load_mix
+
+
+@pytest.fixture(scope="session")
+def load_server_env(tmp_path_factory: pytest.TempPathFactory) -> Dict[str, str]:
+    """
+    Get the settings of the load test server, as environment variables.
+
+    Stored datasets and jobs go to a temporary directory, and the
+    artificial generation delay is off.
+
+    Args:
+        tmp_path_factory: The pytest temporary directory factory
+
+    Returns:
+        Environment variables of the server
+    """
+    data_dir = tmp_path_factory.mktemp("load_server")
+    return {
+        "GENERATE_DELAY_PER_COLUMN": "0",
+        "DATASET_DIR": str(data_dir / "datasets"),
+        "JOB_DIR": str(data_dir / "jobs"),
+    }
+
+
+@pytest.fixture(scope="session")
+def load_server(load_server_env: Dict[str, str]) -> Iterator[LocalServer]:
+    """
+    Serve the app with uvicorn in a child process for the whole session.
+
+    Args:
+        load_server_env: Environment variables of the server
+
+    Returns:
+        The running server
+    """
+    with LocalServer(env=load_server_env) as server:
+        yield server
+
+
+@pytest.fixture
+def load_test(load_server: LocalServer) -> Callable[..., LoadReport]:
+    """
+    Get a function running a load test against the local server.
+
+    The function takes the traffic mix (a name of MIXES, a JSON file or a
+    list of Operations) and the keyword arguments of run_load, and returns
+    the LoadReport.
+
+    Args:
+        load_server: The running server
+
+    Returns:
+        The load test function
+    """
+    def run(mix: Union[str, List[Operation]] = "mixed", duration: float = 2.0, concurrency: int = 4, rate: Optional[float] = None, **kwargs) -> LoadReport:
+        operations = load_mix(mix) if isinstance(mix, str) else mix
+        return asyncio.run(run_load(load_server.url, operations, duration, concurrency, rate, **kwargs))
+
+    return run
@@ -0,0 +1,149 @@
+"""
+The app served by uvicorn in a child process, for load tests
+"""
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+import httpx
+
+
+logger = logging.getLogger("app")
+
+# Directory of main.py, the app's entry point
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lines of the server's output shown when it fails to start
+STARTUP_LOG_LINES = 20
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    """
+    Get a TCP port nothing listens on.
+
+    Args:
+        host: Interface to bind
+
+    Returns:
+        The port number
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class LocalServer:
+    """
+    Runs `uvicorn main:app` in a child process until stopped.
+
+    The server runs in its own process, so that the load generator does not
+    share an interpreter (and its GIL) with it. Settings are overridden
+    through environment variables, e.g. {"GENERATE_DELAY_PER_COLUMN": "0"}.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+        env: Optional[Dict[str, str]] = None,
+        workers: int = 1,
+        startup_timeout: float = 60.0
+    ):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (a free one by default)
+            env: Environment variables of the server, on top of this process'
+            workers: Number of uvicorn worker processes
+            startup_timeout: Seconds to wait for the health check to pass
+        """
+        self.host = host
+        self.port = port
+        self.env = dict(env or {})
+        self.workers = workers
+        self.startup_timeout = startup_timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._log = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server"""
+        return f"http://{self.host}:{self.port}"
+
+    def _output_tail(self) -> str:
+        """
+        Get the last lines the server wrote.
+        """
+        self._log.seek(0)
+        lines = self._log.read().decode("utf-8", errors="replace").splitlines()
+        return "\n".join(lines[-STARTUP_LOG_LINES:])
+
+    def start(self) -> "LocalServer":
+        """
+        Start the server and wait until it answers its health check.
+
+        Returns:
+            The server
+
+        Raises:
+            RuntimeError: If the server exits or is not healthy in time
+        """
+        if self.port is None:
+            self.port = free_port(self.host)
+        # The app logs every request; keep its output off the load test's
+        self._log = tempfile.TemporaryFile()
+        command = [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", self.host, "--port", str(self.port),
+            "--workers", str(self.workers), "--log-level", "warning", "--no-access-log",
+        ]
+        self._process = subprocess.Popen(
+            command, cwd=BACKEND_DIR, env={**os.environ, **self.env},
+            stdout=self._log, stderr=subprocess.STDOUT
+        )
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                output = self._output_tail()
+                self.stop()
+                raise RuntimeError(f"Server exited with code {self._process.returncode}:\n{output}")
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1.0).status_code == 200:
+                    logger.info(f"Load test server listening on {self.url}")
+                    return self
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+        output = self._output_tail()
+        self.stop()
+        raise RuntimeError(f"Server not healthy after {self.startup_timeout:g} seconds:\n{output}")
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """
+        Stop the server, gracefully if it exits within the timeout.
+
+        Args:
+            timeout: Seconds to wait after SIGTERM before killing it
+        """
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def __enter__(self) -> "LocalServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
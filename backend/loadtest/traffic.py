@@ -0,0 +1,73 @@
+"""
+Traffic mixes replayed by the load generator
+"""
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class Operation:
+    """One kind of request of a traffic mix"""
+
+    name: str
+    method: str
+    path: str
+    # Relative share of the requests of the mix
+    weight: float = 1.0
+    params: Dict[str, Any] = field(default_factory=dict)
+    # Send a products sample CSV of this many rows as the multipart "file"
+    upload_rows: Optional[int] = None
+
+
+# Built-in mixes; uploads of the same file are answered from the analysis
+# cache after the first, unless the server runs with ANALYSIS_CACHE_MAX_BYTES=0
+MIXES: Dict[str, List[Operation]] = {
+    "mixed": [
+        Operation("health", "GET", "/health", weight=20),
+        Operation("generate", "GET", "/api/data/generate", weight=40, params={"rows": 1000, "columns": 5, "format": "json"}),
+        Operation("sample", "GET", "/api/data/sample/users", weight=30, params={"rows": 1000, "format": "csv"}),
+        Operation("upload", "POST", "/api/data/upload", weight=10, upload_rows=10_000),
+    ],
+    "generate": [
+        Operation("generate_json", "GET", "/api/data/generate", weight=1, params={"rows": 10_000, "columns": 10, "format": "json"}),
+        Operation("generate_csv", "GET", "/api/data/generate", weight=1, params={"rows": 10_000, "columns": 10, "format": "csv"}),
+        Operation("generate_large", "GET", "/api/data/generate", weight=0.1, params={"rows": 1_000_000, "columns": 10, "format": "parquet"}),
+    ],
+    "health": [
+        Operation("health", "GET", "/health"),
+    ],
+}
+
+
+def load_mix(mix: str) -> List[Operation]:
+    """
+    Get a traffic mix by name, or from a JSON file.
+
+    The file holds a list of operations, each an object with the fields of
+    Operation, e.g. {"name": "sample", "method": "GET", "path":
+    "/api/data/sample/users", "weight": 3, "params": {"rows": 100}}.
+
+    Args:
+        mix: One of MIXES, or the path of a JSON file
+
+    Returns:
+        The mix's operations
+
+    Raises:
+        ValueError: If the mix is unknown or the file is not a valid mix
+    """
+    if mix in MIXES:
+        return list(MIXES[mix])
+    if not os.path.isfile(mix):
+        raise ValueError(f"Unknown traffic mix {mix}; use one of {', '.join(MIXES)} or a JSON file")
+    with open(mix) as file:
+        entries = json.load(file)
+    try:
+        operations = [Operation(**entry) for entry in entries]
+    except TypeError as e:
+        raise ValueError(f"Invalid traffic mix {mix}: {e}")
+    if not operations or any(operation.weight <= 0 for operation in operations):
+        raise ValueError(f"Traffic mix {mix} needs operations with positive weights")
+    return operations
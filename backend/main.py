@@ -14,6 +14,10 @@ from app.api.dependencies import get_api_version
 from app.api.routes.health import router as health_router
 # from app.api.routes.csv_files import router as csv_files_router  # Original CSV router
 from app.api.routes.data import router as data_router  # New data generation router
+from app.api.routes.datasets import router as datasets_router
+from app.api.routes.jobs import router as jobs_router
+from app.api.routes.metrics import router as metrics_router
+from app.api.instrumentation import MetricsMiddleware
 from app.api.error_handlers import setup_exception_handlers
 
 
@@ -39,6 +43,10 @@ app.add_middleware(
     allow_headers=settings.CORS_HEADERS,
 )
 
+# Request latency and response size metrics (outermost, so every request is timed)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 # Root endpoint with redirect to docs
 @app.get("/", include_in_schema=False)
@@ -51,6 +59,10 @@ async def root():
 app.include_router(health_router)
 # app.include_router(csv_files_router)  # Original CSV files router
 app.include_router(data_router)       # New data generation router with format support
+app.include_router(datasets_router)   # Stored (uploaded) datasets
+app.include_router(jobs_router)       # Background generation and analysis jobs
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_router)  # Prometheus metrics
 
 
 # Setup exception handlers
@@ -8,8 +8,11 @@ import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
+from app.core.config import settings
 from main import app as fastapi_app
 
+pytest_plugins = ["loadtest.pytest_plugin"]
+
 
 @pytest.fixture(scope="session")
 def app() -> FastAPI:
@@ -23,12 +26,30 @@ def app() -> FastAPI:
 
 
 @pytest.fixture(scope="module")
-def client(app: FastAPI) -> Generator[TestClient, None, None]:
+def data_dirs(tmp_path_factory: pytest.TempPathFactory) -> Generator[None, None, None]:
+    """
+    Keep the files the app stores in a temporary directory instead of the checkout.
+    
+    Args:
+        tmp_path_factory: The pytest temporary directory factory
+    """
+    data_dir = tmp_path_factory.mktemp("data")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "DATASET_DIR", str(data_dir / "datasets"))
+        monkeypatch.setattr(settings, "JOB_DIR", str(data_dir / "jobs"))
+        yield
+
+
+@pytest.fixture(scope="module")
+def client(app: FastAPI, data_dirs: None) -> Generator[TestClient, None, None]:
     """
     Create a FastAPI TestClient for testing API endpoints.
     
+    The app's lifespan starts after data_dirs has moved its data directories.
+    
     Args:
         app: The FastAPI application instance
+        data_dirs: The temporary data directories fixture
         
     Returns:
         A TestClient instance for making requests
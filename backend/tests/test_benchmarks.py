@@ -0,0 +1,43 @@
+"""
+Tests for the benchmark runner
+"""
+from benchmarks.runner import compare_reports, discover, run_case
+
+
+def test_benchmark_case_reports_throughput_and_memory() -> None:
+    """
+    Test that a benchmark case runs in its own process and reports its time, throughput and peak RSS.
+    """
+    # Given
+    cases = discover("smoke", "GenerateSample.time_generate_sample_csv(rows=1000, sample_type=users")
+
+    # When
+    result = run_case(cases[0], min_repeat=1)
+
+    # Then
+    assert len(cases) == 1
+    assert result["params"] == {"rows": 1000, "sample_type": "users"}
+    assert result["rows_per_second"] == 1000 / result["median_seconds"]
+    assert result["mb_per_second"] > 0
+    assert result["peak_rss_mb"] >= result["baseline_rss_mb"] > 0
+
+
+def test_compare_reports_flags_regressions() -> None:
+    """
+    Test that cases whose median time grew beyond the threshold are reported as regressions.
+    """
+    # Given
+    def report(seconds):
+        return {"results": [
+            {"benchmark": name, "params": {"rows": 1000}, "median_seconds": value}
+            for name, value in zip(["a", "b", "c"], seconds)
+        ]}
+
+    # When
+    changes = {
+        comparison["benchmark"]: comparison["change"]
+        for comparison in compare_reports(report([1.0, 1.0, 1.0]), report([1.5, 1.05, 0.5]), threshold=0.1)
+    }
+
+    # Then
+    assert changes == {"a": "regression", "b": "same", "c": "improvement"}
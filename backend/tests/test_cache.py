@@ -0,0 +1,40 @@
+"""
+Tests for the LRU cache
+"""
+from app.core.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used_within_byte_budget() -> None:
+    """
+    Test that the cache stays within its byte budget by evicting the oldest entries.
+    """
+    # Given
+    cache = LRUCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+
+    # When
+    cache.get("a")
+    cache.put("c", b"1234")
+
+    # Then
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.get("c") == b"1234"
+    assert cache.total_bytes == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_rejects_oversized_values() -> None:
+    """
+    Test that values larger than the whole budget are not stored.
+    """
+    # Given
+    cache = LRUCache(max_bytes=4)
+
+    # When
+    stored = cache.put("big", b"12345")
+
+    # Then
+    assert stored is False
+    assert len(cache) == 0
@@ -0,0 +1,82 @@
+"""
+Tests for negotiated response compression
+"""
+import pytest
+import zstandard
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.api.utils.compression import StreamEncoder, negotiate_encoding, zstd_dictionary
+
+
+def test_negotiate_encoding_follows_q_values() -> None:
+    """
+    Test that the highest q-value wins and ties go to the preferred coding.
+    """
+    # When
+    preferred = negotiate_encoding("gzip, br, zstd", {"zstd": 5})
+    weighted = negotiate_encoding("gzip;q=1.0, zstd;q=0.5", {})
+    refused = negotiate_encoding("identity, gzip;q=0", {})
+
+    # Then
+    assert (preferred.encoding, preferred.level) == ("zstd", 5)
+    assert weighted.encoding == "gzip"
+    assert refused is None
+
+
+def test_streamed_zstd_with_dictionary_round_trips() -> None:
+    """
+    Test that chunk-by-chunk compression with the vocabulary dictionary decodes to the original body.
+    """
+    # Given
+    dictionary = zstd_dictionary()
+    encoder = StreamEncoder("zstd", 3, dictionary)
+    chunks = [b"id,full_name\r\n", b"1,John Smith\r\n" * 50, b"2,Jane Doe\r\n"]
+
+    # When
+    compressed = b"".join(encoder.iter_compressed(chunks))
+
+    # Then
+    decompressor = zstandard.ZstdDecompressor(dict_data=dictionary).decompressobj()
+    assert decompressor.decompress(compressed) == b"".join(chunks)
+
+
+def test_large_responses_are_compressed(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that large responses follow Accept-Encoding while tiny ones are sent as is.
+
+    Args:
+        client: The test client fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    # Given
+    monkeypatch.setattr(settings, "GENERATE_DELAY_PER_COLUMN", 0)
+    params = {"rows": 1000, "columns": 5, "seed": 8, "format": "csv"}
+
+    # When
+    gzipped = client.get("/api/data/generate", params=params, headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/api/data/generate", params=params, headers={"Accept-Encoding": "identity"})
+    tiny = client.get("/api/data/generate", params={**params, "rows": 5}, headers={"Accept-Encoding": "gzip"})
+
+    # Then
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.content == plain.content
+    assert gzipped.headers["ETag"] != plain.headers["ETag"]
+    assert "Content-Encoding" not in plain.headers
+    assert "Content-Encoding" not in tiny.headers
+    assert "Accept-Encoding" in tiny.headers["Vary"]
+
+
+def test_zstd_dictionary_endpoint_is_opt_in(client: TestClient) -> None:
+    """
+    Test that the dictionary download is disabled by default.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    response = client.get("/api/data/compression/zstd-dictionary")
+
+    # Then
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,622 @@
+"""
+Tests for the data generation endpoints
+"""
+import io
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.api.utils.csv_analysis import TEXT_DTYPE
+from app.api.utils.table_processor import TableProcessor
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def no_generate_delay(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Disable the artificial per-column delay of the generate endpoint.
+
+    Args:
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    monkeypatch.setattr(settings, "GENERATE_DELAY_PER_COLUMN", 0)
+
+
+def test_generate_csv_streams_large_tables(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that CSV generation streams tables larger than one chunk, stitched into the table generated at once.
+
+    Args:
+        client: The test client fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    # Given
+    monkeypatch.setattr(settings, "STREAM_CHUNK_ROWS", 1000)
+    table = TableProcessor.create_table_spec(5500, 3, seed=21).generate()
+
+    # When
+    response = client.get("/api/data/generate", params={"rows": 5500, "columns": 3, "seed": 21, "format": "csv"})
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.content == TableProcessor.table_to_csv_bytes(table.to_rows())
+    assert len(response.text.splitlines()) == 5501
+
+
+def test_generate_json(client: TestClient) -> None:
+    """
+    Test that JSON generation returns metadata and one object per row.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    response = client.get(
+        "/api/data/generate",
+        params={"rows": 20, "columns": 2, "data_types": ["integer", "name"]}
+    )
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    payload = response.json()
+    assert payload["metadata"]["rows"] == 20
+    assert payload["metadata"]["columns"] == 2
+    assert len(payload["data"]) == 20
+    assert set(payload["data"][0]) == set(payload["metadata"]["headers"])
+
+
+def test_generate_rejects_invalid_data_type(client: TestClient) -> None:
+    """
+    Test that unknown data types are rejected with a 400.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    response = client.get("/api/data/generate", params={"columns": 1, "data_types": ["unknown"]})
+
+    # Then
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_sample_csv(client: TestClient) -> None:
+    """
+    Test that sample datasets are returned as CSV with their fixed headers.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    response = client.get("/api/data/sample/products", params={"rows": 50}, headers={"Accept": "text/csv"})
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    lines = response.text.splitlines()
+    assert lines[0] == "id,product_name,price,stock,in_stock"
+    assert len(lines) == 51
+
+
+def test_generate_json_streams_large_tables(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that the streamed JSON envelope spans several chunks and stays valid JSON.
+
+    Args:
+        client: The test client fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    # Given
+    monkeypatch.setattr(settings, "STREAM_CHUNK_ROWS", 1000)
+
+    # When
+    response = client.get("/api/data/generate", params={"rows": 2500, "columns": 4, "format": "json"})
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    payload = response.json()
+    assert payload["metadata"]["rows"] == 2500
+    assert len(payload["data"]) == 2500
+
+
+def test_generate_ndjson(client: TestClient) -> None:
+    """
+    Test that NDJSON output has one JSON object per line, negotiated via Accept.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    response = client.get(
+        "/api/data/generate",
+        params={"rows": 30, "columns": 3},
+        headers={"Accept": "application/x-ndjson"}
+    )
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 30
+    assert all(len(record) == 3 for record in records)
+
+
+def test_seeded_generation_is_reproducible(client: TestClient) -> None:
+    """
+    Test that the X-Seed of a response reproduces it exactly.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    first = client.get("/api/data/generate", params={"rows": 100, "columns": 5, "format": "csv"})
+    second = client.get(
+        "/api/data/generate",
+        params={"rows": 100, "columns": 5, "format": "csv", "seed": first.headers["X-Seed"]}
+    )
+
+    # Then
+    assert first.status_code == second.status_code == status.HTTP_200_OK
+    assert first.content == second.content
+
+
+def test_dataset_pages_are_consistent(client: TestClient) -> None:
+    """
+    Test that pages of a virtual dataset match the same rows of a seeded generation.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    params = {"rows": 20_000, "columns": 4, "format": "csv", "seed": 11}
+    full = client.get("/api/data/generate", params=params).text.splitlines()
+
+    # When
+    page = client.get(
+        "/api/data/datasets/11",
+        params={"rows": 20_000, "columns": 4, "offset": 9_000, "limit": 50, "format": "csv"}
+    )
+
+    # Then
+    assert page.status_code == status.HTTP_200_OK
+    lines = page.text.splitlines()
+    assert lines[0] == full[0]
+    assert lines[1:] == full[9_001:9_051]
+    assert page.headers["X-Total-Count"] == "20000"
+    assert "offset=9050" in page.headers["Link"]
+
+
+def test_dataset_page_of_huge_dataset(client: TestClient) -> None:
+    """
+    Test that the last page of a 100M-row dataset is served without generating the rest.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    response = client.get(
+        "/api/data/datasets/5",
+        params={"rows": 100_000_000, "columns": 3, "offset": 99_999_990, "limit": 100}
+    )
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    payload = response.json()
+    assert payload["metadata"]["returned"] == 10
+    assert payload["metadata"]["next_offset"] is None
+    assert len(payload["data"]) == 10
+
+
+def test_dataset_page_past_the_end_as_parquet(client: TestClient) -> None:
+    """
+    Test that a page past the end of a dataset is an empty Parquet file with the dataset's schema.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    response = client.get(
+        "/api/data/datasets/5",
+        params={"rows": 10, "columns": 3, "offset": 20, "limit": 5, "format": "parquet"}
+    )
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 0
+    assert table.num_columns == 3
+
+
+def test_seeded_responses_are_cached_with_etag(client: TestClient) -> None:
+    """
+    Test that repeated seeded requests are served from the cache and revalidated with ETags.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    params = {"rows": 500, "columns": 3, "seed": 99, "format": "ndjson"}
+
+    # When
+    first = client.get("/api/data/generate", params=params)
+    second = client.get("/api/data/generate", params=params)
+    revalidated = client.get("/api/data/generate", params=params, headers={"If-None-Match": first.headers["ETag"]})
+
+    # Then
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+    assert revalidated.content == b""
+
+
+def test_sample_data_is_deterministic(client: TestClient) -> None:
+    """
+    Test that sample datasets are reproducible and differ only by explicit seed.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    first = client.get("/api/data/sample/users", params={"rows": 20, "format": "csv"})
+    second = client.get("/api/data/sample/users", params={"rows": 20, "format": "csv"})
+    reseeded = client.get("/api/data/sample/users", params={"rows": 20, "format": "csv", "seed": 1})
+
+    # Then
+    assert first.content == second.content
+    assert reseeded.content != first.content
+    assert reseeded.headers["ETag"] != first.headers["ETag"]
+
+
+def test_large_tables_stream_through_executor(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that large tables are generated on the executor and release their slot afterwards.
+
+    Args:
+        client: The test client fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    # Given
+    monkeypatch.setattr(settings, "INLINE_MAX_ROWS", 100)
+    monkeypatch.setattr(settings, "STREAM_CHUNK_ROWS", 1000)
+
+    # When
+    response = client.get("/api/data/generate", params={"rows": 3000, "columns": 2, "format": "csv"})
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.text.splitlines()) == 3001
+    assert client.app.state.executors.stats()["active"] == 0
+
+
+def test_saturated_executor_refuses_heavy_work(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that heavy requests get a fast 503 with Retry-After while health and small requests still succeed.
+
+    Args:
+        client: The test client fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    # Given
+    monkeypatch.setattr(settings, "INLINE_MAX_ROWS", 100)
+    executors = client.app.state.executors
+    slots = [executors.acquire() for _ in range(executors.max_active + executors.max_queued)]
+
+    try:
+        # When
+        refused = client.get("/api/data/generate", params={"rows": 1000, "columns": 2})
+        page = client.get("/api/data/datasets/1", params={"rows": 1000, "columns": 2})
+        small = client.get("/api/data/generate", params={"rows": 10, "columns": 2})
+        health = client.get("/health")
+    finally:
+        for slot in slots:
+            slot.release()
+
+    # Then
+    assert refused.status_code == page.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert refused.headers["Retry-After"] == str(settings.EXECUTOR_RETRY_AFTER)
+    assert small.status_code == health.status_code == status.HTTP_200_OK
+
+
+def test_generate_arrow_stream(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that Arrow IPC output, negotiated via Accept, holds the same rows as seeded CSV output.
+
+    Args:
+        client: The test client fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    # Given
+    monkeypatch.setattr(settings, "STREAM_CHUNK_ROWS", 8192)
+    params = {"rows": 20_000, "columns": 6, "seed": 3}
+
+    # When
+    response = client.get("/api/data/generate", params=params, headers={"Accept": "application/vnd.apache.arrow.stream"})
+    csv_text = client.get("/api/data/generate", params={**params, "format": "csv"}).text
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    reader = pa.ipc.open_stream(response.content)
+    batches = list(reader)
+    assert len(batches) == 3
+    frame = pa.Table.from_batches(batches, schema=reader.schema).to_pandas()
+    expected = pd.read_csv(io.StringIO(csv_text), keep_default_na=False)
+    assert list(frame.columns) == list(expected.columns)
+    assert frame.astype(str).values.tolist() == expected.astype(str).values.tolist()
+
+
+def test_sample_arrow_categorical(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that categorical Arrow output dictionary-encodes vocabulary columns without changing values.
+
+    Args:
+        client: The test client fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    # Given
+    monkeypatch.setattr(settings, "STREAM_CHUNK_ROWS", 8192)
+    params = {"rows": 20_000, "format": "arrow"}
+
+    # When
+    plain = client.get("/api/data/sample/users", params=params)
+    categorical = client.get("/api/data/sample/users", params={**params, "categorical": "true"})
+
+    # Then
+    assert categorical.status_code == status.HTTP_200_OK
+    table = pa.ipc.open_stream(categorical.content).read_all()
+    assert pa.types.is_dictionary(table.schema.field("full_name").type)
+    assert pa.types.is_dictionary(table.schema.field("registration_date").type)
+    assert table.schema.field("email").type == pa.string()
+    assert len(categorical.content) < len(plain.content)
+    expected = pa.ipc.open_stream(plain.content).read_all()
+    assert table.to_pylist() == expected.to_pylist()
+
+
+def test_sample_parquet(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that Parquet output is typed and has one row group per streamed chunk.
+
+    Args:
+        client: The test client fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    # Given
+    monkeypatch.setattr(settings, "STREAM_CHUNK_ROWS", 8192)
+
+    # When
+    response = client.get("/api/data/sample/users", params={"rows": 10_000, "format": "parquet"})
+
+    # Then
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-disposition"].endswith("users_sample.parquet")
+    parquet_file = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet_file.metadata.num_rows == 10_000
+    assert parquet_file.metadata.num_row_groups == 2
+    schema = parquet_file.schema_arrow
+    assert schema.field("id").type == pa.int64()
+    assert schema.field("registration_date").type == pa.date32()
+    assert schema.field("is_active").type == pa.bool_()
+
+
+def test_dataset_page_in_columns_layout(client: TestClient) -> None:
+    """
+    Test that orient=columns returns each column as one array, matching the records layout.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    params = {"rows": 1000, "columns": 4, "offset": 10, "limit": 20}
+
+    # When
+    records = client.get("/api/data/datasets/2", params=params).json()
+    columns = client.get("/api/data/datasets/2", params={**params, "orient": "columns"}).json()
+    invalid = client.get("/api/data/datasets/2", params={**params, "orient": "index"})
+
+    # Then
+    headers = records["metadata"]["headers"]
+    assert columns["data"] == {header: [row[header] for row in records["data"]] for header in headers}
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_upload_csv_is_analyzed_in_chunks(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that an uploaded CSV is analyzed chunk by chunk with the same statistics as a whole-file parse.
+
+    Args:
+        client: The test client fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    # Given
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_ROWS", 1000)
+    csv_bytes = client.get("/api/data/generate", params={"rows": 5000, "columns": 6, "seed": 8, "format": "csv"}).content
+    df = pd.read_csv(io.BytesIO(csv_bytes))
+
+    # When
+    response = client.post("/api/data/upload", files={"file": ("data.csv", csv_bytes, "text/csv")})
+
+    # Then
+    assert response.status_code == status.HTTP_201_CREATED
+    stats = response.json()
+    assert stats["file_type"] == "csv"
+    assert stats["row_count"] == 5000
+    assert stats["column_types"] == {column: str(df[column].dtype) for column in df.columns}
+    assert stats["memory_usage"] == df.memory_usage(deep=True).sum()
+
+
+def test_upload_csv_full_profile(client: TestClient) -> None:
+    """
+    Test that profile=full adds per-column statistics to the analysis of an upload.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    values = list(range(1, 1001))
+    csv_bytes = ("amount,label\n" + "".join(f"{value},{'ab'[value % 2]}\n" for value in values) + ",a\n").encode()
+
+    # When
+    response = client.post("/api/data/upload", params={"profile": "full"}, files={"file": ("data.csv", csv_bytes, "text/csv")})
+    invalid = client.post("/api/data/upload", params={"profile": "deep"}, files={"file": ("data.csv", csv_bytes, "text/csv")})
+
+    # Then
+    assert response.status_code == status.HTTP_201_CREATED
+    amount = response.json()["profile"]["amount"]
+    assert amount["count"] == 1000
+    assert amount["null_count"] == 1
+    assert (amount["min"], amount["max"]) == (1.0, 1000.0)
+    assert amount["mean"] == pytest.approx(500.5)
+    assert amount["std"] == pytest.approx(pd.Series(values).std())
+    assert amount["quantiles"]["p50"] == pytest.approx(500.5, rel=0.01)
+    assert amount["distinct_count"] == pytest.approx(1000, rel=0.02)
+    label = response.json()["profile"]["label"]
+    assert label["top_values"] == [{"value": "a", "count": 501}, {"value": "b", "count": 500}]
+    assert "mean" not in label
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_upload_json_and_json_lines(client: TestClient) -> None:
+    """
+    Test that JSON envelopes and JSON Lines uploads are described row by row, and invalid JSON is rejected.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    rows = [{"id": i, "name": f"row {i}", "score": i / 2} for i in range(2000)]
+    envelope = json.dumps({"data": rows, "metadata": {"source": "test"}}, indent=2).encode()
+    lines = "\n".join(json.dumps(row) for row in rows).encode() + b"\n"
+
+    # When
+    from_json = client.post("/api/data/upload", files={"file": ("rows.json", envelope, "application/json")})
+    from_lines = client.post(
+        "/api/data/upload",
+        params={"profile": "full"},
+        files={"file": ("rows.ndjson", lines, "application/x-ndjson")}
+    )
+    invalid = client.post("/api/data/upload", files={"file": ("rows.json", envelope[:-10], "application/json")})
+
+    # Then
+    assert from_json.status_code == status.HTTP_201_CREATED
+    assert from_json.json()["row_count"] == 2000
+    assert from_json.json()["metadata"] == {"source": "test"}
+    assert from_json.json()["sample_rows"] == rows[:5]
+    assert from_lines.status_code == status.HTTP_201_CREATED
+    stats = from_lines.json()
+    assert (stats["file_type"], stats["row_count"], stats["columns"]) == ("ndjson", 2000, ["id", "name", "score"])
+    assert stats["profile"]["score"]["max"] == 999.5
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_upload_nested_json_full_profile(client: TestClient) -> None:
+    """
+    Test that profile=full describes JSON rows with nested objects and arrays.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    rows = [{"id": i, "point": {"x": i % 2}, "tags": [i % 3, 0]} for i in range(100)]
+    content = json.dumps(rows).encode()
+
+    # When
+    response = client.post(
+        "/api/data/upload",
+        params={"profile": "full"},
+        files={"file": ("nested.json", content, "application/json")}
+    )
+
+    # Then
+    assert response.status_code == status.HTTP_201_CREATED
+    profile = response.json()["profile"]
+    assert profile["point"]["distinct_count"] == 2
+    assert {item["value"] for item in profile["point"]["top_values"]} == {'{"x": 0}', '{"x": 1}'}
+    assert profile["tags"]["distinct_count"] == 3
+    assert profile["id"]["max"] == 99
+
+
+def test_repeated_upload_is_answered_from_cache(client: TestClient) -> None:
+    """
+    Test that uploads of the same content are analyzed once per analysis level.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    csv_bytes = client.get("/api/data/generate", params={"rows": 500, "columns": 4, "seed": 31, "format": "csv"}).content
+    hits = client.get("/api/data/upload/cache").json()["hits"]
+
+    # When
+    first = client.post("/api/data/upload", files={"file": ("nightly.csv", csv_bytes, "text/csv")})
+    again = client.post("/api/data/upload", files={"file": ("renamed.csv", csv_bytes, "text/csv")})
+    profiled = client.post("/api/data/upload", params={"profile": "full"}, files={"file": ("nightly.csv", csv_bytes, "text/csv")})
+    changed = client.post("/api/data/upload", files={"file": ("nightly.csv", csv_bytes + b"\n", "text/csv")})
+
+    # Then
+    assert (first.headers["x-cache"], again.headers["x-cache"]) == ("MISS", "HIT")
+    assert again.json() == {**first.json(), "filename": "renamed.csv"}
+    assert profiled.headers["x-cache"] == "MISS" and "profile" in profiled.json()
+    assert changed.json()["content_hash"] != first.json()["content_hash"]
+    assert client.get("/api/data/upload/cache").json()["hits"] == hits + 1
+
+
+def test_upload_pushes_column_and_row_selection_down(client: TestClient) -> None:
+    """
+    Test that columns, max_rows and sample_only restrict the analysis of CSV and JSON Lines uploads.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    csv_bytes = client.get("/api/data/sample/users", params={"rows": 1000, "format": "csv"}).content
+    lines = client.get("/api/data/sample/users", params={"rows": 1000, "format": "ndjson"}).content
+    df = pd.read_csv(io.BytesIO(csv_bytes))
+
+    # When
+    projected = client.post("/api/data/upload", params={"columns": ["email", "id"]}, files={"file": ("users.csv", csv_bytes, "text/csv")})
+    head = client.post("/api/data/upload", params={"max_rows": 10}, files={"file": ("users.csv", csv_bytes, "text/csv")})
+    sample = client.post("/api/data/upload", params={"sample_only": True, "columns": ["id"]}, files={"file": ("users.jsonl", lines, "application/x-ndjson")})
+    unknown = client.post("/api/data/upload", params={"columns": ["missing"]}, files={"file": ("users.csv", csv_bytes, "text/csv")})
+
+    # Then
+    assert projected.json()["columns"] == ["id", "email"]
+    assert projected.json()["row_count"] == 1000
+    assert projected.json()["sample_rows"] == df[["id", "email"]].head(5).to_dict(orient="records")
+    assert (head.json()["row_count"], head.json()["truncated"]) == (10, True)
+    assert head.json()["column_count"] == len(df.columns)
+    assert (sample.json()["row_count"], sample.json()["truncated"], sample.json()["columns"]) == (5, True, ["id"])
+    assert unknown.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_upload_csv_with_typed_parser(client: TestClient) -> None:
+    """
+    Test that the typed parser sniffs column types and falls back to pandas when later values do not fit.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    csv_bytes = client.get("/api/data/sample/products", params={"rows": 1000, "format": "csv"}).content
+    mismatched = b"id,code\n" + b"1,7\n" * 20_000 + b"2,seven\n"
+
+    # When
+    inferred = client.post("/api/data/upload", files={"file": ("products.csv", csv_bytes, "text/csv")})
+    typed = client.post("/api/data/upload", params={"parser": "typed"}, files={"file": ("products.csv", csv_bytes, "text/csv")})
+    fallback = client.post("/api/data/upload", params={"parser": "typed"}, files={"file": ("codes.csv", mismatched, "text/csv")})
+    invalid = client.post("/api/data/upload", params={"parser": "fast"}, files={"file": ("products.csv", csv_bytes, "text/csv")})
+
+    # Then
+    assert typed.json()["parser"] == "typed"
+    assert typed.json()["row_count"] == inferred.json()["row_count"] == 1000
+    assert typed.json()["column_shapes"]["price"] == "price"
+    assert typed.json()["column_types"]["price"] == "double"
+    assert typed.json()["sample_rows"][0]["price"] == float(inferred.json()["sample_rows"][0]["price"][1:])
+    assert typed.json()["memory_usage"] < inferred.json()["memory_usage"]
+    assert (fallback.json()["parser"], fallback.json()["column_types"]["code"]) == ("pandas", TEXT_DTYPE)
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
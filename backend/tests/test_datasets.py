@@ -0,0 +1,161 @@
+"""
+Tests for the dataset store and the stored dataset endpoints
+"""
+import io
+from typing import Any, Dict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.api.dataset_store import DatasetNotFoundError, DatasetStore
+
+
+def _writer(rows: int):
+    """
+    Build a write function for DatasetStore.create that stores a table of the given length.
+    """
+    def write(path: str) -> Dict[str, Any]:
+        with pa.ipc.new_file(path, pa.schema([("value", pa.int64())])) as writer:
+            writer.write_table(pa.table({"value": list(range(rows))}))
+        return {"row_count": rows}
+    return write
+
+
+def test_upload_is_stored_and_read_back(client: TestClient) -> None:
+    """
+    Test that a stored CSV upload is deduplicated and can be described, paged, exported, profiled and deleted.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    csv_bytes = client.get("/api/data/sample/products", params={"rows": 300, "format": "csv"}).content
+    df = pd.read_csv(io.BytesIO(csv_bytes))
+    upload = client.post("/api/data/upload", params={"store": True}, files={"file": ("products.csv", csv_bytes, "text/csv")})
+    dataset_id = upload.json()["dataset_id"]
+
+    # When
+    duplicate = client.post("/api/data/upload", params={"store": True, "profile": "full"}, files={"file": ("copy.csv", csv_bytes, "text/csv")})
+    info = client.get(f"/api/datasets/{dataset_id}")
+    page = client.get(f"/api/datasets/{dataset_id}/rows", params={"offset": 100, "limit": 50})
+    export = client.get(f"/api/datasets/{dataset_id}/export", params={"format": "arrow"})
+    narrow = client.get(f"/api/datasets/{dataset_id}/rows", params={"columns": ["price", "id"], "limit": 2, "format": "csv"})
+    profile = client.get(f"/api/datasets/{dataset_id}/profile")
+    listed = client.get("/api/datasets")
+    deleted = client.delete(f"/api/datasets/{dataset_id}")
+    missing = client.get(f"/api/datasets/{dataset_id}/rows")
+
+    # Then
+    assert upload.status_code == status.HTTP_201_CREATED
+    assert upload.json()["row_count"] == 300
+    assert (duplicate.headers["x-cache"], duplicate.json()["dataset_id"]) == ("HIT", dataset_id)
+    assert duplicate.json()["profile"]["price"]["count"] == 300
+    assert info.json()["row_count"] == 300
+    assert info.json()["stats"]["column_types"] == upload.json()["column_types"]
+    assert page.json()["metadata"]["next_offset"] == 150
+    assert page.json()["data"] == df.iloc[100:150].to_dict(orient="records")
+    assert page.headers["link"].endswith('offset=150>; rel="next"')
+    assert pa.ipc.open_stream(export.content).read_all().to_pandas().equals(df)
+    assert pd.read_csv(io.BytesIO(narrow.content)).equals(df[["price", "id"]].head(2))
+    assert profile.json()["profile"]["price"]["count"] == 300
+    assert dataset_id in [dataset["dataset_id"] for dataset in listed.json()["datasets"]]
+    assert deleted.status_code == status.HTTP_204_NO_CONTENT
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_stored_dataset_exports_in_the_generated_csv_dialect(client: TestClient) -> None:
+    """
+    Test that CSV exports of stored uploads use CRLF and minimal quoting, so generated CSV round-trips unchanged.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    generated = client.get("/api/data/sample/products", params={"rows": 300, "format": "csv"}).content
+    edge_cases = b'id,note,score,flag\r\n1,"a, b",1.5,True\r\n2,,,False\r\n3,"say ""hi""",2.0,\r\n4,plain,-3.25,True\r\n'
+
+    for csv_bytes in (generated, edge_cases):
+        upload = client.post("/api/data/upload", params={"store": True}, files={"file": ("data.csv", csv_bytes, "text/csv")})
+        dataset_id = upload.json()["dataset_id"]
+
+        # When
+        export = client.get(f"/api/datasets/{dataset_id}/export", params={"format": "csv"})
+        parquet = client.get(f"/api/datasets/{dataset_id}/export", params={"format": "parquet"})
+
+        # Then
+        assert export.content == csv_bytes
+        assert pq.read_table(io.BytesIO(parquet.content)).to_pandas().equals(pd.read_csv(io.BytesIO(csv_bytes)))
+
+
+def test_export_of_non_ascii_file_name_has_a_safe_content_disposition(client: TestClient) -> None:
+    """
+    Test that uploaded file names with accents, spaces or semicolons are encoded in the export's Content-Disposition.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    headers = {}
+    for filename in ("données.csv", "my report; final.csv"):
+        csv_bytes = f"id,length\r\n1,{len(filename)}\r\n".encode()
+        upload = client.post("/api/data/upload", params={"store": True}, files={"file": (filename, csv_bytes, "text/csv")})
+
+        # When
+        export = client.get(f"/api/datasets/{upload.json()['dataset_id']}/export", params={"format": "csv"})
+
+        # Then
+        assert export.status_code == status.HTTP_200_OK
+        assert export.content == csv_bytes
+        headers[filename] = export.headers["content-disposition"]
+
+    assert headers["données.csv"] == "attachment; filename=\"donnees.csv\"; filename*=UTF-8''donn%C3%A9es.csv"
+    assert headers["my report; final.csv"] == (
+        "attachment; filename=\"my_report_final.csv\"; filename*=UTF-8''my%20report%3B%20final.csv"
+    )
+
+
+def test_upload_store_rejects_json(client: TestClient) -> None:
+    """
+    Test that only CSV uploads can be stored.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    response = client.post("/api/data/upload", params={"store": True}, files={"file": ("rows.json", b"[]", "application/json")})
+
+    # Then
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_dataset_store_evicts_least_recently_used_and_reopens(tmp_path) -> None:
+    """
+    Test that the store keeps within its disk budget and indexes its datasets again on restart.
+
+    Args:
+        tmp_path: The pytest temporary directory fixture
+    """
+    # Given
+    store = DatasetStore(str(tmp_path), max_bytes=10**9)
+    first = store.create(_writer(1000), "first.csv")
+    second = store.create(_writer(1000), "second.csv")
+    store.open(first.dataset_id)
+    (tmp_path / "leftover.arrow.tmp").write_bytes(b"partial")
+
+    # When
+    store.max_bytes = first.size_bytes + second.size_bytes
+    third = store.create(_writer(10), "third.csv")
+    reopened = DatasetStore(str(tmp_path), max_bytes=10**9)
+
+    # Then
+    assert [dataset.dataset_id for dataset in store.list()] == [third.dataset_id, first.dataset_id]
+    assert store.stats()["evictions"] == 1
+    assert sorted(dataset.dataset_id for dataset in reopened.list()) == sorted([first.dataset_id, third.dataset_id])
+    assert reopened.open(first.dataset_id).column("value").to_pylist() == list(range(1000))
+    assert not (tmp_path / "leftover.arrow.tmp").exists()
+    with pytest.raises(DatasetNotFoundError):
+        reopened.open(second.dataset_id)
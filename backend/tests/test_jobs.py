@@ -0,0 +1,254 @@
+"""
+Tests for the background job queue and the job endpoints
+"""
+import threading
+import time
+from typing import Any, Dict
+
+import orjson
+from fastapi import status
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.api.job_runners import run_generate_job
+from app.api.jobs import CANCELLED, QUEUED, SUCCEEDED, JobContext, JobOutput, JobQueue
+from app.api.utils.table_processor import TableProcessor
+
+
+def _wait(client: TestClient, job_id: str, timeout: float = 30.0) -> Dict[str, Any]:
+    """
+    Poll a job until it has finished.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def _wait_for(condition, timeout: float = 10.0) -> bool:
+    """
+    Wait until a condition holds.
+    """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_generate_job_runs_in_background(client: TestClient) -> None:
+    """
+    Test that a generation job writes the same table as the streaming endpoint and can be downloaded in ranges.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    data_types = ["integer", "name", "date"]
+    expected = b"".join(TableProcessor.stream_csv(TableProcessor.create_table_spec(25_000, 3, data_types, 7)))
+    spec = {"type": "generate", "rows": 25_000, "columns": 3, "data_types": data_types, "seed": 7, "format": "csv"}
+
+    # When
+    submitted = client.post("/api/jobs", json=spec)
+    job = _wait(client, submitted.json()["job_id"])
+    result = client.get(job["result_url"])
+    tail = client.get(job["result_url"], headers={"Range": "bytes=100-"})
+    listed = client.get("/api/jobs")
+
+    # Then
+    assert submitted.status_code == status.HTTP_202_ACCEPTED
+    assert submitted.headers["location"] == submitted.json()["status_url"]
+    assert (job["status"], job["progress"]) == ("succeeded", 1.0)
+    assert job["result"]["size_bytes"] == len(expected)
+    assert result.content == expected
+    assert result.headers["content-type"].startswith("text/csv")
+    assert tail.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert tail.content == expected[100:]
+    assert job["job_id"] in [listed_job["job_id"] for listed_job in listed.json()["jobs"]]
+
+
+def test_generate_job_progress_reaches_one_on_the_last_chunk(tmp_path) -> None:
+    """
+    Test that a generation job's progress counts every chunk of each format, up to 1.0 on the last one.
+
+    Args:
+        tmp_path: The pytest temporary directory fixture
+    """
+    # Given
+    class Context:
+        path = str(tmp_path / "result")
+
+        def __init__(self) -> None:
+            self.fractions = []
+
+        def progress(self, fraction: float, *args: Any) -> None:
+            self.fractions.append(fraction)
+
+    outputs = [("csv", "records"), ("ndjson", "records"), ("json", "split"), ("json", "columns"),
+               ("arrow", "records"), ("parquet", "records")]
+
+    for output_format, orient in outputs:
+        spec = {"rows": 60_000, "columns": 3, "seed": 5, "format": output_format, "orient": orient,
+                "categorical": False}
+        context = Context()
+
+        # When
+        run_generate_job(spec, context)
+
+        # Then
+        assert len(context.fractions) > 6
+        assert all(fraction < 1.0 for fraction in context.fractions[:-1])
+        assert context.fractions[-1] == 1.0
+
+
+def test_analyze_job_profiles_stored_dataset(client: TestClient) -> None:
+    """
+    Test that an analysis job profiles a stored dataset and returns the statistics as its result.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    csv_bytes = client.get("/api/data/sample/products", params={"rows": 500, "format": "csv"}).content
+    dataset_id = client.post("/api/data/upload", params={"store": True}, files={"file": ("p.csv", csv_bytes, "text/csv")}).json()["dataset_id"]
+
+    # When
+    submitted = client.post("/api/jobs", json={"type": "analyze", "dataset_id": dataset_id, "columns": ["stock"]})
+    job = _wait(client, submitted.json()["job_id"])
+    result = client.get(job["result_url"])
+    deleted = client.delete(f"/api/jobs/{job['job_id']}")
+
+    # Then
+    assert job["status"] == "succeeded"
+    assert result.json()["row_count"] == 500
+    assert list(result.json()["profile"]) == ["stock"]
+    assert result.json()["profile"]["stock"]["count"] == 500
+    assert deleted.status_code == status.HTTP_204_NO_CONTENT
+    assert client.get(f"/api/jobs/{job['job_id']}").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_job_events_stream_progress(client: TestClient) -> None:
+    """
+    Test that the event stream reports rows and bytes as a job advances and ends with its final state.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    spec = {"type": "generate", "rows": 200_000, "columns": 4, "seed": 3, "format": "csv"}
+    job_id = client.post("/api/jobs", json=spec).json()["job_id"]
+
+    # When
+    with client.stream("GET", f"/api/jobs/{job_id}/events") as response:
+        content_type = response.headers["content-type"]
+        lines = [line for line in response.iter_lines() if line]
+    events = list(zip(lines[0::2], lines[1::2]))
+    final_event, final_data = events[-1]
+    final = orjson.loads(final_data.removeprefix("data: "))
+    job = client.get(f"/api/jobs/{job_id}").json()
+
+    # Then
+    assert content_type.startswith("text/event-stream")
+    assert all(event == "event: progress" for event, _ in events[:-1])
+    assert final_event == "event: succeeded"
+    assert (final["rows"], final["total_rows"], final["eta_seconds"]) == (200_000, 200_000, 0.0)
+    assert final["bytes_written"] == job["result"]["size_bytes"]
+    assert final["rows_per_second"] > 0
+
+
+def test_job_websocket_cancels_job(client: TestClient) -> None:
+    """
+    Test that a cancel message on the progress socket stops the job and the socket closes once it has stopped.
+
+    Args:
+        client: The test client fixture
+    """
+    # Given
+    spec = {"type": "generate", "rows": 10_000_000, "columns": 6, "format": "csv"}
+    job_id = client.post("/api/jobs", json=spec).json()["job_id"]
+    messages = []
+
+    # When
+    with client.websocket_connect(f"/api/jobs/{job_id}/ws") as websocket:
+        messages.append(orjson.loads(websocket.receive_text()))
+        websocket.send_text('{"action": "cancel"}')
+        try:
+            while True:
+                messages.append(orjson.loads(websocket.receive_text()))
+        except WebSocketDisconnect:
+            pass
+    result = client.get(f"/api/jobs/{job_id}/result")
+    client.delete(f"/api/jobs/{job_id}")
+
+    # Then
+    assert messages[0]["total_rows"] == 10_000_000
+    assert messages[-1]["status"] == "cancelled"
+    assert messages[-1]["rows"] < 10_000_000
+    assert result.status_code == status.HTTP_409_CONFLICT
+
+
+def test_job_submissions_are_validated(client: TestClient) -> None:
+    """
+    Test that invalid job specs are rejected before being queued.
+
+    Args:
+        client: The test client fixture
+    """
+    # When
+    bad_format = client.post("/api/jobs", json={"type": "generate", "rows": 10, "format": "xlsx"})
+    bad_type = client.post("/api/jobs", json={"type": "compile"})
+    missing_dataset = client.post("/api/jobs", json={"type": "analyze", "dataset_id": "0" * 32})
+    missing_job = client.get("/api/jobs/unknown/result")
+
+    # Then
+    assert bad_format.status_code == status.HTTP_400_BAD_REQUEST
+    assert bad_type.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert missing_dataset.status_code == status.HTTP_404_NOT_FOUND
+    assert missing_job.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_job_queue_cancels_and_resumes_after_restart(tmp_path) -> None:
+    """
+    Test cooperative cancellation, and that jobs interrupted by a shutdown are rerun on the next start.
+
+    Args:
+        tmp_path: The pytest temporary directory fixture
+    """
+    # Given
+    release = threading.Event()
+
+    def wait(spec: Dict[str, Any], context: JobContext) -> JobOutput:
+        while not release.wait(0.01):
+            context.progress(0.5)
+        return JobOutput({"value": spec["value"]})
+
+    queue = JobQueue(str(tmp_path), {"wait": wait}, workers=1, max_queued=10, retry_after=1, retention_seconds=3600)
+    queue.start()
+    running = queue.submit("wait", {"value": 1})
+    queued = queue.submit("wait", {"value": 2})
+    _wait_for(lambda: queue.get(running.job_id).progress == 0.5)
+
+    # When
+    queue.cancel(queued.job_id)
+    queue.cancel(running.job_id)
+    cancelled = _wait_for(lambda: queue.get(running.job_id).status == CANCELLED)
+    interrupted = queue.submit("wait", {"value": 3})
+    _wait_for(lambda: queue.get(interrupted.job_id).progress == 0.5)
+    queue.shutdown(drain_seconds=0)
+    reopened = JobQueue(str(tmp_path), {"wait": wait}, workers=1, max_queued=10, retry_after=1, retention_seconds=3600)
+    status_after_restart = reopened.get(interrupted.job_id).status
+    release.set()
+    reopened.start()
+    resumed = _wait_for(lambda: reopened.get(interrupted.job_id).status == SUCCEEDED)
+    reopened.shutdown(drain_seconds=5)
+
+    # Then
+    assert cancelled
+    assert queue.get(queued.job_id).status == CANCELLED
+    assert status_after_restart == QUEUED
+    assert resumed
+    assert reopened.get(interrupted.job_id).result == {"value": 3}
+    assert reopened.get(running.job_id).status == CANCELLED
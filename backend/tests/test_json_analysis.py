@@ -0,0 +1,56 @@
+"""
+Tests for incremental JSON upload analysis
+"""
+import io
+import json
+
+from app.api.utils.json_analysis import MAX_ARRAY_VALUES, JsonStream, analyze_json_file
+
+
+def test_json_stream_reads_values_across_buffer_boundaries() -> None:
+    """
+    Test that values split between reads (numbers, escapes, multi-byte characters) decode correctly.
+    """
+    # Given
+    rows = [{"id": 1234567890123, "text": "é \"quoted\" ]}", "values": [1.5e-7, None, True]}] * 3
+    document = json.dumps(rows, ensure_ascii=False, indent=1).encode()
+
+    # When
+    decoded = [list(JsonStream(io.BytesIO(document), read_bytes=size).iter_array()) for size in (1, 2, 3, 7)]
+
+    # Then
+    assert all(elements == rows for elements in decoded)
+
+
+def test_analyze_json_keeps_the_shape_of_other_documents() -> None:
+    """
+    Test that documents other than row arrays and envelopes are described as before.
+    """
+    # When
+    values = analyze_json_file(io.BytesIO(b"[1, 2, 3]"), chunk_rows=100)
+    settings = analyze_json_file(io.BytesIO(b'{"name": "x", "data": 5}'), chunk_rows=100)
+    rows = analyze_json_file(io.BytesIO(b'[{"a": 1, "b": 2}, {"a": 3}]'), chunk_rows=100)
+
+    # Then
+    assert values == {"data": [1, 2, 3]}
+    assert settings == {"name": "x", "data": 5}
+    assert rows == {"row_count": 2, "column_count": 2, "columns": ["a", "b"], "sample_rows": [{"a": 1, "b": 2}, {"a": 3}]}
+
+
+def test_analyze_json_keeps_a_leading_null_and_bounds_value_arrays() -> None:
+    """
+    Test that a null first element is kept and long arrays of plain values are counted, not kept.
+    """
+    # Given
+    values = json.dumps(list(range(MAX_ARRAY_VALUES * 50))).encode()
+
+    # When
+    leading_null = analyze_json_file(io.BytesIO(b"[null, 1, 2]"), chunk_rows=100)
+    empty = analyze_json_file(io.BytesIO(b"[]"), chunk_rows=100)
+    large = analyze_json_file(io.BytesIO(values), chunk_rows=100)
+
+    # Then
+    assert leading_null == {"data": [None, 1, 2]}
+    assert empty == {"data": []}
+    assert large["data"] == list(range(MAX_ARRAY_VALUES))
+    assert (large["value_count"], large["truncated"]) == (MAX_ARRAY_VALUES * 50, True)
@@ -0,0 +1,61 @@
+"""
+Tests for the load generator and its latency histograms
+"""
+from typing import Callable
+
+import numpy as np
+
+from loadtest.generator import LoadReport
+from loadtest.histogram import LatencyHistogram
+from loadtest.traffic import Operation
+
+
+def test_histogram_percentiles_are_within_precision() -> None:
+    """
+    Test that percentiles of the HDR histogram match exact ones to its significant figures, and survive a merge.
+    """
+    # Given
+    values = np.random.default_rng(7).lognormal(8, 1.5, 20_000).astype(int) + 1
+    first, second = LatencyHistogram(), LatencyHistogram()
+    for value in values[:10_000]:
+        first.record(int(value))
+    for value in values[10_000:]:
+        second.record(int(value))
+
+    # When
+    first.merge(second)
+    distribution = first.percentile_distribution()
+
+    # Then
+    for percentile in (50, 90, 99, 99.9):
+        exact = np.percentile(values, percentile, method="inverted_cdf")
+        assert abs(first.value_at_percentile(percentile) - exact) <= exact * 1e-3
+    assert first.value_at_percentile(100) == values.max()
+    assert first.total_count == 20_000
+    assert distribution.endswith(f"#[Total count    = {20_000:12d}]\n")
+
+
+def test_load_test_fixture_reports_mixed_traffic(load_test: Callable[..., LoadReport]) -> None:
+    """
+    Test that a paced load test against the local server reports every operation of the mix without errors.
+
+    Args:
+        load_test: The load test fixture
+    """
+    # Given
+    mix = [
+        Operation("health", "GET", "/health", weight=2),
+        Operation("generate", "GET", "/api/data/generate", weight=2, params={"rows": 100, "columns": 3}),
+        Operation("upload", "POST", "/api/data/upload", weight=1, upload_rows=200),
+    ]
+
+    # When
+    report = load_test(mix, duration=2.0, concurrency=4, rate=20).to_dict()
+
+    # Then
+    assert report["errors"] == 0
+    assert set(report["operations"]) == {"health", "generate", "upload"}
+    assert all(operation["requests"] > 0 for operation in report["operations"].values())
+    assert 30 <= report["requests"] <= 41
+    latency = report["latency"]
+    assert 0 < latency["p50_ms"] <= latency["p95_ms"] <= latency["p99_ms"] <= latency["max_ms"]
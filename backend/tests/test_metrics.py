@@ -0,0 +1,100 @@
+"""
+Tests for the metrics registry and the /metrics endpoint
+"""
+import threading
+from typing import Dict
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.metrics import CONTENT_TYPE, Counter, Histogram, Registry
+
+
+def _samples(text: str) -> Dict[str, float]:
+    """
+    Parse the samples of a text exposition, keyed by name and labels.
+
+    Args:
+        text: The exposition text
+
+    Returns:
+        The value of each sample line
+    """
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_counters_and_histograms_sum_threads() -> None:
+    """
+    Test that per-thread cells add up across threads and render as cumulative buckets.
+    """
+    # Given
+    counter = Counter("items", "Items", ("kind",))
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    def work() -> None:
+        for _ in range(10_000):
+            counter.labels("a").inc()
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5.0)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+
+    # When
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    samples = _samples(Registry.render([counter, histogram]))
+
+    # Then
+    assert samples['items_total{kind="a"}'] == 40_000
+    assert samples['latency_seconds_bucket{le="0.1"}'] == 4
+    assert samples['latency_seconds_bucket{le="1"}'] == 8
+    assert samples['latency_seconds_bucket{le="+Inf"}'] == 12
+    assert samples["latency_seconds_count"] == 12
+    assert samples["latency_seconds_sum"] == pytest.approx(4 * 5.55)
+
+
+def test_metrics_endpoint_counts_requests_and_throughput(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that /metrics exports route latency histograms, data throughput counters and service state.
+
+    Args:
+        client: The test client fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    # Given
+    monkeypatch.setattr(settings, "GENERATE_DELAY_PER_COLUMN", 0)
+    before = _samples(client.get("/metrics").text)
+    csv_bytes = b"a,b\n1,x\n2,y\n"
+
+    # When
+    generated = client.get("/api/data/generate", params={"rows": 500, "columns": 3, "seed": 4, "format": "csv"})
+    uploaded = client.post("/api/data/upload", files={"file": ("data.csv", csv_bytes, "text/csv")})
+    response = client.get("/metrics")
+    after = _samples(response.text)
+
+    def delta(name: str) -> float:
+        return after.get(name, 0) - before.get(name, 0)
+
+    # Then
+    assert generated.status_code == status.HTTP_200_OK
+    assert uploaded.status_code == status.HTTP_201_CREATED
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == CONTENT_TYPE
+    route = 'method="GET",route="/api/data/generate",format="csv",status="200"'
+    assert delta(f"http_request_duration_seconds_count{{{route}}}") == 1
+    assert delta(f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}') == 1
+    assert delta("table_rows_generated_total") == 500
+    assert delta('table_bytes_serialized_total{format="csv"}') >= len(generated.content)
+    assert delta('upload_bytes_parsed_total{file_type="csv"}') == len(csv_bytes)
+    assert "executor_queue_depth" in after
+    assert 'cache_hit_ratio{cache="response"}' in after
@@ -0,0 +1,111 @@
+"""
+Tests for single-pass column profiling
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.api.utils.profiling import TableProfile
+
+
+def test_merged_shard_profiles_match_a_single_pass() -> None:
+    """
+    Test that profiles of shards merge to the statistics of the whole column.
+    """
+    # Given
+    rng = np.random.default_rng(7)
+    frame = pd.DataFrame({
+        "value": rng.normal(100, 15, 200_000),
+        "code": rng.choice(["a", "b", "c", "d"], 200_000, p=[0.5, 0.3, 0.15, 0.05]),
+    })
+    whole = TableProfile()
+    whole.update(frame)
+
+    # When
+    merged = TableProfile()
+    for start in range(0, len(frame), 30_000):
+        shard = TableProfile()
+        shard.update(frame.iloc[start:start + 30_000])
+        merged.merge(shard)
+
+    # Then
+    value = merged.result()["value"]
+    assert value["mean"] == pytest.approx(frame["value"].mean())
+    assert value["std"] == pytest.approx(frame["value"].std())
+    assert value["min"] == frame["value"].min()
+    for name, q in (("p1", 0.01), ("p50", 0.5), ("p99", 0.99)):
+        assert value["quantiles"][name] == pytest.approx(frame["value"].quantile(q), rel=0.005)
+    assert value["distinct_count"] == pytest.approx(200_000, rel=0.03)
+    assert np.array_equal(merged.columns["value"].distinct.registers, whole.columns["value"].distinct.registers)
+    code = merged.result()["code"]
+    assert code["distinct_count"] == 4
+    assert [item["value"] for item in code["top_values"]] == ["a", "b", "c", "d"]
+    assert code["top_values"] == whole.result()["code"]["top_values"]
+
+
+def test_profile_counts_nulls_and_skips_numeric_stats_of_text() -> None:
+    """
+    Test that nulls are counted separately and text columns only get counts and frequent values.
+    """
+    # Given
+    frame = pd.DataFrame({"score": [1.0, None, 3.0, None], "name": ["x", "y", "x", None]})
+
+    # When
+    profile = TableProfile()
+    profile.update(frame)
+    result = profile.result()
+
+    # Then
+    assert (result["score"]["count"], result["score"]["null_count"]) == (2, 2)
+    assert result["score"]["mean"] == 2.0
+    assert result["name"]["null_count"] == 1
+    assert result["name"]["top_values"][0] == {"value": "x", "count": 2}
+    assert "quantiles" not in result["name"]
+
+
+def test_profile_keys_values_the_same_across_chunk_sizes() -> None:
+    """
+    Test that a column parsed as numbers in early chunks and as text later is profiled as one set of values.
+    """
+    # Given
+    codes = [str(i % 4) for i in range(100)] + ["x"] * 3
+    csv_text = "code\n" + "\n".join(codes) + "\n"
+
+    # When
+    results = []
+    for chunk_rows in (5, 50, 1000):
+        profile = TableProfile()
+        for chunk in pd.read_csv(io.StringIO(csv_text), chunksize=chunk_rows):
+            profile.update(chunk)
+        results.append(profile.result()["code"])
+
+    # Then
+    assert results[0] == results[1] == results[2]
+    assert results[0]["distinct_count"] == 5
+    assert results[0]["top_values"][-1] == {"value": "x", "count": 3}
+    assert {item["value"] for item in results[0]["top_values"]} == {"0", "1", "2", "3", "x"}
+
+
+def test_profile_keys_nested_values_by_their_json_text() -> None:
+    """
+    Test that JSON objects and arrays are counted by their JSON text, next to scalars.
+    """
+    # Given
+    frame = pd.DataFrame.from_records([
+        {"point": {"x": 1}, "tags": [1, 2]},
+        {"point": {"x": 1}, "tags": [1, 2]},
+        {"point": {"x": 1}, "tags": "1"},
+        {"point": {"x": 2}, "tags": 1},
+    ])
+
+    # When
+    profile = TableProfile()
+    profile.update(frame)
+    result = profile.result()
+
+    # Then
+    assert result["point"]["distinct_count"] == 2
+    assert result["point"]["top_values"][0] == {"value": '{"x": 1}', "count": 3}
+    assert result["tags"]["top_values"] == [{"value": "[1, 2]", "count": 2}, {"value": "1", "count": 2}]
@@ -0,0 +1,315 @@
+"""
+Tests for the TableProcessor utility
+"""
+import io
+import re
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+
+import numpy as np
+import pandas as pd
+
+from app.api.utils.column_generator import CategoricalColumn, ColumnGenerator
+from app.api.utils.csv_analysis import split_csv_records
+from app.api.utils.parallel import shutdown_process_pool
+from app.api.utils.table_processor import TableProcessor
+
+
+def test_generate_table_data_shape() -> None:
+    """
+    Test that generated tables have a header row plus the requested rows and columns.
+    """
+    # When
+    table = TableProcessor.generate_table_data(num_rows=25, num_cols=7)
+
+    # Then
+    assert len(table) == 26
+    assert all(len(row) == 7 for row in table)
+    assert len(set(table[0])) == 7
+
+
+def test_generate_table_data_is_reproducible_with_seed() -> None:
+    """
+    Test that the same seed produces the same table.
+    """
+    # When
+    first = TableProcessor.generate_table_data(num_rows=50, num_cols=10, seed=42)
+    second = TableProcessor.generate_table_data(num_rows=50, num_cols=10, seed=42)
+
+    # Then
+    assert first == second
+
+
+def test_generated_values_match_type_formats() -> None:
+    """
+    Test that each vectorized column produces values in the expected format.
+    """
+    # Given
+    rng = np.random.default_rng(0)
+    patterns = {
+        "string": r"^[A-Za-z]([A-Za-z ]*[A-Za-z])?$",
+        "date": r"^20(20|21|22)-\d{2}-\d{2}$",
+        "email": r"^[a-z]{5,10}@(example\.com|test\.org|company\.net|mail\.co)$",
+        "name": r"^[A-Z][a-z]+ [A-Z][a-z]+$",
+        "address": r"^[1-9]\d{2} [A-Za-z ]+, [A-Za-z]+$",
+        "product": r"^[A-Z][a-z]+ [A-Z][a-z]+$",
+        "price": r"^\$\d{1,3}\.\d{1,2}$",
+    }
+
+    # Then
+    for data_type, pattern in patterns.items():
+        values = ColumnGenerator.generate_column(data_type, 1000, rng).tolist()
+        assert all(re.match(pattern, value) for value in values), data_type
+
+    integers = ColumnGenerator.generate_column("integer", 1000, rng).tolist()
+    assert all(isinstance(value, int) and 1 <= value <= 1000 for value in integers)
+
+    floats = ColumnGenerator.generate_column("float", 1000, rng).tolist()
+    assert all(1.0 <= value <= 100.0 and round(value, 2) == value for value in floats)
+
+    booleans = ColumnGenerator.generate_column("boolean", 1000, rng).tolist()
+    assert set(booleans) == {True, False}
+
+
+def test_generate_sample_csv_uses_sample_schema() -> None:
+    """
+    Test that sample CSV output uses the fixed sample headers.
+    """
+    # When
+    csv_text = TableProcessor.generate_sample_csv("users", rows=3).decode("utf-8")
+
+    # Then
+    lines = csv_text.strip().splitlines()
+    assert lines[0] == "id,full_name,email,registration_date,is_active"
+    assert len(lines) == 4
+
+
+def test_parallel_streaming_is_identical_to_serial() -> None:
+    """
+    Test that a seeded table encodes to the same bytes for any worker count and chunk size.
+    """
+    # Given
+    spec = TableProcessor.create_table_spec(num_rows=40_000, num_cols=6, seed=7)
+
+    try:
+        # When
+        serial = b"".join(TableProcessor.stream_csv(spec, chunk_rows=40_000, workers=1))
+        parallel = b"".join(TableProcessor.stream_csv(spec, chunk_rows=8192, workers=2))
+    finally:
+        shutdown_process_pool()
+
+    # Then
+    assert serial == parallel
+    assert serial.count(b"\r\n") == 40_001
+
+
+def test_generate_rows_matches_full_table() -> None:
+    """
+    Test that any row range (and column subset) of a seeded table can be generated on its own.
+    """
+    # Given
+    spec = TableProcessor.create_table_spec(num_rows=30_000, num_cols=10, seed=3)
+    full = spec.generate()
+
+    # When
+    window = spec.generate_rows(12_345, 20_000)
+    projected = spec.generate_rows(12_345, 20_000, columns=[2, 5])
+
+    # Then
+    assert window.num_rows == 7_655
+    for expected, actual in zip(full.columns, window.columns):
+        assert np.array_equal(expected[12_345:20_000], actual)
+    assert projected.headers == [full.headers[2], full.headers[5]]
+    assert np.array_equal(projected.columns[1], window.columns[5])
+
+
+def test_concurrent_seeded_generation_is_isolated() -> None:
+    """
+    Test that concurrent seeded generations do not interfere with each other.
+    """
+    # Given
+    expected = {seed: TableProcessor.generate_table_data(num_rows=2000, num_cols=8, seed=seed) for seed in range(8)}
+
+    # When
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(
+            lambda seed: TableProcessor.generate_table_data(num_rows=2000, num_cols=8, seed=seed),
+            list(range(8)) * 4
+        ))
+
+    # Then
+    assert results == [expected[seed] for seed in list(range(8)) * 4]
+
+
+def test_json_orients_hold_the_same_rows() -> None:
+    """
+    Test that the split and columns layouts of a streamed JSON table match its records.
+    """
+    # Given
+    spec = TableProcessor.create_table_spec(num_rows=20_000, num_cols=6, seed=4)
+    records = json.loads(b"".join(TableProcessor.stream_json(spec)))
+    headers = records["metadata"]["headers"]
+
+    # When
+    split = json.loads(b"".join(TableProcessor.stream_json(spec, chunk_rows=8192, orient="split")))
+    columns = json.loads(b"".join(TableProcessor.stream_json(spec, chunk_rows=8192, orient="columns")))
+
+    # Then
+    assert split["data"] == [[row[header] for header in headers] for row in records["data"]]
+    assert columns["data"] == {header: [row[header] for row in records["data"]] for header in headers}
+
+
+def test_table_to_json_string_is_compact() -> None:
+    """
+    Test that the legacy JSON string helper writes compact JSON in every layout.
+    """
+    # Given
+    table = [["id", "name"], [1, "Zoë"], [2, "Bob"]]
+
+    # When
+    records = TableProcessor.table_to_json_string(table)
+    columns = TableProcessor.table_to_json_string(table, orient="columns")
+
+    # Then
+    assert records == '[{"id":1,"name":"Zoë"},{"id":2,"name":"Bob"}]'
+    assert columns == '{"id":[1,2],"name":["Zoë","Bob"]}'
+
+
+def test_vocabulary_columns_are_categorical() -> None:
+    """
+    Test that vocabulary columns hold compact codes that decode to the same values.
+    """
+    # Given
+    spec = TableProcessor.create_sample_spec("users", 10_000, seed=5)
+
+    # When
+    table = spec.generate()
+    frame = table.to_dataframe(categorical=True)
+
+    # Then
+    names = table.columns[1]
+    assert isinstance(names, CategoricalColumn)
+    assert names.codes.dtype == np.uint8
+    assert names.nbytes == 10_000
+    assert names.tolist() == list(names.decode())
+    assert str(frame["full_name"].dtype) == "category"
+    assert frame["full_name"].astype(str).tolist() == names.tolist()
+    assert frame["email"].dtype != "category"
+
+
+def test_chunked_csv_analysis_matches_whole_file() -> None:
+    """
+    Test that analyzing a CSV in small chunks reports what a whole-file parse does.
+    """
+    # Given
+    csv_content = (
+        "id,score,flag,label,empty\n"
+        "1,2,True,10,\n"
+        "2,,False,20,\n"
+        "3,2.5,,x,\n"
+        "4,7,True,0.50,\n"
+        "5,1,False,y,\n"
+        "6,3,True,z,\n"
+    )
+    df = pd.read_csv(io.StringIO(csv_content))
+
+    # When
+    stats = TableProcessor.analyze_csv(csv_content, chunk_rows=2)
+
+    # Then
+    assert stats["row_count"] == 6
+    assert stats["columns"] == df.columns.tolist()
+    assert stats["column_types"] == {column: str(df[column].dtype) for column in df.columns}
+    assert stats["column_types"]["score"] == "float64"
+    assert stats["column_types"]["flag"] == "object"
+    assert str(stats["sample_rows"]) == str(df.head(5).to_dict(orient="records"))
+
+
+def test_parallel_csv_analysis_matches_serial() -> None:
+    """
+    Test that byte-range analysis on worker processes keeps quoted newlines intact and matches the serial path.
+    """
+    # Given
+    rows = [
+        f'{i},"line {i}\nwith ""quotes"", and commas",{i % 7 if i % 5 else ""},{bool(i % 3)}\n'
+        for i in range(3000)
+    ]
+    csv_bytes = ("id,text,score,flag\n" + "".join(rows)).encode()
+    header, ranges = split_csv_records(io.BytesIO(csv_bytes), range_bytes=4096)
+    ranges = list(ranges)
+
+    try:
+        # When
+        serial = TableProcessor.analyze_csv_file(io.BytesIO(csv_bytes), chunk_rows=500, profile=True)
+        parallel = TableProcessor.analyze_csv_file(
+            io.BytesIO(csv_bytes), chunk_rows=500, profile=True, workers=2, range_bytes=4096
+        )
+    finally:
+        shutdown_process_pool()
+
+    # Then
+    assert len(ranges) > 10
+    assert header + b"".join(ranges) == csv_bytes
+    assert all(chunk.count(b'"') % 2 == 0 for chunk in ranges)
+    for key in ("row_count", "columns", "column_types", "memory_usage"):
+        assert parallel[key] == serial[key]
+    assert str(parallel["sample_rows"]) == str(serial["sample_rows"])
+    for name, column in serial["profile"].items():
+        for key in ("count", "null_count", "distinct_count", "min", "max", "mean", "std"):
+            assert parallel["profile"][name].get(key) == column.get(key)
+    # Frequent values are exact while a column has fewer distinct values than counters
+    assert parallel["profile"]["flag"]["top_values"] == serial["profile"]["flag"]["top_values"]
+
+
+def test_parallel_profile_mean_and_std_match_serial() -> None:
+    """
+    Test that the mean and standard deviation do not depend on the chunks and byte ranges a file is split into.
+    """
+    # Given
+    values = np.random.default_rng(8).normal(1e6, 0.5, size=5000).tolist()
+    csv_bytes = ("id,reading\n" + "".join(f"{i},{value!r}\n" for i, value in enumerate(values))).encode()
+    exact = [Fraction(value) for value in pd.read_csv(io.BytesIO(csv_bytes))["reading"].tolist()]
+    exact_mean = sum(exact) / len(exact)
+    exact_std = math.sqrt(sum((value - exact_mean) ** 2 for value in exact) / (len(exact) - 1))
+
+    try:
+        # When
+        serial = TableProcessor.analyze_csv_file(io.BytesIO(csv_bytes), chunk_rows=700, profile=True)
+        whole = TableProcessor.analyze_csv_file(io.BytesIO(csv_bytes), chunk_rows=10_000, profile=True)
+        parallel = TableProcessor.analyze_csv_file(
+            io.BytesIO(csv_bytes), chunk_rows=700, profile=True, workers=2, range_bytes=3000
+        )
+    finally:
+        shutdown_process_pool()
+
+    # Then
+    for result in (serial, whole, parallel):
+        assert result["profile"]["reading"]["mean"] == float(exact_mean)
+        assert result["profile"]["reading"]["std"] == exact_std
+
+
+def test_parallel_profile_of_promoted_column_matches_serial() -> None:
+    """
+    Test that a column promoted to text by its last rows is profiled the same on every path.
+    """
+    # Given
+    rows = [f"{i},{i % 4 if i < 2900 else 'x'}\n" for i in range(3000)]
+    csv_bytes = ("id,code\n" + "".join(rows)).encode()
+
+    try:
+        # When
+        serial = TableProcessor.analyze_csv_file(io.BytesIO(csv_bytes), chunk_rows=500, profile=True)
+        whole = TableProcessor.analyze_csv_file(io.BytesIO(csv_bytes), chunk_rows=10_000, profile=True)
+        parallel = TableProcessor.analyze_csv_file(
+            io.BytesIO(csv_bytes), chunk_rows=500, profile=True, workers=2, range_bytes=2048
+        )
+    finally:
+        shutdown_process_pool()
+
+    # Then
+    assert parallel["column_types"]["code"] == serial["column_types"]["code"] == whole["column_types"]["code"]
+    assert parallel["profile"]["code"] == serial["profile"]["code"] == whole["profile"]["code"]
+    assert whole["profile"]["code"]["distinct_count"] == 5
+    assert whole["profile"]["code"]["top_values"][-1] == {"value": "x", "count": 100}
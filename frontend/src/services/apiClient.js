@@ -15,6 +15,11 @@ export const dataService = {
     return apiClient.get('/api/data/generate', { params });
   },
   
+  // Get one page of a virtual dataset identified by its seed
+  getDatasetPage(seed, params) {
+    return apiClient.get(`/api/data/datasets/${seed}`, { params });
+  },
+  
   // Get sample data
   getSample(sampleType, params) {
     return apiClient.get(`/api/data/sample/${sampleType}`, { params });